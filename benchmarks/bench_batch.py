@@ -0,0 +1,81 @@
+"""
+Compara a vazão de find_equivalencies_batch com chamadas individuais a find_equivalencies.
+
+O lote só reaproveita buscas de pedidos com o mesmo conjunto de códigos, então
+a diferença aparece com --distinct abaixo de 1; com todos os conjuntos distintos,
+os dois caminhos ficam empatados.
+
+Uso:
+    python benchmarks/bench_batch.py --rules 5000 --students 500
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core import compile_rules, find_equivalencies, find_equivalencies_batch  # noqa: E402
+from generators import make_rule_sheet, origin_code  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--codes-per-student", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--distinct", type=float, default=1.0,
+        help="Fração de pedidos com conjunto de códigos único (o resto repete pedidos anteriores)."
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    sheet = make_rule_sheet(args.rules, rng, composite_ratio=0.2)
+    all_codes = [origin_code(i) for i in range(args.rules)]
+    n_distinct = max(1, int(args.students * args.distinct))
+    code_sets = [", ".join(rng.sample(all_codes, args.codes_per_student)) for _ in range(n_distinct)]
+    student_requests = [
+        (f"DRE{i:09d}", code_sets[i] if i < n_distinct else rng.choice(code_sets))
+        for i in range(args.students)
+    ]
+
+    start = time.perf_counter()
+    all_data = {"UNIV": compile_rules(sheet)}
+    compile_s = time.perf_counter() - start
+
+    def run_single():
+        return {sid: find_equivalencies(all_data, "UNIV", codes) for sid, codes in student_requests}
+
+    def run_batch():
+        return find_equivalencies_batch(all_data, "UNIV", student_requests)
+
+    assert run_single() == run_batch(), "O lote deve produzir exatamente os mesmos resultados"
+
+    def best_of(func) -> float:
+        best = float("inf")
+        for _ in range(args.repeat):
+            # Coleta antes de cada rodada para que os resultados anteriores não pesem na medição
+            gc.collect()
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    best_single = best_of(run_single)
+    best_batch = best_of(run_batch)
+
+    print(
+        f"regras: {args.rules}  alunos: {args.students}  "
+        f"códigos/aluno: {args.codes_per_student}  conjuntos distintos: {n_distinct}"
+    )
+    print(f"compilação da aba:        {compile_s * 1000:8.2f} ms")
+    print(f"chamadas individuais:     {best_single * 1000:8.2f} ms  ({args.students / best_single:10.0f} alunos/s)")
+    print(f"find_equivalencies_batch: {best_batch * 1000:8.2f} ms  ({args.students / best_batch:10.0f} alunos/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compara dois resultados de run_benchmarks.py (ex.: antes e depois de um commit).
+
+Para cada etapa presente nos dois arquivos mostra a variação da latência p50/p99,
+da vazão e do pico de memória. Sai com código 1 se alguma etapa piorar mais
+do que o limite informado, para poder ser usado como verificação em CI.
+
+Uso:
+    python benchmarks/compare.py base.json novo.json --threshold 10
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str]:
+    return result["stage"], json.dumps(result["params"], sort_keys=True, ensure_ascii=False)
+
+
+def _change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    """Variação percentual de old para new (positiva = aumentou)."""
+    if not old or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def _fmt(change: Optional[float]) -> str:
+    return "     n/d" if change is None else f"{change:+7.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline", help="JSON de referência.")
+    parser.add_argument("candidate", help="JSON a comparar com a referência.")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0,
+        help="Piora percentual de p50 (ou de pico de memória) considerada regressão (padrão: 10)."
+    )
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    old_results = {_key(r): r for r in baseline["results"]}
+    new_results = {_key(r): r for r in candidate["results"]}
+
+    print(f"Referência: {baseline['meta']['commit']}  |  Candidato: {candidate['meta']['commit']}\n")
+    print(f"{'etapa':<26} {'parâmetros':<34} {'p50':>8} {'p99':>8} {'vazão':>8} {'memória':>8}")
+
+    regressions = []
+    for key, new in new_results.items():
+        old = old_results.get(key)
+        if old is None:
+            continue
+        p50 = _change(old["latency_ms"]["p50"], new["latency_ms"]["p50"])
+        p99 = _change(old["latency_ms"]["p99"], new["latency_ms"]["p99"])
+        throughput = _change(old["throughput_per_s"], new["throughput_per_s"])
+        memory = _change(old["peak_memory_kb"], new["peak_memory_kb"])
+        flag = ""
+        if (p50 is not None and p50 > args.threshold) or (memory is not None and memory > args.threshold):
+            regressions.append(key)
+            flag = "  <-- regressão"
+        print(f"{key[0]:<26} {key[1]:<34} {_fmt(p50)} {_fmt(p99)} {_fmt(throughput)} {_fmt(memory)}{flag}")
+
+    missing = sorted(set(old_results) - set(new_results))
+    if missing:
+        print(f"\n{len(missing)} etapa(s) da referência ausente(s) no candidato.")
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.threshold:.0f}%.")
+        sys.exit(1)
+    print("\nNenhuma regressão acima do limite.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Geradores de dados sintéticos para os benchmarks: planilhas de regras e PDFs de requerimento.
+
+Os dados seguem o formato real (colunas da planilha, layout das duas páginas
+do requerimento), para que passem pelos mesmos caminhos de código do app.
+"""
+import io
+import random
+from typing import Dict, List, Optional
+
+import pandas as pd
+from fpdf import FPDF
+
+UFRJ_PREFIXES = ("ICP", "MAE")
+ORIGIN_PREFIXES = ("MAT", "INF", "CTC")
+NAME_WORDS = (
+    "Cálculo", "Álgebra", "Linear", "Programação", "Estruturas", "Dados", "Sistemas",
+    "Operacionais", "Redes", "Computadores", "Teoria", "Grafos", "Lógica", "Introdução",
+    "Banco", "Modelagem", "Física", "Probabilidade", "Estatística", "Compiladores"
+)
+JUSTIFICATIONS = (
+    "Ementa e carga horária totalmente compatíveis.",
+    "Carga horária insuficiente.",
+    "Cobre o conteúdo de grafos e combinatória.",
+    "Mesmo juntas, as disciplinas cobrem apenas parte do conteúdo.",
+    None,
+)
+
+
+def origin_code(index: int) -> str:
+    """Código de origem determinístico para a posição informada (ex.: INF00042)."""
+    return f"{ORIGIN_PREFIXES[index % len(ORIGIN_PREFIXES)]}{index:05d}"
+
+
+def _course_name(rng: random.Random) -> str:
+    return " ".join(rng.sample(NAME_WORDS, rng.randint(2, 4)))
+
+
+def make_rule_sheet(n_rules: int, rng: random.Random, composite_ratio: float = 0.2) -> pd.DataFrame:
+    """
+    Monta uma aba com n_rules regras no formato da planilha real.
+
+    Uma fração composite_ratio das regras é composta ("A + B"), exigindo dois códigos.
+    """
+    codes = [origin_code(i) for i in range(n_rules)]
+    origin = []
+    for code in codes:
+        if n_rules > 1 and rng.random() < composite_ratio:
+            origin.append(f"{code} + {rng.choice(codes)}")
+        else:
+            origin.append(code)
+
+    return pd.DataFrame({
+        "Códigos Origem": origin,
+        "Nomes Origem": [_course_name(rng) for _ in codes],
+        "Carga Horária Origem": [rng.choice((30, 60, 90, 120)) for _ in codes],
+        "Equivalente?": [rng.choice(("Sim", "Não")) for _ in codes],
+        "Códigos UFRJ Destino": [f"{rng.choice(UFRJ_PREFIXES)}{rng.randint(100, 999)}" for _ in codes],
+        "creditos": [rng.choice((30, 60, 90)) for _ in codes],
+        "Nomes UFRJ Destino": [_course_name(rng) for _ in codes],
+        "Justificativa Parecer": [rng.choice(JUSTIFICATIONS) for _ in codes],
+        "Avaliador": ["Comissão"] * n_rules,
+        "Data Avaliação": ["2025"] * n_rules,
+    })
+
+
+def make_workbook(total_rules: int, n_sheets: int, seed: int = 42, composite_ratio: float = 0.2) -> Dict[str, pd.DataFrame]:
+    """
+    Monta uma planilha com total_rules regras divididas em n_sheets abas de universidades.
+    """
+    rng = random.Random(seed)
+    per_sheet = [total_rules // n_sheets + (1 if i < total_rules % n_sheets else 0) for i in range(n_sheets)]
+    return {
+        f"UNIV{i:03d}": make_rule_sheet(n_rules, rng, composite_ratio)
+        for i, n_rules in enumerate(per_sheet)
+    }
+
+
+def workbook_to_xlsx_bytes(workbook: Dict[str, pd.DataFrame]) -> bytes:
+    """Serializa a planilha sintética em .xlsx (openpyxl)."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        for sheet_name, df in workbook.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return buffer.getvalue()
+
+
+def make_requerimento_pdf(
+    disciplines: List[Dict[str, str]],
+    name: str = "Aluno Sintético da Silva",
+    dre: str = "125000000",
+    institution: str = "UNIV000",
+    rng: Optional[random.Random] = None
+) -> bytes:
+    """
+    Gera um PDF de requerimento com o mesmo layout do formulário real.
+
+    A página 1 traz os dados do aluno e a página 2 a tabela de disciplinas, com
+    códigos compostos ("A + B") quebrados em duas linhas, como no formulário.
+
+    Args:
+        disciplines (List[Dict[str, str]]): Itens com "ufrj_code", "ufrj_name",
+                                            "origin_code" e "origin_name".
+    """
+    rng = rng or random.Random(0)
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=False)
+
+    # --- Página 1: Dados Pessoais ---
+    pdf.add_page()
+    pdf.set_font("Helvetica", "", 11)
+    for line in (
+        "UNIVERSIDADE FEDERAL DO RIO DE JANEIRO",
+        "Instituto de Computação",
+        "DADOS DO(A) ALUNO(A)",
+        "NOME:",
+        name,
+        "DRE:",
+        dre,
+        "EMAIL: aluno@example.com DATA: 24/03/2025",
+        f"DISCIPLINAS CURSADAS NA INSTITUIÇÃO DE ENSINO SUPERIOR: {institution}",
+    ):
+        pdf.cell(0, 8, line, new_x="LMARGIN", new_y="NEXT")
+
+    # --- Página 2: Tabela ---
+    pdf.add_page()
+    pdf.set_font("Helvetica", "", 9)
+    pdf.set_xy(40, 15)
+    pdf.cell(0, 6, "TABELA DE EQUIVALÊNCIA DE DISCIPLINAS")
+    columns = {"ufrj_code": 15, "ufrj_name": 41, "origin_code": 141, "origin_name": 171, "year": 271}
+    for column, title in zip(columns.values(), ("CÓDIGO", "NOME", "CÓDIGO", "NOME", "ANO")):
+        pdf.text(column, 24, title)
+    y = 32
+    for item in disciplines:
+        parts = [part.strip() for part in item["origin_code"].split("+")]
+        if len(parts) > 1:
+            # Código composto: a primeira parte fica acima e a segunda abaixo da linha principal
+            pdf.text(columns["origin_code"], y, f"{parts[0]} +")
+            y += 4
+            pdf.text(columns["ufrj_code"], y, item["ufrj_code"])
+            pdf.text(columns["ufrj_name"], y, item["ufrj_name"])
+            pdf.text(columns["origin_name"], y, item["origin_name"])
+            pdf.text(columns["year"], y, str(rng.randint(2015, 2025)))
+            y += 4
+            pdf.text(columns["origin_code"], y, parts[1])
+        else:
+            pdf.text(columns["ufrj_code"], y, item["ufrj_code"])
+            pdf.text(columns["ufrj_name"], y, item["ufrj_name"])
+            pdf.text(columns["origin_code"], y, parts[0])
+            pdf.text(columns["origin_name"], y, item["origin_name"])
+            pdf.text(columns["year"], y, str(rng.randint(2015, 2025)))
+        y += 8
+        if y > 195:
+            break  # O formulário real tem uma única página de tabela
+
+    return bytes(pdf.output())
+
+
+def make_disciplines(sheet: pd.DataFrame, n: int, rng: random.Random) -> List[Dict[str, str]]:
+    """
+    Sorteia n regras da aba e as transforma em itens de requerimento.
+    """
+    rows = sheet.sample(n=min(n, len(sheet)), random_state=rng.randint(0, 2**31 - 1))
+    return [
+        {
+            "ufrj_code": str(row["Códigos UFRJ Destino"]),
+            "ufrj_name": str(row["Nomes UFRJ Destino"]),
+            "origin_code": str(row["Códigos Origem"]),
+            "origin_name": str(row["Nomes Origem"]),
+        }
+        for _, row in rows.iterrows()
+    ]
+
+
+def make_boa_pdf(n_courses: int, name: str = "ALUNO SINTETICO DA SILVA", rng: Optional[random.Random] = None) -> bytes:
+    """
+    Gera um BOA (boletim de orientação acadêmica) sintético com n_courses disciplinas.
+
+    O cabeçalho traz os campos lidos por UFRJ.extract_student_data e as
+    disciplinas ocupam quantas páginas forem necessárias, uma por linha,
+    terminando com a nota (ou com um conceito não numérico, nas reprovações).
+    """
+    rng = rng or random.Random(0)
+    pdf = FPDF(orientation="P", unit="mm", format="A4")
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "", 10)
+    for line in (
+        "UNIVERSIDADE FEDERAL DO RIO DE JANEIRO",
+        "Boletim de Orientação Acadêmica - Emissão",
+        name,
+        "Períodos Integralizados (RES 10/2004 - CEG): 6",
+        "Prazo máximo de integralização: 12",
+        "Carga horária obtida acumulada: 2100.0",
+        "Créditos obtidos acumulados: 140.0",
+        f"CR acumulado: {rng.uniform(5, 10):.1f}",
+        "Carga horária acumulada extensão: 90.0",
+    ):
+        pdf.cell(0, 6, line, new_x="LMARGIN", new_y="NEXT")
+
+    for i in range(n_courses):
+        code = f"{rng.choice(UFRJ_PREFIXES)}{i:03d}"
+        grade = f"{rng.uniform(5, 10):.1f}" if rng.random() < 0.85 else "RFM"
+        pdf.cell(0, 6, f"{code} {_course_name(rng)} 60 2024/1 {grade}", new_x="LMARGIN", new_y="NEXT")
+
+    return bytes(pdf.output())
@@ -0,0 +1,183 @@
+"""
+Teste de carga do serviço HTTP (src/service.py).
+
+Dispara requisições de um tipo contra o serviço já em execução, com N clientes
+simultâneos (cada um com sua conexão keep-alive), e mostra a vazão, os percentis
+de latência e a contagem de respostas por status. Respostas 503 indicam que a
+fila de processos do serviço encheu (backpressure) e também entram na contagem.
+
+Uso:
+    python src/service.py --workbook "data/Equivalencias de Disciplinas.xlsx" --workers 2 &
+    python benchmarks/load_test.py --endpoint equivalencias --concurrency 16 --requests 5000
+    python benchmarks/load_test.py --endpoint requerimentos --concurrency 8 --duration 30 --output carga.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+import generators  # noqa: E402
+from run_benchmarks import percentile  # noqa: E402
+
+ENDPOINTS = ("equivalencias", "requerimentos", "relatorios")
+
+
+def _request(
+    conn: http.client.HTTPConnection, method: str, path: str, body: Optional[bytes], content_type: str
+) -> Tuple[int, bytes]:
+    headers = {"Content-Type": content_type} if body is not None else {}
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def build_payload(endpoint: str, args: argparse.Namespace, conn: http.client.HTTPConnection) -> Tuple[bytes, str]:
+    """
+    Monta o corpo das requisições do teste (o mesmo para todas, como um script repetindo a chamada).
+    """
+    rng = random.Random(args.seed)
+    if endpoint == "requerimentos":
+        sheet = generators.make_rule_sheet(200, rng)
+        return generators.make_requerimento_pdf(generators.make_disciplines(sheet, args.disciplines, rng), rng=rng), "application/pdf"
+
+    status, body = _request(conn, "GET", "/universidades", None, "")
+    universities = json.loads(body)["universities"] if status == 200 else []
+    university = args.university or (universities[0] if universities else "")
+    codes = args.codes or " ".join(generators.origin_code(rng.randrange(1000)) for _ in range(args.disciplines))
+    payload = {"university": university, "codes": codes}
+
+    if endpoint == "relatorios":
+        # Gera o relatório a partir de uma análise real, para que o PDF tenha linhas
+        _, body = _request(conn, "POST", "/equivalencias", json.dumps(payload).encode("utf-8"), "application/json")
+        results = json.loads(body).get("results", [])
+        found = [r for r in results if r.get("status") == "Encontrado"]
+        # Sem regras encontradas, repete uma linha fictícia para ainda exercitar a tabela do PDF
+        if not found:
+            found = [{
+                "status": "Encontrado", "origin_codes": "INF00001", "origin_names": "Disciplina Sintética",
+                "is_equivalent": "Sim", "dest_codes": "MAB001", "dest_names": "Disciplina UFRJ",
+                "justification": "Carga horária compatível."
+            }] * args.disciplines
+        payload = {"results": found, "subtitle": "Teste de carga"}
+    return json.dumps(payload).encode("utf-8"), "application/json"
+
+
+def run_client(
+    host: str,
+    port: int,
+    path: str,
+    body: bytes,
+    content_type: str,
+    deadline: float,
+    remaining: List[int],
+    lock: threading.Lock,
+    latencies: List[float],
+    statuses: Dict[Any, int]
+) -> None:
+    """Um cliente: envia requisições em sequência pela mesma conexão até o fim do teste."""
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+    while time.perf_counter() < deadline:
+        with lock:
+            if remaining[0] == 0:
+                break
+            remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            status, _ = _request(conn, "POST", path, body, content_type)
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=120)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="Endereço do serviço.")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="equivalencias", help="Rota a testar.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultâneos.")
+    parser.add_argument("--requests", type=int, default=2000, help="Total de requisições (0 = sem limite).")
+    parser.add_argument("--duration", type=float, default=60.0, help="Duração máxima do teste, em segundos.")
+    parser.add_argument("--university", help="Aba usada nas análises (padrão: a primeira do serviço).")
+    parser.add_argument("--codes", help="Códigos enviados em /equivalencias (padrão: códigos sintéticos).")
+    parser.add_argument("--disciplines", type=int, default=8, help="Disciplinas por requerimento/análise.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Também grava o resumo neste arquivo JSON.")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    setup_conn = http.client.HTTPConnection(host, port, timeout=120)
+    body, content_type = build_payload(args.endpoint, args, setup_conn)
+    setup_conn.close()
+
+    latencies: List[float] = []
+    statuses: Dict[Any, int] = {}
+    lock = threading.Lock()
+    remaining = [args.requests if args.requests > 0 else -1]
+    start = time.perf_counter()
+    deadline = start + args.duration
+    clients = [
+        threading.Thread(
+            target=run_client,
+            args=(host, port, f"/{args.endpoint}", body, content_type, deadline, remaining, lock, latencies, statuses)
+        )
+        for _ in range(max(1, args.concurrency))
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print("Nenhuma requisição foi concluída.")
+        sys.exit(1)
+
+    ordered = sorted(latencies)
+    ok = statuses.get(200, 0)
+    summary = {
+        "endpoint": args.endpoint,
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(len(latencies) / elapsed, 2),
+        "ok_per_s": round(ok / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(ordered, 0.50), 3),
+            "p95": round(percentile(ordered, 0.95), 3),
+            "p99": round(percentile(ordered, 0.99), 3),
+            "max": round(ordered[-1], 3),
+        },
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+    print(
+        f"/{args.endpoint}: {summary['requests']} requisições em {summary['elapsed_s']:.1f}s "
+        f"com {args.concurrency} cliente(s)"
+    )
+    print(f"  vazão: {summary['requests_per_s']:.1f} req/s ({summary['ok_per_s']:.1f} respostas 200/s)")
+    latency = summary["latency_ms"]
+    print(f"  latência: p50 {latency['p50']:.2f} ms | p95 {latency['p95']:.2f} ms | p99 {latency['p99']:.2f} ms")
+    print(f"  status: {', '.join(f'{status}: {count}' for status, count in summary['statuses'].items())}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
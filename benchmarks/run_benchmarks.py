@@ -0,0 +1,239 @@
+"""
+Suíte de benchmarks dos caminhos críticos: leitura da planilha, compilação das
+regras, busca de equivalências (individual e em lote), leitura do requerimento
+e geração do relatório em PDF.
+
+Para cada etapa são registrados vazão, percentis de latência e pico de memória
+em um arquivo JSON, que pode ser comparado entre commits com compare.py.
+
+Uso:
+    python benchmarks/run_benchmarks.py --sizes 10 1000 100000 --sheets 5 --output base.json
+    python benchmarks/run_benchmarks.py --sizes 1000000 --sheets 20 --stages load compile find
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from statistics import mean
+from typing import Any, Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "src"))
+
+import generators  # noqa: E402
+from core import build_rulebook, find_equivalencies, find_equivalencies_batch  # noqa: E402
+from data_loader import load_spreadsheet  # noqa: E402
+from pdf_generator import create_pdf_bytes  # noqa: E402
+from pdf_parser import parse_equivalencia_pdf  # noqa: E402
+
+ALL_STAGES = ("load", "compile", "find", "batch", "parse", "render")
+LOGO_PATH = os.path.join(PROJECT_ROOT, "assets", "logo_ic.png")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por interpolação linear sobre uma lista já ordenada."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure(
+    stage: str,
+    params: Dict[str, Any],
+    func: Callable[[], Any],
+    iterations: int,
+    items_per_call: int = 1
+) -> Dict[str, Any]:
+    """
+    Executa func 'iterations' vezes e resume latência, vazão e pico de memória.
+
+    O pico de memória é medido em uma execução extra sob tracemalloc, para que
+    o custo do rastreamento não entre nas medições de tempo.
+    """
+    func()  # aquecimento (imports, caches de primeira chamada)
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    total = sum(latencies)
+    result = {
+        "stage": stage,
+        "params": params,
+        "iterations": iterations,
+        "items_per_call": items_per_call,
+        "throughput_per_s": (iterations * items_per_call) / total if total else None,
+        "latency_ms": {
+            "mean": mean(latencies) * 1000,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": latencies[-1] * 1000,
+        },
+        "peak_memory_kb": peak / 1024,
+    }
+    print(
+        f"{stage:<26} {json.dumps(params, ensure_ascii=False):<44} "
+        f"p50 {result['latency_ms']['p50']:9.3f} ms  p99 {result['latency_ms']['p99']:9.3f} ms  "
+        f"{result['throughput_per_s']:12.1f}/s  pico {result['peak_memory_kb']:10.0f} KiB"
+    )
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "desconhecido"
+
+
+def bench_rules(args, total_rules: int, results: List[Dict[str, Any]]) -> None:
+    """Etapas que dependem do tamanho da planilha: leitura, compilação e buscas."""
+    rng = random.Random(args.seed)
+    workbook = generators.make_workbook(total_rules, args.sheets, seed=args.seed)
+    params = {"rules": total_rules, "sheets": args.sheets}
+
+    if "load" in args.stages:
+        # A escrita do .xlsx não é medida; só a leitura pelo data_loader
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            xlsx_path = os.path.join(tmp_dir, "workbook.xlsx")
+            with open(xlsx_path, "wb") as f:
+                f.write(generators.workbook_to_xlsx_bytes(workbook))
+            results.append(measure(
+                "load_spreadsheet", params, lambda: load_spreadsheet(xlsx_path), args.load_iterations
+            ))
+            snapshot_dir = os.path.join(tmp_dir, "snapshots")
+            results.append(measure(
+                "load_spreadsheet_snapshot", params,
+                lambda: load_spreadsheet(xlsx_path, snapshot_dir), args.load_iterations
+            ))
+
+    rulebook = build_rulebook(workbook)
+    if "compile" in args.stages:
+        results.append(measure("build_rulebook", params, lambda: build_rulebook(workbook), args.load_iterations))
+        # A comissão editou uma linha de uma aba: só essa aba é recompilada
+        edited = dict(workbook)
+        first_sheet = next(iter(edited))
+        edited[first_sheet] = edited[first_sheet].copy()
+        edited[first_sheet].iloc[0, edited[first_sheet].columns.get_loc("Nomes Origem")] = "Disciplina Editada"
+        results.append(measure(
+            "build_rulebook_incremental", params, lambda: build_rulebook(edited, rulebook), args.load_iterations
+        ))
+
+    university = rulebook.universities[0]
+    sheet_size = len(workbook[university])
+    codes = [generators.origin_code(i) for i in range(sheet_size)]
+    queries = [
+        ", ".join(rng.sample(codes, min(args.codes_per_student, sheet_size)))
+        for _ in range(args.queries)
+    ]
+
+    if "find" in args.stages:
+        query_iter = iter(queries * (args.query_iterations // len(queries) + 2))
+        results.append(measure(
+            "find_equivalencies", params,
+            lambda: find_equivalencies(rulebook, university, next(query_iter)), args.query_iterations
+        ))
+
+    if "batch" in args.stages:
+        student_requests = [(f"DRE{i:09d}", query) for i, query in enumerate(queries)]
+        results.append(measure(
+            "find_equivalencies_batch", params,
+            lambda: find_equivalencies_batch(rulebook, university, student_requests),
+            args.batch_iterations, items_per_call=len(student_requests)
+        ))
+
+
+def bench_documents(args, results: List[Dict[str, Any]]) -> None:
+    """Etapas de documentos: leitura do requerimento e geração do relatório."""
+    rng = random.Random(args.seed)
+    sheet = generators.make_rule_sheet(500, rng)
+    rulebook = build_rulebook({"UNIV000": sheet})
+
+    if "parse" in args.stages:
+        pdfs = [
+            generators.make_requerimento_pdf(generators.make_disciplines(sheet, args.disciplines, rng), rng=rng)
+            for _ in range(args.pdfs)
+        ]
+        pdf_iter = iter(pdfs * (args.doc_iterations // len(pdfs) + 2))
+        results.append(measure(
+            "parse_equivalencia_pdf", {"disciplines": args.disciplines},
+            lambda: parse_equivalencia_pdf(io.BytesIO(next(pdf_iter))), args.doc_iterations
+        ))
+
+    if "render" in args.stages:
+        for n_rows in args.report_rows:
+            query = " ".join(generators.origin_code(i) for i in rng.sample(range(len(sheet)), min(n_rows, len(sheet))))
+            report = find_equivalencies(rulebook, "UNIV000", query)
+            results.append(measure(
+                "create_pdf_bytes", {"rows": len(report)},
+                lambda: create_pdf_bytes(report, LOGO_PATH), args.doc_iterations
+            ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000],
+                        help="Total de regras de cada planilha sintética (de 10 a 1.000.000).")
+    parser.add_argument("--sheets", type=int, default=5, help="Número de abas (universidades) por planilha.")
+    parser.add_argument("--stages", nargs="+", choices=ALL_STAGES, default=list(ALL_STAGES))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--codes-per-student", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=200, help="Consultas distintas (e alunos por lote).")
+    parser.add_argument("--query-iterations", type=int, default=2000)
+    parser.add_argument("--batch-iterations", type=int, default=20)
+    parser.add_argument("--load-iterations", type=int, default=3)
+    parser.add_argument("--pdfs", type=int, default=10, help="Requerimentos sintéticos distintos.")
+    parser.add_argument("--disciplines", type=int, default=12, help="Disciplinas por requerimento.")
+    parser.add_argument("--report-rows", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--doc-iterations", type=int, default=20)
+    parser.add_argument("--output", default="bench_results.json", help="Arquivo JSON de saída.")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    if {"load", "compile", "find", "batch"} & set(args.stages):
+        for total_rules in args.sizes:
+            bench_rules(args, total_rules, results)
+    if {"parse", "render"} & set(args.stages):
+        bench_documents(args, results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados gravados em '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
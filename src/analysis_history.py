@@ -0,0 +1,282 @@
+# 1. Bibliotecas padrão (Standard Library)
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# 3. Módulos da sua aplicação (Local application)
+from core import get_matching_strategy
+
+# Quantas entradas list_requests devolve por padrão
+DEFAULT_LIST_LIMIT = 200
+
+# Colunas da exportação para a ata da comissão (uma linha por disciplina analisada)
+EXPORT_COLUMNS = (
+    "Data",
+    "DRE",
+    "Aluno",
+    "Universidade",
+    "Códigos Origem",
+    "Nomes Origem",
+    "Códigos UFRJ Destino",
+    "Nomes UFRJ Destino",
+    "Parecer",
+    "Justificativa",
+)
+
+
+class AnalysisHistory:
+    """
+    Histórico em disco (SQLite) das análises de equivalência já feitas.
+
+    Cada análise é identificada pela universidade, pelo conjunto de códigos
+    (normalizado e ordenado), pela versão das regras e pela estratégia de
+    casamento: um pedido idêntico devolve os resultados e o PDF guardados, sem
+    recalcular. Os resultados de uma análise são gravados uma única vez; cada
+    pedido (aluno, data) só aponta para eles. Os pedidos são indexados por DRE
+    e por universidade, para consulta e para a exportação da ata.
+
+    O mesmo arquivo pode ser usado por vários processos ao mesmo tempo.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path (str): Caminho do arquivo SQLite (criado se não existir).
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    university TEXT NOT NULL,
+                    codes TEXT NOT NULL,
+                    rulebook_version TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    report_pdf BLOB,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS requests (
+                    id INTEGER PRIMARY KEY,
+                    analysis_key TEXT NOT NULL REFERENCES analyses (key),
+                    dre TEXT,
+                    student_name TEXT,
+                    university TEXT NOT NULL,
+                    requested_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_dre ON requests (dre, requested_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_university ON requests (university, requested_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_requests_date ON requests (requested_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Uma conexão por operação: barata no SQLite e segura entre threads e processos
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:  # commit ao final, rollback em caso de erro
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(university: str, codes: Iterable[str], rulebook_version: str, strategy: Optional[str] = None) -> str:
+        """
+        Monta a chave da análise a partir da tupla normalizada
+        (universidade, códigos ordenados, versão das regras, estratégia).
+        """
+        normalized = [university, sorted({code.strip().upper() for code in codes}), rulebook_version,
+                      strategy or get_matching_strategy()]
+        return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns:
+            Optional[List[Dict[str, Any]]]: Os resultados guardados da análise, ou None se ela ainda não foi feita.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT results FROM analyses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record(
+        self,
+        key: str,
+        university: str,
+        codes: Iterable[str],
+        rulebook_version: str,
+        results: List[Dict[str, Any]],
+        dre: Optional[str] = None,
+        student_name: Optional[str] = None,
+        strategy: Optional[str] = None
+    ) -> None:
+        """
+        Registra um pedido de análise. Os resultados só são gravados se a análise ainda não existir.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO analyses (key, university, codes, rulebook_version, strategy, results, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, university, " ".join(sorted({code.strip().upper() for code in codes})), rulebook_version,
+                    strategy or get_matching_strategy(),
+                    # NaN (células vazias da planilha) é aceito pelo json do Python e volta como NaN
+                    json.dumps(results, ensure_ascii=False, default=str), now
+                )
+            )
+            conn.execute(
+                "INSERT INTO requests (analysis_key, dre, student_name, university, requested_at) VALUES (?, ?, ?, ?, ?)",
+                (key, (dre or "").strip() or None, (student_name or "").strip() or None, university, now)
+            )
+
+    def get_or_analyse(
+        self,
+        university: str,
+        codes: Iterable[str],
+        rulebook_version: str,
+        analyse: Callable[[], List[Dict[str, Any]]],
+        dre: Optional[str] = None,
+        student_name: Optional[str] = None
+    ) -> Tuple[str, List[Dict[str, Any]], bool]:
+        """
+        Devolve a análise guardada ou, se ela ainda não existir, executa analyse() e a guarda.
+        Em ambos os casos o pedido entra no histórico.
+
+        Returns:
+            Tuple[str, List[Dict[str, Any]], bool]: (chave da análise, resultados, True se veio do histórico).
+        """
+        codes = list(codes)
+        strategy = get_matching_strategy()
+        key = self.make_key(university, codes, rulebook_version, strategy)
+        results = self.get(key)
+        from_history = results is not None
+        if results is None:
+            results = analyse()
+        self.record(key, university, codes, rulebook_version, results, dre, student_name, strategy)
+        return key, results, from_history
+
+    def get_report(self, key: str) -> Optional[bytes]:
+        """Devolve o PDF guardado da análise, se já tiver sido gerado."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT report_pdf FROM analyses WHERE key = ?", (key,)).fetchone()
+        return row[0] if row and row[0] is not None else None
+
+    def get_or_create_report(self, key: str, build: Callable[[], bytes]) -> bytes:
+        """
+        Devolve o PDF guardado da análise ou o gera com build() e o guarda junto da análise.
+        """
+        report = self.get_report(key)
+        if report is None:
+            report = build()
+            with self._connect() as conn:
+                conn.execute("UPDATE analyses SET report_pdf = ? WHERE key = ?", (report, key))
+        return report
+
+    def list_requests(
+        self,
+        dre: Optional[str] = None,
+        university: Optional[str] = None,
+        limit: Optional[int] = DEFAULT_LIST_LIMIT
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista os pedidos mais recentes, opcionalmente filtrados por DRE e/ou universidade.
+
+        Returns:
+            List[Dict[str, Any]]: Um dicionário por pedido, com os dados do aluno, a
+                                  data, a análise (chave, códigos, versão) e os resultados.
+        """
+        conditions, params = [], []
+        if dre:
+            conditions.append("r.dre = ?")
+            params.append(dre.strip())
+        if university:
+            conditions.append("r.university = ?")
+            params.append(university)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            "SELECT r.requested_at, r.dre, r.student_name, r.university, a.key, a.codes, "
+            "a.rulebook_version, a.results, a.report_pdf IS NOT NULL "
+            f"FROM requests r JOIN analyses a ON a.key = r.analysis_key {where} "
+            "ORDER BY r.requested_at DESC, r.id DESC"
+        )
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {
+                "requested_at": requested_at,
+                "dre": dre_value,
+                "student_name": student_name,
+                "university": university_value,
+                "key": key,
+                "codes": codes,
+                "rulebook_version": rulebook_version,
+                "results": json.loads(results),
+                "has_report": bool(has_report),
+            }
+            for requested_at, dre_value, student_name, university_value, key, codes, rulebook_version, results, has_report
+            in rows
+        ]
+
+    def export_csv(
+        self,
+        output: TextIO,
+        dre: Optional[str] = None,
+        university: Optional[str] = None
+    ) -> int:
+        """
+        Exporta o histórico em CSV para a ata da comissão: uma linha por disciplina
+        de cada pedido, do mais antigo para o mais recente.
+
+        Args:
+            output (TextIO): Arquivo (ou buffer) de texto de destino.
+            dre (Optional[str]): Filtra os pedidos de um aluno.
+            university (Optional[str]): Filtra os pedidos de uma universidade.
+
+        Returns:
+            int: Quantidade de linhas exportadas (sem o cabeçalho).
+        """
+        writer = csv.writer(output)
+        writer.writerow(EXPORT_COLUMNS)
+        count = 0
+        for entry in reversed(self.list_requests(dre, university, limit=None)):
+            common = [
+                datetime.fromtimestamp(entry["requested_at"]).strftime("%d/%m/%Y %H:%M"),
+                entry["dre"] or "",
+                entry["student_name"] or "",
+                entry["university"],
+            ]
+            for result in entry["results"]:
+                if result.get("status") == "Encontrado":
+                    row = [
+                        result.get("origin_codes"), result.get("origin_names"),
+                        result.get("dest_codes"), result.get("dest_names"),
+                        result.get("is_equivalent"), result.get("justification"),
+                    ]
+                else:
+                    row = [result.get("input_code"), "", "", "", result.get("status") or result.get("error"), ""]
+                writer.writerow(common + ["" if _is_blank(value) else value for value in row])
+                count += 1
+        return count
+
+
+def _is_blank(value: Any) -> bool:
+    """Células vazias da planilha (None/NaN) saem como texto vazio na exportação."""
+    return value is None or (isinstance(value, float) and value != value)
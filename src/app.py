@@ -3,6 +3,7 @@ import os
 
 # 2. Bibliotecas de terceiros (Third-party)
 import streamlit as st
+from dotenv import load_dotenv
 
 # 3. Módulos da sua aplicação (Local application)
 from components import (
@@ -10,15 +11,39 @@ from components import (
     render_sidebar,
     render_spreadsheet_uploader,
     report_card_compact,
-    load_data_from_url,
-    validate_spreadsheet_data
+    load_shared_rulebook,
+    render_timing_panel,
+    render_discipline_search,
+    get_analysis_history,
+    render_analysis_history
 )
-from core import find_equivalencies
-from data_loader import get_university_list, load_spreadsheet
-from pdf_generator import create_pdf_bytes
+from core import find_equivalencies, find_suggestions, normalize_codes
+from pdf_generator import ReportCache, create_pdf_bytes, report_fingerprint
+from timing import enabled_from_env, set_enabled, span, start_run
+
+
+@st.cache_resource
+def get_report_cache() -> ReportCache:
+    """
+    Devolve o cache de relatórios em PDF do processo, compartilhado por todas as sessões.
+    """
+    return ReportCache()
 
 
 def main():
+    # Com STAGE_TIMING=1 no .env, cada etapa é medida, registrada em log (JSON)
+    # e o detalhamento da execução aparece na barra lateral.
+    load_dotenv()
+    set_enabled(enabled_from_env())
+
+    with start_run("app.main") as run:
+        render_page()
+
+    if run is not None:
+        render_timing_panel(run)
+
+
+def render_page():
     # --- Configuração de caminhos ---
     PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     FAVICON_PATH = os.path.join(PROJECT_ROOT, "assets", "icon.png")
@@ -32,10 +57,18 @@ def main():
     )
 
     # --- Inicialização do Estado da Aplicação ---
-    if 'spreadsheet_data' not in st.session_state:
-        st.session_state.spreadsheet_data = None
+    # A sessão guarda apenas a versão das regras; o RuleBook em si é
+    # compartilhado, somente leitura, por todas as sessões do servidor.
+    if 'rulebook_version' not in st.session_state:
+        st.session_state.rulebook_version = None
     if 'analysis_results' not in st.session_state:
         st.session_state.analysis_results = []
+    if 'analysis_suggestions' not in st.session_state:
+        st.session_state.analysis_suggestions = {}
+    if 'analysis_key' not in st.session_state:
+        st.session_state.analysis_key = None
+    if 'analysis_from_history' not in st.session_state:
+        st.session_state.analysis_from_history = False
 
     # --- Renderização dos Componentes Visuais Estáticos ---
     render_sidebar()
@@ -43,36 +76,35 @@ def main():
 
     # --- ETAPA 1: CARREGAMENTO E VALIDAÇÃO DOS DADOS (DA URL) ---
     
-    # Só executa a carga e validação se os dados AINDA NÃO estiverem na sessão
-    if st.session_state.spreadsheet_data is None: 
-        with st.spinner("Carregando e validando planilha de equivalências..."):
-            
-            # 1. Tenta carregar os dados (da URL do .env)
-            load_error, data = load_data_from_url()
-
-            if load_error:
-                st.error(load_error)
-                st.stop()  # Para a execução do app se o carregamento falhar
-            
-            # 2. Tenta validar os dados (se o carregamento foi OK)
-            is_valid, validation_message = validate_spreadsheet_data(data)
-
-            if not is_valid:
-                st.error(validation_message)
-                st.stop()  # Para a execução se a validação falhar
-
-            # 3. Sucesso! Armazena os dados na sessão
-            st.session_state.spreadsheet_data = data
-            st.session_state.analysis_results = [] # Reseta os resultados
+    # O carregamento e a validação só acontecem quando o RuleBook do processo
+    # ainda não existe ou expirou; nas demais execuções a chamada é imediata.
+    with st.spinner("Carregando e validando planilha de equivalências..."):
+        load_error, rulebook = load_shared_rulebook()
+
+    if load_error:
+        st.error(load_error)
+        st.stop()  # Para a execução do app se o carregamento ou a validação falharem
+
+    # Se as regras mudaram desde a última execução, os resultados antigos não valem mais
+    if st.session_state.rulebook_version != rulebook.version:
+        if st.session_state.rulebook_version is not None and rulebook.changes:
+            st.toast(
+                "A planilha de equivalências foi atualizada:\n\n"
+                + "\n".join(f"- {line}" for line in rulebook.changes.describe())
+            )
+        st.session_state.rulebook_version = rulebook.version
+        st.session_state.analysis_results = [] # Reseta os resultados
+        st.session_state.analysis_suggestions = {}
+        st.session_state.analysis_key = None
 
-    
-    # --- ETAPA 2 e 3: SELEÇÃO DA UNIVERSIDADE E ENTRADA DOS CÓDIGOS ---
+    # Com ANALYSIS_HISTORY_DB no .env, as análises ficam registradas em disco
+    history = get_analysis_history()
 
-    #TODO botar nome aluno
+    # --- ETAPA 2 e 3: SELEÇÃO DA UNIVERSIDADE E ENTRADA DOS CÓDIGOS ---
 
     # Esta lógica permanece a mesma. 
     # Ela só vai rodar se a 'ETAPA 1' for bem-sucedida.
-    if st.session_state.spreadsheet_data:
+    if rulebook:
         st.subheader("Selecione a Universidade e Insira os Códigos")
         
         col1, col2 = st.columns([1, 2])
@@ -80,7 +112,7 @@ def main():
         #TODO testar visualização em colunas
         with col1:
             st.markdown("**Universidade de Origem**")
-            university_list = get_university_list(st.session_state.spreadsheet_data)
+            university_list = rulebook.universities
             selected_university = st.selectbox(
                 "Universidade de Origem",
                 options=university_list,
@@ -96,14 +128,44 @@ def main():
             )
             st.caption("Separe os códigos por espaço, vírgula ou quebra de linha.")
 
+        if history is not None:
+            col_dre, col_name = st.columns([1, 2])
+            with col_dre:
+                student_dre = st.text_input("DRE do Aluno")
+            with col_name:
+                student_name = st.text_input("Nome do Aluno")
+
     # --- ETAPA 4: BOTÃO DE ANÁLISE ---
         if st.button("Analisar Equivalências", type="primary", use_container_width=True):
             if course_codes_input.strip():
                 with st.spinner("Buscando equivalências..."):
-                    st.session_state.analysis_results = find_equivalencies(
-                        st.session_state.spreadsheet_data,
+                    analyse = lambda: find_equivalencies(rulebook, selected_university, course_codes_input)
+                    if history is not None:
+                        # Um pedido idêntico (mesma universidade, códigos e regras da aba) reaproveita a
+                        # análise guardada; mudanças em outras abas da planilha não a invalidam
+                        (
+                            st.session_state.analysis_key,
+                            st.session_state.analysis_results,
+                            st.session_state.analysis_from_history
+                        ) = history.get_or_analyse(
+                            selected_university,
+                            normalize_codes(course_codes_input),
+                            rulebook.sheet_version(selected_university),
+                            analyse,
+                            dre=student_dre,
+                            student_name=student_name
+                        )
+                    else:
+                        st.session_state.analysis_results = analyse()
+                    # "Você quis dizer...?" para os códigos que não casaram com nenhuma regra
+                    st.session_state.analysis_suggestions = find_suggestions(
+                        rulebook,
                         selected_university,
-                        course_codes_input
+                        [
+                            result["input_code"]
+                            for result in st.session_state.analysis_results
+                            if result.get("status") == "Não Encontrado na Planilha"
+                        ]
                     )
             else:
                 st.warning("Por favor, insira pelo menos um código de disciplina para analisar.")
@@ -111,8 +173,15 @@ def main():
     # --- ETAPA 5: EXIBIÇÃO DOS RESULTADOS ---
     if st.session_state.analysis_results:
         st.markdown("---")
-         
-        has_not_found = report_card_compact(st.session_state.analysis_results)
+
+        if history is not None and st.session_state.analysis_from_history:
+            st.caption("📚 Análise idêntica já registrada no histórico: resultados reaproveitados.")
+
+        with span("report_card_compact", rows=len(st.session_state.analysis_results)):
+            has_not_found = report_card_compact(
+                st.session_state.analysis_results,
+                st.session_state.analysis_suggestions
+            )
 
         st.markdown("---")
 
@@ -121,10 +190,22 @@ def main():
             st.subheader("Gerar Relatório")
             st.success("Todas as disciplinas foram encontradas! Você já pode gerar o relatório.")
 
-            pdf_bytes = create_pdf_bytes(st.session_state.analysis_results, LOGO_PATH)
+            # O PDF só é gerado quando o botão é clicado, e reaproveitado enquanto os
+            # resultados e as regras forem os mesmos; os demais reruns não o recriam
+            results = st.session_state.analysis_results
+            report_key = report_fingerprint(results, rulebook.version)
+            build_report = lambda: get_report_cache().get_or_create(
+                report_key, lambda: create_pdf_bytes(results, LOGO_PATH)
+            )
+            analysis_key = st.session_state.analysis_key
+            if history is not None and analysis_key is not None:
+                # O PDF fica guardado junto da análise: pedidos idênticos o baixam sem gerar de novo
+                report = lambda: history.get_or_create_report(analysis_key, build_report)
+            else:
+                report = build_report
             st.download_button(
                 label="Baixar Relatório em PDF",
-                data=pdf_bytes,
+                data=report,
                 file_name="relatorio_equivalencia.pdf",
                 mime="application/pdf",
                 use_container_width=True
@@ -133,6 +214,14 @@ def main():
         else:
             st.error("⚠️ **Atenção:** Algumas disciplinas não foram encontradas na planilha. O relatório final não pode ser gerado até que todas as disciplinas sejam verificadas manualmente ou os códigos corrigidos.")
 
+    # --- BUSCA EM TODAS AS UNIVERSIDADES ---
+    st.markdown("---")
+    render_discipline_search(rulebook)
+
+    if history is not None:
+        st.markdown("---")
+        render_analysis_history(history, rulebook.universities)
+
 
 if __name__ == "__main__":
     main()
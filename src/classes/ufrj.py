@@ -12,8 +12,36 @@ class UFRJ:
     Atributos:
         equivalences (dict): Um dicionário carregado de um arquivo JSON
                              contendo as regras de equivalência de disciplinas.
+        PARSER_VERSION (str): Versão da extração do BOA, usada na chave do
+                              ParsedPDFCache. Altere sempre que a extração mudar.
     """
 
+    PARSER_VERSION = "boa-1"
+
+    # Campos do cabeçalho do BOA. Cada padrão captura o valor no grupo com o nome do campo.
+    # O nome é lido dentro de um lookahead para não consumir o início do campo seguinte.
+    HEADER_PATTERNS = {
+        "nome_aluno": r"Emissão(?=\n\s*(?P<nome_aluno>[A-Z\s]+))",
+        "periodos_integralizados": r"Períodos Integralizados \(RES 10/2004 - CEG\):\s*(?P<periodos_integralizados>[\d.]+)",
+        "prazo_maximo": r"Prazo máximo de integralização:\s*(?P<prazo_maximo>[\d.]+)",
+        "carga_horaria_obtida": r"Carga horária obtida acumulada:\s*(?P<carga_horaria_obtida>[\d.]+)",
+        "creditos_obtidos": r"Créditos obtidos acumulados:\s*(?P<creditos_obtidos>[\d.]+)",
+        "cr_acumulado": r"CR acumulado:\s*(?P<cr_acumulado>[\d.]+)",
+        "carga_horaria_extensao": r"Carga horária acumulada extensão:\s*(?P<carga_horaria_extensao>[\d.]+)"
+    }
+    HEADER_PATTERN = re.compile("|".join(HEADER_PATTERNS.values()))
+
+    # Padrão para encontrar linhas que representam matérias aprovadas
+    # Procura por um código, seguido de qualquer texto, e terminando com uma nota numérica.
+    APPROVED_PATTERN = re.compile(
+        r"^([A-Z]{3}\d{3,})\s+.*?\s+[\d\.]+\s*$",
+        re.MULTILINE
+    )
+    CODES_TO_EXCLUDE = frozenset({"ICPZ55", "ICPX06"})
+
+    # Linhas não vazias do fim de uma página repassadas à seguinte (uma disciplina ocupa até 3 linhas)
+    CARRY_LINES = 2
+
     def __init__(self, equivalences_json_path: str):
         """
         Inicializa o processador da UFRJ.
@@ -46,7 +74,7 @@ class UFRJ:
             print(f"⚠️ Erro: O arquivo '{json_path}' não é um JSON válido.")
             return {}
 
-    def extract_student_data(self, pdf_path: str) -> Dict[str, Any]:
+    def extract_student_data(self, pdf_path: str, cache=None) -> Dict[str, Any]:
         """
         Extrai todos os dados relevantes do aluno de um arquivo BOA (PDF).
 
@@ -55,66 +83,97 @@ class UFRJ:
 
         Args:
             pdf_path (str): O caminho para o arquivo PDF do BOA.
+            cache (ParsedPDFCache, opcional): Se informado, um BOA com conteúdo
+                idêntico a um já processado é respondido sem abrir o PDF.
 
         Returns:
             Um dicionário contendo os dados do aluno e a lista de matérias
             aprovadas. Retorna um dicionário de erro se o processamento falhar.
         """
+        if cache is not None:
+            return cache.get_or_parse(pdf_path, self.PARSER_VERSION, self._extract_student_data)
+        return self._extract_student_data(pdf_path)
+
+    def _extract_student_data(self, pdf_path: str) -> Dict[str, Any]:
+        """
+        Extrai os dados do BOA com o pdfplumber (sem cache).
+
+        O BOA é processado página a página, sem montar o texto completo: o
+        cabeçalho é procurado com um único padrão combinado até todos os campos
+        aparecerem, e as disciplinas aprovadas são coletadas à medida que as
+        páginas são lidas. As últimas linhas de cada página são repassadas à
+        seguinte, para que um campo ou uma disciplina quebrados na virada de
+        página continuem sendo reconhecidos.
+        """
         try:
-            full_text = ""
+            extracted_data: Dict[str, Any] = {}
+            approved_courses_set: Set[str] = set()
+            carry = ""
+
             with pdfplumber.open(pdf_path) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
-                    if page_text:
-                        full_text += page_text + "\n"
-
-            # 1. Extrair dados acadêmicos (CR, Períodos, etc.)
-            patterns = {
-                "nome_aluno": r"Emissão\n\s*([A-Z\s]+)",
-                "periodos_integralizados": r"Períodos Integralizados \(RES 10/2004 - CEG\):\s*([\d.]+)",
-                "prazo_maximo": r"Prazo máximo de integralização:\s*([\d.]+)",
-                "carga_horaria_obtida": r"Carga horária obtida acumulada:\s*([\d.]+)",
-                "creditos_obtidos": r"Créditos obtidos acumulados:\s*([\d.]+)",
-                "cr_acumulado": r"CR acumulado:\s*([\d.]+)",
-                "carga_horaria_extensao": r"Carga horária acumulada extensão:\s*([\d.]+)"
-            }
+                    # Libera os objetos da página já lida; a memória não cresce com o número de páginas
+                    page.close()
+                    if not page_text:
+                        continue
+                    text = carry + page_text + "\n"
+
+                    # 1. Extrair dados acadêmicos (CR, Períodos, etc.), até encontrar todos
+                    if len(extracted_data) < len(self.HEADER_PATTERNS):
+                        self._scan_header(text, extracted_data)
+
+                    # 2. Extrair as matérias aprovadas desta página
+                    last_end = 0
+                    for match in self.APPROVED_PATTERN.finditer(text):
+                        course_code = match.group(1).upper()
+                        if course_code not in self.CODES_TO_EXCLUDE:
+                            approved_courses_set.add(course_code)
+                        last_end = match.end()
+
+                    # Repassa o fim da página que nenhuma disciplina consumiu
+                    carry = text[max(last_end, self._tail_start(text)):]
+
+            # Campos não encontrados ficam como None
+            header = {key: extracted_data.get(key) for key in self.HEADER_PATTERNS}
 
-            extracted_data = {}
-            for key, regex in patterns.items():
-                match = re.search(regex, full_text)
-                if match:
-                    value = match.group(1).strip()
-                    if key == "nome_aluno":
-                        extracted_data[key] = value.title()
-                    else:
-                        extracted_data[key] = float(value)
-                else:
-                    extracted_data[key] = None # Usa None para indicar que não foi encontrado
-
-            # 2. Extrair todas as matérias aprovadas
-            approved_courses_set: Set[str] = set()
-            codes_to_exclude: Set[str] = {"ICPZ55", "ICPX06"}
-            
-            # Padrão para encontrar linhas que representam matérias aprovadas
-            # Procura por um código, seguido de qualquer texto, e terminando com uma nota numérica.
-            approved_pattern = re.compile(
-                r"^([A-Z]{3}\d{3,})\s+.*?\s+[\d\.]+\s*$",
-                re.MULTILINE
-            )
-
-            matches = approved_pattern.findall(full_text)
-            for course_code in matches:
-                if course_code.upper() not in codes_to_exclude:
-                    approved_courses_set.add(course_code.upper())
-            
             # 3. Combinar todos os dados em um relatório final
-            extracted_data["approved_courses"] = sorted(list(approved_courses_set))
+            header["approved_courses"] = sorted(approved_courses_set)
 
-            return extracted_data
+            return header
 
         except Exception as e:
             return {"error": f"Ocorreu um erro ao processar o PDF: {e}"}
 
+    @classmethod
+    def _tail_start(cls, text: str) -> int:
+        """
+        Posição onde começam as últimas CARRY_LINES linhas não vazias do texto.
+        """
+        position = len(text)
+        remaining = cls.CARRY_LINES
+        while remaining and position > 0:
+            line_start = text.rfind("\n", 0, position - 1) + 1
+            if text[line_start:position].strip():
+                remaining -= 1
+            position = line_start
+        return position
+
+    def _scan_header(self, text: str, extracted_data: Dict[str, Any]) -> None:
+        """
+        Procura no texto os campos do cabeçalho ainda não encontrados, com um único padrão.
+
+        Vale a primeira ocorrência de cada campo, como nas buscas separadas de antes.
+        """
+        for match in self.HEADER_PATTERN.finditer(text):
+            key = match.lastgroup
+            if key in extracted_data:
+                continue
+            value = match.group(key).strip()
+            extracted_data[key] = value.title() if key == "nome_aluno" else float(value)
+            if len(extracted_data) == len(self.HEADER_PATTERNS):
+                break
+
 # --- Exemplo de Uso ---
 if __name__ == "__main__":
     # 1. Crie um arquivo chamado 'equivalencias_ufrj.json' com este conteúdo:
@@ -0,0 +1,309 @@
+# 1. Bibliotecas padrão (Standard Library)
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Optional
+
+# 2. Bibliotecas de terceiros (Third-party)
+import pandas as pd
+
+# 3. Módulos da sua aplicação (Local application)
+from core import LazyRuleBook, RuleBook, build_rulebook, find_equivalencies
+from data_loader import get_snapshot_dir, load_spreadsheet
+from pdf_generator import create_bundle_pdf_bytes, create_pdf_bytes
+from pdf_cache import ParsedPDFCache
+from pdf_parser import parse_equivalencia_pdf
+from rule_store import SQLiteRuleBook, read_store_meta
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_LOGO_PATH = os.path.join(PROJECT_ROOT, "assets", "logo_ic.png")
+
+# Estado de cada processo trabalhador, preenchido por _init_worker
+_worker_rulebook: Optional[RuleBook | LazyRuleBook] = None
+_worker_logo_path: Optional[str] = None
+_worker_parse_cache: Optional[ParsedPDFCache] = None
+
+
+def _init_worker(rulebook: RuleBook | LazyRuleBook, logo_path: Optional[str], parse_cache_path: Optional[str] = None) -> None:
+    """
+    Inicializa um processo trabalhador com o RuleBook já compilado pelo processo principal.
+    """
+    global _worker_rulebook, _worker_logo_path, _worker_parse_cache
+    _worker_rulebook = rulebook
+    _worker_logo_path = logo_path
+    _worker_parse_cache = ParsedPDFCache(parse_cache_path) if parse_cache_path else None
+
+
+def _normalize_name(name: str) -> str:
+    """
+    Reduz o nome de uma instituição a letras e dígitos minúsculos ("PUC - Rio" -> "pucrio").
+    """
+    return re.sub(r"[^0-9a-z]", "", str(name).casefold())
+
+
+def match_university(institution: Optional[str], universities: list[str]) -> Optional[str]:
+    """
+    Encontra a aba da planilha correspondente à instituição informada no requerimento.
+
+    Args:
+        institution (Optional[str]): Nome da instituição lido do PDF.
+        universities (list[str]): Nomes das universidades (abas) disponíveis.
+
+    Returns:
+        Optional[str]: O nome da aba correspondente ou None se nenhuma corresponder.
+    """
+    if not institution:
+        return None
+    wanted = _normalize_name(institution)
+    for university in universities:
+        if _normalize_name(university) == wanted:
+            return university
+    return None
+
+
+def codes_from_disciplines(disciplines: list[dict]) -> str:
+    """
+    Junta os códigos de origem das disciplinas do requerimento em uma única string.
+
+    Códigos compostos ("CTC4002 + INF1037") são separados, pois cada código é
+    consumido individualmente pelas regras da planilha.
+    """
+    codes = []
+    for discipline in disciplines:
+        origin_code = discipline.get("origin_discipline", {}).get("code") or ""
+        codes.extend(part.strip() for part in origin_code.split("+") if part.strip())
+    return " ".join(codes)
+
+
+def _json_safe(value: Any) -> Any:
+    """
+    Converte valores da planilha (NaN, tipos do numpy) em valores aceitos pelo JSON.
+    """
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    return str(value)
+
+
+def _analyse(
+    student_data: Dict[str, Any],
+    report_name: str,
+    output_dir: str,
+    university_override: Optional[str],
+    allow_incomplete: bool
+) -> Dict[str, Any]:
+    """
+    Busca as equivalências de um requerimento já lido e grava o relatório em PDF, se couber.
+    """
+    university = university_override or match_university(
+        student_data.get("origin_institution"), _worker_rulebook.universities
+    )
+    if university is None:
+        return {
+            "university": None,
+            "error": f"Instituição '{student_data.get('origin_institution')}' não corresponde a nenhuma aba da planilha."
+        }
+
+    results = find_equivalencies(_worker_rulebook, university, codes_from_disciplines(student_data["disciplines"]))
+    not_found = [r["input_code"] for r in results if r.get("status") == "Não Encontrado na Planilha"]
+    analysis = {"university": university, "results": results, "not_found": not_found}
+
+    if not_found and not allow_incomplete:
+        # Mesma regra do app: o relatório só sai quando todas as disciplinas foram encontradas
+        analysis["status"] = "pendente"
+        return analysis
+
+    report_pdf = os.path.join(output_dir, f"{report_name}.pdf")
+    with open(report_pdf, "wb") as f:
+        f.write(create_pdf_bytes(results, _worker_logo_path))
+    analysis["report_pdf"] = report_pdf
+    analysis["status"] = "ok"
+    return analysis
+
+
+def process_requerimento(
+    pdf_path: str,
+    output_dir: str,
+    university_override: Optional[str] = None,
+    allow_incomplete: bool = False
+) -> Dict[str, Any]:
+    """
+    Processa UM requerimento: lê o PDF, busca as equivalências e grava o relatório.
+
+    Executado dentro de um processo trabalhador; usa o RuleBook de _init_worker.
+
+    Args:
+        pdf_path (str): Caminho do PDF de requerimento.
+        output_dir (str): Diretório onde o relatório (.pdf) e o resumo (.json) serão gravados.
+        university_override (Optional[str]): Aba a usar, ignorando a instituição do PDF.
+        allow_incomplete (bool): Gera o PDF mesmo se alguma disciplina não for encontrada.
+
+    Returns:
+        Dict[str, Any]: O resumo gravado no .json do aluno.
+    """
+    start = time.perf_counter()
+    summary: Dict[str, Any] = {"source_pdf": pdf_path, "status": "erro"}
+    # Os arquivos de saída levam o nome do PDF de entrada, único dentro do diretório
+    report_name = os.path.splitext(os.path.basename(pdf_path))[0]
+
+    student_data = parse_equivalencia_pdf(pdf_path, cache=_worker_parse_cache)
+    if student_data is None:
+        summary["error"] = "Não foi possível ler o PDF do requerimento."
+    else:
+        summary["student"] = {key: value for key, value in student_data.items() if key != "disciplines"}
+        summary["disciplines"] = student_data["disciplines"]
+        summary.update(_analyse(student_data, report_name, output_dir, university_override, allow_incomplete))
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - start, 4)
+    summary = _json_safe(summary)
+    with open(os.path.join(output_dir, f"{report_name}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    return summary
+
+
+def load_rulebook(args: argparse.Namespace) -> Optional[RuleBook | LazyRuleBook]:
+    """
+    Carrega as regras indicadas na linha de comando (--workbook ou --rules-db).
+
+    Em caso de falha, a mensagem de erro é impressa no stderr e None é devolvido.
+    """
+    if args.rules_db:
+        if read_store_meta(args.rules_db) is None:
+            print(
+                f"ERRO: '{args.rules_db}' não é um banco de regras válido; importe a planilha com rule_store.py.",
+                file=sys.stderr
+            )
+            return None
+        # Cada processo trabalhador reabre o mesmo arquivo, somente leitura
+        return SQLiteRuleBook(args.rules_db)
+
+    spreadsheet_data = load_spreadsheet(args.workbook, get_snapshot_dir())
+    if spreadsheet_data is None:
+        print(f"ERRO: não foi possível ler a planilha '{args.workbook}'.", file=sys.stderr)
+        return None
+    rulebook = build_rulebook(spreadsheet_data)
+    if not rulebook:
+        print("ERRO: nenhuma aba da planilha contém as colunas obrigatórias.", file=sys.stderr)
+        return None
+    return rulebook
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Processa em lote os PDFs de requerimento de equivalência, sem a interface Streamlit."
+    )
+    parser.add_argument("input_dir", help="Diretório com os PDFs de requerimento.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--workbook", help="Planilha .xlsx com as regras de equivalência.")
+    source.add_argument(
+        "--rules-db",
+        help="Banco SQLite importado da planilha (veja rule_store.py), no lugar de --workbook."
+    )
+    parser.add_argument("--output-dir", required=True, help="Diretório de saída dos relatórios e resumos.")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Número de processos trabalhadores (padrão: número de CPUs)."
+    )
+    parser.add_argument("--university", help="Força a aba da planilha, ignorando a instituição do PDF.")
+    parser.add_argument("--logo", default=DEFAULT_LOGO_PATH, help="Logo usado no cabeçalho dos relatórios.")
+    parser.add_argument(
+        "--parse-cache",
+        help="Arquivo SQLite para reaproveitar a leitura de PDFs idênticos entre execuções."
+    )
+    parser.add_argument(
+        "--bundle",
+        help="Também grava, neste caminho, um PDF consolidado com todos os relatórios gerados."
+    )
+    parser.add_argument(
+        "--allow-incomplete", action="store_true",
+        help="Gera o relatório mesmo quando alguma disciplina não é encontrada na planilha."
+    )
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    rulebook = load_rulebook(args)
+    if rulebook is None:
+        return 2
+    if args.university and args.university not in rulebook:
+        print(f"ERRO: a aba '{args.university}' não existe na planilha.", file=sys.stderr)
+        return 2
+
+    pdf_paths = sorted(
+        os.path.join(args.input_dir, name)
+        for name in os.listdir(args.input_dir)
+        if name.lower().endswith(".pdf")
+    )
+    if not pdf_paths:
+        print(f"Nenhum PDF encontrado em '{args.input_dir}'.")
+        return 0
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.parse_cache:
+        # Cria o banco antes de iniciar os processos, para que não disputem a criação das tabelas
+        ParsedPDFCache(args.parse_cache)
+    logo_path = args.logo if args.logo and os.path.exists(args.logo) else None
+
+    start = time.perf_counter()
+    status_count: Dict[str, int] = {}
+    reported: Dict[str, Dict[str, Any]] = {}
+    with ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        initializer=_init_worker,
+        initargs=(rulebook, logo_path, args.parse_cache)
+    ) as executor:
+        futures = {
+            executor.submit(
+                process_requerimento, pdf_path, args.output_dir, args.university, args.allow_incomplete
+            ): pdf_path
+            for pdf_path in pdf_paths
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {"status": "erro", "error": str(e)}
+            status = summary["status"]
+            if status == "ok":
+                reported[pdf_path] = summary
+            status_count[status] = status_count.get(status, 0) + 1
+            detail = summary.get("error") or summary.get("report_pdf") or ", ".join(summary.get("not_found", []))
+            print(f"[{status}] {os.path.basename(pdf_path)}: {detail}")
+
+    elapsed = time.perf_counter() - start
+    totals = ", ".join(f"{status}: {count}" for status, count in sorted(status_count.items()))
+    print(f"\n{len(pdf_paths)} requerimento(s) em {elapsed:.1f}s com {args.workers} processo(s) ({totals}).")
+    if args.bundle and reported:
+        students = [
+            {**reported[pdf_path].get("student", {}), "university": reported[pdf_path]["university"],
+             "results": reported[pdf_path]["results"]}
+            for pdf_path in sorted(reported)
+        ]
+        with open(args.bundle, "wb") as f:
+            f.write(create_bundle_pdf_bytes(students, logo_path, max_workers=args.workers))
+        print(f"Consolidado com {len(students)} aluno(s) gravado em '{args.bundle}'.")
+
+    if args.parse_cache:
+        stats = ParsedPDFCache(args.parse_cache).stats()
+        print(
+            f"Cache de PDFs: {stats['hits']} acerto(s), {stats['misses']} falha(s), "
+            f"{stats['entries']} entrada(s), {stats['size_bytes'] / 1024:.0f} KiB."
+        )
+    return 1 if status_count.get("erro") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,7 @@
 from .sidebar import render_sidebar
 from .header import render_header
 from .report_card import report_card_compact
-from .spreadsheet_uploader import render_spreadsheet_uploader, load_data_from_url, validate_spreadsheet_data
\ No newline at end of file
+from .spreadsheet_uploader import render_spreadsheet_uploader, load_shared_rulebook, validate_spreadsheet_data
+from .debug_panel import render_timing_panel
+from .discipline_search import render_discipline_search
+from .analysis_history import get_analysis_history, render_analysis_history
@@ -0,0 +1,79 @@
+import io
+import os
+from datetime import datetime
+from typing import Optional
+
+import streamlit as st
+from pandas import DataFrame
+
+from analysis_history import AnalysisHistory
+
+
+@st.cache_resource
+def get_analysis_history() -> Optional[AnalysisHistory]:
+    """
+    Devolve o histórico de análises do processo, configurado em ANALYSIS_HISTORY_DB no .env.
+
+    Returns:
+        Optional[AnalysisHistory]: O histórico, ou None se ele não estiver habilitado.
+    """
+    db_path = os.getenv("ANALYSIS_HISTORY_DB")
+    return AnalysisHistory(db_path) if db_path else None
+
+
+def render_analysis_history(history: AnalysisHistory, universities: list[str]):
+    """
+    Renderiza a consulta ao histórico de análises, com filtros por DRE e
+    universidade e a exportação em CSV para a ata da comissão.
+
+    Args:
+        history (AnalysisHistory): O histórico de análises.
+        universities (list[str]): Universidades oferecidas no filtro.
+    """
+    with st.expander("📚 Histórico de Análises"):
+        col1, col2 = st.columns(2)
+        with col1:
+            dre = st.text_input("Filtrar por DRE", key="history_dre").strip() or None
+        with col2:
+            university = st.selectbox(
+                "Filtrar por universidade",
+                options=[None, *universities],
+                format_func=lambda option: "Todas" if option is None else option,
+                key="history_university"
+            )
+
+        entries = history.list_requests(dre, university)
+        if not entries:
+            st.info("Nenhuma análise registrada com esses filtros.")
+            return
+
+        st.dataframe(
+            DataFrame([
+                {
+                    "Data": datetime.fromtimestamp(entry["requested_at"]).strftime("%d/%m/%Y %H:%M"),
+                    "DRE": entry["dre"] or "",
+                    "Aluno": entry["student_name"] or "",
+                    "Universidade": entry["university"],
+                    "Códigos": entry["codes"],
+                    "Disciplinas": len(entry["results"]),
+                }
+                for entry in entries
+            ]),
+            hide_index=True,
+            use_container_width=True
+        )
+
+        # O CSV só é montado quando o botão é clicado
+        def export() -> bytes:
+            buffer = io.StringIO()
+            history.export_csv(buffer, dre, university)
+            # BOM para o Excel reconhecer os acentos
+            return buffer.getvalue().encode("utf-8-sig")
+
+        st.download_button(
+            label="Exportar Histórico (CSV) para a Ata",
+            data=export,
+            file_name="historico_equivalencias.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
@@ -0,0 +1,38 @@
+import streamlit as st
+from pandas import DataFrame
+
+from timing import TimingRun
+
+
+def render_timing_panel(run: TimingRun):
+    """
+    Exibe na barra lateral o tempo de cada etapa da última execução do app.
+
+    As etapas aparecem na ordem em que começaram, recuadas conforme o
+    aninhamento (ex.: a leitura da planilha dentro de load_shared_rulebook).
+    Só é chamada quando a medição está ligada (STAGE_TIMING=1 no .env).
+
+    Args:
+        run (TimingRun): A execução cujas etapas serão exibidas.
+    """
+    spans = sorted(run.spans, key=lambda span: span["start_ms"])
+    with st.sidebar:
+        st.markdown("---")
+        with st.expander("⏱️ Tempos da última execução"):
+            if not spans:
+                st.caption("Nenhuma etapa medida nesta execução.")
+                return
+            st.dataframe(
+                DataFrame([
+                    {
+                        # Espaços não separáveis, para que o recuo não seja removido na tabela
+                        "Etapa": "\u00a0\u00a0\u00a0" * span["depth"] + span["stage"],
+                        "Tempo (ms)": span["duration_ms"],
+                        "Status": span["status"],
+                    }
+                    for span in spans
+                ]),
+                hide_index=True,
+                use_container_width=True
+            )
+            st.caption(f"Total: {run.total_ms:.1f} ms · execução {run.run_id}")
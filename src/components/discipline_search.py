@@ -0,0 +1,84 @@
+import streamlit as st
+from pandas import DataFrame
+
+from core import find_by_destination, search_disciplines
+from .report_card import get_clean_value
+
+# Quantas regras exibir na tabela de uma busca
+MAX_DISPLAYED_RESULTS = 200
+
+
+def _render_rules_table(results: list[dict], empty_message: str):
+    """
+    Exibe as regras encontradas em uma tabela, com as universidades que as têm.
+
+    Args:
+        results (list[dict]): Regras no formato de core.search_disciplines / core.find_by_destination.
+        empty_message (str): Mensagem exibida quando nenhuma regra foi encontrada.
+    """
+    if not results:
+        st.info(empty_message)
+        return
+
+    universities = list(dict.fromkeys(result["university"] for result in results))
+    st.caption(
+        f"{len(results)} regra(s) em {len(universities)} universidade(s): {', '.join(universities)}"
+    )
+    # As células viram texto: a planilha mistura números e textos na mesma coluna
+    st.dataframe(
+        DataFrame([
+            {
+                "Universidade": result["university"],
+                "Códigos Origem": get_clean_value(result["origin_codes"], ""),
+                "Nomes Origem": get_clean_value(result["origin_names"], ""),
+                "Equivalente?": get_clean_value(result["is_equivalent"], ""),
+                "Códigos UFRJ": get_clean_value(result["dest_codes"], ""),
+                "Nomes UFRJ": get_clean_value(result["dest_names"], ""),
+            }
+            for result in results[:MAX_DISPLAYED_RESULTS]
+        ]),
+        hide_index=True,
+        use_container_width=True
+    )
+    if len(results) > MAX_DISPLAYED_RESULTS:
+        st.caption(f"Exibindo as primeiras {MAX_DISPLAYED_RESULTS} regras; refine a busca para ver as demais.")
+
+
+def render_discipline_search(rulebook):
+    """
+    Renderiza a consulta de precedentes em todas as universidades da planilha.
+
+    A aba "Buscar disciplina" responde perguntas como "quais universidades já têm
+    parecer para Cálculo I?" sem precisar selecionar cada aba; a aba "Por código
+    UFRJ" lista tudo o que já foi analisado para um código de destino (ex.: MAB120).
+    Ambas usam índices do RuleBook, montados uma única vez por versão da planilha.
+
+    Args:
+        rulebook (RuleBook | LazyRuleBook): As regras da planilha atual.
+    """
+    st.subheader("Consultar Precedentes em Todas as Universidades")
+    search_tab, destination_tab = st.tabs(["Buscar disciplina", "Por código UFRJ"])
+
+    with search_tab:
+        query = st.text_input(
+            "Buscar disciplina",
+            placeholder="Nome ou código, de origem ou da UFRJ (ex.: Cálculo I, MAC118)",
+            label_visibility="collapsed"
+        )
+        if query.strip():
+            _render_rules_table(
+                search_disciplines(rulebook, query),
+                "Nenhuma regra da planilha corresponde à busca."
+            )
+
+    with destination_tab:
+        dest_code = st.text_input(
+            "Código UFRJ de destino",
+            placeholder="Código UFRJ de destino (ex.: MAB120)",
+            label_visibility="collapsed"
+        )
+        if dest_code.strip():
+            _render_rules_table(
+                find_by_destination(rulebook, dest_code),
+                f"Nenhuma regra da planilha tem `{dest_code.strip().upper()}` como destino."
+            )
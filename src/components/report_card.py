@@ -1,6 +1,20 @@
+import math
+import os
+
 import pandas as pd
 import streamlit as st
 
+# Modos de exibição do relatório (variável REPORT_CARD_MODE no .env):
+# "cartoes" mostra cada disciplina em colunas, com a justificativa logo abaixo;
+# "tabela" mostra uma tabela paginada por grupo, com os detalhes da linha selecionada;
+# "automatico" (o padrão) usa cartões até TABLE_MODE_THRESHOLD resultados e tabelas acima disso.
+REPORT_MODE_CARDS = "cartoes"
+REPORT_MODE_TABLE = "tabela"
+REPORT_MODE_AUTO = "automatico"
+TABLE_MODE_THRESHOLD = 20
+# Linhas por página de cada tabela
+TABLE_PAGE_SIZE = 25
+
 
 def get_clean_value(value: any, placeholder: str = "Não preenchido") -> str:
     """
@@ -22,7 +36,109 @@ def get_clean_value(value: any, placeholder: str = "Não preenchido") -> str:
     return str_value
 
 
-def report_card_compact(results: list) -> bool:
+def get_report_mode(result_count: int, mode: str | None = None) -> str:
+    """
+    Resolve o modo de exibição (REPORT_MODE_CARDS ou REPORT_MODE_TABLE) para a quantidade de resultados.
+
+    Args:
+        result_count (int): Quantidade de resultados da análise.
+        mode (str | None): Modo pedido; se None, vale REPORT_CARD_MODE (padrão: automático).
+    """
+    mode = (mode or os.getenv("REPORT_CARD_MODE") or REPORT_MODE_AUTO).lower()
+    if mode in (REPORT_MODE_CARDS, REPORT_MODE_TABLE):
+        return mode
+    return REPORT_MODE_TABLE if result_count > TABLE_MODE_THRESHOLD else REPORT_MODE_CARDS
+
+
+def _rule_rows(items: list) -> pd.DataFrame:
+    """
+    Monta a tabela de um grupo já com os valores limpos, uma única vez por item.
+    """
+    return pd.DataFrame(
+        [
+            {
+                "Código Origem": get_clean_value(item.get('origin_codes'), ""),
+                "Nome Origem": get_clean_value(item.get('origin_names'), ""),
+                "Código UFRJ": get_clean_value(item.get('dest_codes'), ""),
+                "Nome UFRJ": get_clean_value(item.get('dest_names'), ""),
+                "Justificativa": get_clean_value(item.get('justification'), ""),
+            }
+            for item in items
+        ],
+        columns=["Código Origem", "Nome Origem", "Código UFRJ", "Nome UFRJ", "Justificativa"]
+    )
+
+
+def _not_found_rows(items: list, suggestions: dict | None) -> pd.DataFrame:
+    """
+    Monta a tabela dos códigos não encontrados, com as sugestões de cada um em uma coluna.
+    """
+    rows = []
+    for item in items:
+        input_code = item.get('input_code')
+        code_suggestions = (suggestions or {}).get(input_code) or []
+        rows.append({
+            "Código": input_code,
+            "Você quis dizer...?": "; ".join(
+                f"{get_clean_value(suggestion.get('origin_codes'), '')} → "
+                f"{get_clean_value(suggestion.get('dest_codes'), '')} "
+                f"({suggestion.get('similarity', 0):.0%})"
+                for suggestion in code_suggestions
+            ),
+        })
+    return pd.DataFrame(rows, columns=["Código", "Você quis dizer...?"])
+
+
+def _render_table_page(table: pd.DataFrame, key: str, selectable: bool = False) -> list[int]:
+    """
+    Exibe uma página da tabela: os widgets criados não dependem do número de linhas.
+
+    Returns:
+        list[int]: Posições (na tabela inteira) das linhas selecionadas na página exibida.
+    """
+    pages = max(1, math.ceil(len(table) / TABLE_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        page = st.number_input(
+            f"Página (de {pages})", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page"
+        )
+    start = (page - 1) * TABLE_PAGE_SIZE
+    page_table = table.iloc[start:start + TABLE_PAGE_SIZE]
+    if not selectable:
+        st.dataframe(page_table, hide_index=True, use_container_width=True)
+        return []
+
+    selection = st.dataframe(
+        page_table,
+        hide_index=True,
+        use_container_width=True,
+        key=f"{key}_table",
+        on_select="rerun",
+        selection_mode="single-row"
+    )
+    # Uma seleção feita em outra página pode apontar além das linhas exibidas agora
+    return [start + row for row in selection.selection.rows if row < len(page_table)]
+
+
+def _render_rule_table(title: str, items: list, key: str, expanded: bool):
+    """
+    Exibe um grupo de regras (equivalentes ou não) como tabela paginada; a justificativa
+    completa da linha selecionada aparece abaixo da tabela.
+    """
+    with st.expander(f"{title} ({len(items)})", expanded=expanded):
+        table = _rule_rows(items)
+        selected_rows = _render_table_page(table, key, selectable=True)
+        if not selected_rows:
+            st.caption("Selecione uma linha para ver os detalhes.")
+            return
+        row = table.iloc[selected_rows[0]]
+        origin = row['Nome Origem'] or row['Código Origem'] or "Não preenchido"
+        destination = row['Nome UFRJ'] or row['Código UFRJ'] or "Não preenchido"
+        st.markdown(f"**Origem:** {origin} (`{row['Código Origem']}`) → **Destino (UFRJ):** {destination}")
+        st.info(f"**Justificativa:** {row['Justificativa'] or 'Não preenchido'}", icon="ℹ️")
+
+
+def report_card_compact(results: list, suggestions: dict | None = None, mode: str | None = None) -> bool:
     """
     Exibe um relatório de equivalência de matérias de forma compacta,
     agrupando os resultados por status em expanders.
@@ -30,6 +146,9 @@ def report_card_compact(results: list) -> bool:
 
     Args:
         results (list): Uma lista de dicionários com os detalhes da análise.
+        suggestions (dict | None): Regras parecidas com cada código não encontrado
+                                   (saída de core.find_suggestions), exibidas como "Você quis dizer...?".
+        mode (str | None): REPORT_MODE_CARDS, REPORT_MODE_TABLE ou REPORT_MODE_AUTO (padrão: REPORT_CARD_MODE).
     
     Returns:
         bool: True se todas as matérias foram encontradas, False caso contrário.
@@ -58,6 +177,19 @@ def report_card_compact(results: list) -> bool:
             elif status == "Não Encontrado na Planilha":
                 nao_encontrados.append(result)
 
+        # Com muitas disciplinas, uma tabela paginada por categoria substitui os cartões:
+        # o número de elementos enviados ao navegador deixa de crescer com os resultados
+        if get_report_mode(len(results), mode) == REPORT_MODE_TABLE:
+            if equivalentes:
+                _render_rule_table("✅ Matérias Equivalentes", equivalentes, "report_equivalentes", expanded=True)
+            if nao_equivalentes:
+                _render_rule_table("❌ Matérias Não Equivalentes", nao_equivalentes, "report_nao_equivalentes", expanded=False)
+            if nao_encontrados:
+                with st.expander(f"❓ Matérias Não Encontradas ({len(nao_encontrados)})", expanded=False):
+                    st.write("Os seguintes códigos não foram localizados na base de dados de equivalência:")
+                    _render_table_page(_not_found_rows(nao_encontrados, suggestions), "report_nao_encontrados")
+            return len(nao_encontrados) > 0
+
         # 2. Criar um expander para cada categoria, se não estiver vazia
         # Define um placeholder padrão para campos vazios
         PLACEHOLDER_TEXT = "Não preenchido"
@@ -124,6 +256,22 @@ def report_card_compact(results: list) -> bool:
                 st.write("Os seguintes códigos não foram localizados na base de dados de equivalência:")
                 st.warning(", ".join(codes))
 
+                # Sugestões de regras com código ou nome parecido (ex.: erro de digitação)
+                for item in nao_encontrados:
+                    input_code = item.get('input_code')
+                    code_suggestions = (suggestions or {}).get(input_code)
+                    if not code_suggestions:
+                        continue
+                    st.markdown(f"**Você quis dizer...?** (para `{input_code}`)")
+                    for suggestion in code_suggestions:
+                        origin_names = get_clean_value(suggestion.get('origin_names'), PLACEHOLDER_TEXT)
+                        origin_codes = get_clean_value(suggestion.get('origin_codes'), PLACEHOLDER_TEXT)
+                        dest_codes = get_clean_value(suggestion.get('dest_codes'), PLACEHOLDER_TEXT)
+                        st.caption(
+                            f"`{origin_codes}` {origin_names} → `{dest_codes}` "
+                            f"({suggestion.get('similarity', 0):.0%} de semelhança)"
+                        )
+
         # 3. Retornar o booleano com base na lista de 'nao_encontrados'
         return len(nao_encontrados) > 0
 
@@ -160,10 +308,19 @@ if __name__ == "__main__":
             "origin_names": "Cálculo I", "is_equivalent": "Sim", "dest_codes": "MAC118",
             "dest_names": "Cálculo Diferencial e Integral I", "justification": "Ementa compatível."
         },
-        {"input_code": "COMP123", "status": "Não Encontrado na Planilha"}
+        {"input_code": "CEX01", "status": "Não Encontrado na Planilha"}
     ]
+    sample_suggestions = {
+        "CEX01": [
+            {
+                "origin_codes": "CEX001", "origin_names": "Cálculo I", "is_equivalent": "Sim",
+                "dest_codes": "MAC118", "dest_names": "Cálculo Diferencial e Integral I",
+                "justification": "Ementa compatível.", "similarity": 0.667
+            }
+        ]
+    }
 
-    todas_encontradas_2 = report_card_compact(sample_results_some_not_found)
+    todas_encontradas_2 = report_card_compact(sample_results_some_not_found, sample_suggestions)
     st.write(f"**Resultado da verificação:** `todas_encontradas_2` é `{todas_encontradas_2}`")
 
     # Exemplo de como você pode usar o booleano em outra lógica
@@ -1,10 +1,22 @@
+import functools
 import os
-import pandas as pd
 from pandas import DataFrame
 from dotenv import load_dotenv
 import streamlit as st
-from typing import Tuple, Dict, Optional
-from data_loader import load_spreadsheet 
+from typing import Tuple, Optional
+from data_loader import (
+    get_snapshot_dir,
+    get_university_list_from_headers,
+    load_spreadsheet,
+    load_workbook_bytes,
+    read_sheet_headers,
+    read_single_sheet,
+    workbook_hash
+)
+from core import LazyRuleBook, RuleBook, RuleBookStore, build_rulebook
+from remote_workbook import RemoteWorkbook
+from rule_store import SQLiteRuleBook, import_rulebook, read_store_meta
+from timing import timed
 
 
 REQUIRED_COLUMNS = {
@@ -84,6 +96,7 @@ def render_spreadsheet_uploader():
 
 # Novas funcoes
 
+@timed()
 def validate_spreadsheet_data(spreadsheet_data: dict[str, DataFrame]) -> tuple[bool, str]:
     """
     Valida um DICIONÁRIO de dados de planilha já carregado.
@@ -116,43 +129,159 @@ def validate_spreadsheet_data(spreadsheet_data: dict[str, DataFrame]) -> tuple[b
         return False, error_message
 
 
-@st.cache_data(ttl=600) # Cache de 10 minutos
-def load_data_from_url() -> Tuple[Optional[str], Optional[Dict[str, DataFrame]]]:
+# Intervalo entre as revalidações da planilha remota. Como a revalidação é uma
+# requisição condicional feita em segundo plano, ela pode ser bem mais frequente
+# que o antigo ttl de 10 minutos do cache_data.
+RULEBOOK_REVALIDATE_SECONDS = 120
+
+# Com LAZY_SHEET_LOADING=1 no .env, só os cabeçalhos das abas são lidos no início
+# e cada universidade é carregada na primeira vez em que é selecionada.
+# LAZY_SHEET_CACHE_SIZE limita quantas universidades ficam compiladas em memória.
+DEFAULT_LAZY_SHEET_CACHE_SIZE = 8
+
+
+def _get_sheet_url() -> Optional[str]:
+    load_dotenv()
+    return os.getenv("PUBLIC_EXCEL_URL")
+
+
+@st.cache_resource
+def get_rulebook_store() -> RuleBookStore:
+    """
+    Devolve o RuleBookStore do processo. O st.cache_resource garante uma
+    única instância, compartilhada (sem cópias) por todas as sessões.
+    """
+    return RuleBookStore()
+
+
+@st.cache_resource
+def get_remote_workbook(sheet_url: str) -> RemoteWorkbook:
+    """
+    Devolve o RemoteWorkbook do processo para a URL, que guarda o ETag,
+    o Last-Modified e o hash da última versão baixada.
+    """
+    return RemoteWorkbook(sheet_url)
+
+
+def _build_rulebook(
+    workbook_bytes: bytes,
+    previous: Optional[RuleBook | LazyRuleBook] = None
+) -> Tuple[Optional[str], Optional[RuleBook | LazyRuleBook]]:
     """
-    Carrega uma planilha PÚBLICA (.xlsx) de uma URL do .env.
-    Lê TODAS as abas do arquivo Excel.
+    Valida a planilha e monta o RuleBook (completo, no modo preguiçoso, por aba, ou,
+    com RULES_DATABASE, servido pelo banco SQLite importado da planilha).
+
+    No modo completo, as regras em uso (previous) permitem recompilar só as abas
+    que mudaram; o RuleBook novo traz o resumo das mudanças em 'changes'.
 
     Retorna:
-        Tuple[Optional[str], Optional[Dict[str, DataFrame]]]:
-        (error_message, data_dict)
-        - (None, data_dict) em caso de sucesso.
-        - (error_message, None) em caso de falha.
+        Tuple[Optional[str], Optional[RuleBook | LazyRuleBook]]: (error_message, rulebook)
     """
-    load_dotenv()
-    
-    sheet_url = os.getenv("PUBLIC_EXCEL_URL")
-    
-    if not sheet_url:
-        msg = "Configuração incompleta: 'PUBLIC_EXCEL_URL' não está definida no seu arquivo .env."
-        return msg, None
+    rules_database = os.getenv("RULES_DATABASE")
+    if rules_database:
+        # Com RULES_DATABASE, as regras são servidas do banco SQLite. A planilha só é lida
+        # e importada quando mudou desde a última importação; senão o banco é aberto direto.
+        meta = read_store_meta(rules_database)
+        source_hash = workbook_hash(workbook_bytes)
+        if meta is None or meta.get("source_hash") != source_hash:
+            spreadsheet_data = load_workbook_bytes(workbook_bytes, get_snapshot_dir())
+            is_valid, validation_message = validate_spreadsheet_data(spreadsheet_data)
+            if not is_valid:
+                return validation_message, None
+            import_rulebook(build_rulebook(spreadsheet_data), rules_database, source_hash)
+        return None, SQLiteRuleBook(
+            rules_database,
+            max_loaded=int(os.getenv("LAZY_SHEET_CACHE_SIZE") or DEFAULT_LAZY_SHEET_CACHE_SIZE)
+        )
 
-    try:
-        # sheet_name=None carrega todas as abas em um dicionário
-        spreadsheet_data = pd.read_excel(
-            sheet_url, 
-            sheet_name=None, 
-            engine='openpyxl' # Requer que 'openpyxl' esteja instalado
+    if os.getenv("LAZY_SHEET_LOADING", "").lower() in ("1", "true", "sim"):
+        sheet_headers = read_sheet_headers(workbook_bytes)
+        # DataFrames vazios com as colunas de cada aba bastam para a validação
+        is_valid, validation_message = validate_spreadsheet_data(
+            {name: DataFrame(columns=columns) for name, columns in sheet_headers.items()}
         )
-        
-        if not spreadsheet_data:
-             return "Planilha carregada, mas está vazia (não contém abas).", None
-        
-        # Sucesso
-        return None, spreadsheet_data
-        
+        if not is_valid:
+            return validation_message, None
+        return None, LazyRuleBook(
+            get_university_list_from_headers(sheet_headers),
+            functools.partial(read_single_sheet, workbook_bytes),
+            version=workbook_hash(workbook_bytes)[:16],
+            max_loaded=int(os.getenv("LAZY_SHEET_CACHE_SIZE") or DEFAULT_LAZY_SHEET_CACHE_SIZE)
+        )
+
+    spreadsheet_data = load_workbook_bytes(workbook_bytes, get_snapshot_dir())
+    is_valid, validation_message = validate_spreadsheet_data(spreadsheet_data)
+    if not is_valid:
+        return validation_message, None
+    return None, build_rulebook(spreadsheet_data, previous if isinstance(previous, RuleBook) else None)
+
+
+def _refresh_rulebook(store: RuleBookStore, remote: RemoteWorkbook) -> Optional[str]:
+    """
+    Revalida a planilha e, somente se ela mudou, compila e publica um novo RuleBook.
+
+    Uma resposta 304, ou um conteúdo idêntico ao anterior, mantém as regras já
+    compiladas. Em caso de falha, as regras atuais (se houver) continuam em uso.
+
+    Returns:
+        Optional[str]: A mensagem de erro, ou None se a revalidação deu certo.
+    """
+    error_msg = None
+    try:
+        workbook_bytes = remote.fetch()
+        if workbook_bytes is not None:
+            error_msg, rulebook = _build_rulebook(workbook_bytes, store.current)
+            if rulebook is not None:
+                store.swap(rulebook)
     except Exception as e:
         error_msg = (
             f"Erro ao carregar a planilha da URL. Verifique o link no .env e se o "
             f"arquivo é um .xlsx válido. (Erro: {e})"
         )
-        return error_msg, None
+
+    if error_msg:
+        # Na próxima revalidação o conteúdo é baixado e verificado por completo
+        remote.forget()
+    store.last_error = error_msg
+    if store.current is not None:
+        store.touch()
+    return error_msg
+
+
+@timed()
+def load_shared_rulebook() -> Tuple[Optional[str], Optional[RuleBook | LazyRuleBook]]:
+    """
+    Devolve o RuleBook compartilhado, revalidando a planilha da URL periodicamente.
+
+    Apenas a primeira carga do processo bloqueia a sessão. Depois disso, quando
+    as regras passam de RULEBOOK_REVALIDATE_SECONDS, uma revalidação condicional
+    é disparada em segundo plano e a sessão segue com as regras atuais; se a
+    planilha tiver mudado, o novo RuleBook substitui o anterior de forma atômica.
+
+    Retorna:
+        Tuple[Optional[str], Optional[RuleBook | LazyRuleBook]]:
+        (error_message, rulebook)
+        - (None, rulebook) em caso de sucesso.
+        - (error_message, None) em caso de falha.
+    """
+    sheet_url = _get_sheet_url()
+    if not sheet_url:
+        msg = "Configuração incompleta: 'PUBLIC_EXCEL_URL' não está definida no seu arquivo .env."
+        return msg, None
+
+    store = get_rulebook_store()
+    remote = get_remote_workbook(sheet_url)
+
+    if store.current is None:
+        with store.reload_lock:
+            # Outra sessão pode ter feito a primeira carga enquanto esperávamos o lock
+            if store.current is None:
+                load_error = _refresh_rulebook(store, remote)
+                if load_error:
+                    return load_error, None
+        return None, store.current
+
+    if store.is_stale(RULEBOOK_REVALIDATE_SECONDS):
+        store.refresh_in_background(lambda s: _refresh_rulebook(s, remote))
+
+    return None, store.current
@@ -1,66 +1,1088 @@
+import hashlib
+import os
+import threading
+import time
+import weakref
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from types import MappingProxyType
+from typing import Any, NamedTuple, Optional
+
 import pandas as pd
 from pandas import DataFrame
 
+from data_loader import get_university_list
+from discipline_search import DisciplineIndex, SegmentedDisciplineIndex
+from suggestions import DEFAULT_SUGGESTIONS, TrigramIndex
+from timing import timed
+
+# Estratégias de aplicação das regras (variável RULE_MATCHING no .env):
+# "cobertura_maxima" escolhe a combinação de regras que cobre mais códigos do aluno;
+# "ordem_planilha" aplica as regras na ordem da planilha, como nas versões anteriores.
+MATCH_MAX_COVERAGE = "cobertura_maxima"
+MATCH_SHEET_ORDER = "ordem_planilha"
+
+# Limites da busca da cobertura máxima; acima deles vale a melhor combinação já encontrada
+MAX_SEARCH_CANDIDATES = 64
+MAX_SEARCH_NODES = 20_000
+
+# Colunas de uma aba que viram os campos de exibição de Rule, nesta ordem
+RULE_COLUMNS = (
+    'Códigos Origem',
+    'Nomes Origem',
+    'Equivalente?',
+    'Códigos UFRJ Destino',
+    'Nomes UFRJ Destino',
+    'Justificativa Parecer'
+)
+
+# Situação de uma aba na comparação entre duas versões da planilha (RuleBookChanges)
+SHEET_ADDED = "adicionada"
+SHEET_REMOVED = "removida"
+SHEET_MODIFIED = "alterada"
+
+
+class Rule(NamedTuple):
+    """
+    Registro compacto de uma regra (linha) da planilha de equivalências.
+
+    Os campos de exibição guardam os valores originais da planilha, sem
+    tratamento, exatamente como eram devolvidos pela versão com iterrows().
+    O campo 'required_codes' guarda os códigos de origem já normalizados.
+    """
+    origin_codes: Any
+    origin_names: Any
+    is_equivalent: Any
+    dest_codes: Any
+    dest_names: Any
+    justification: Any
+    required_codes: frozenset[str]
+
+    def as_result(self) -> dict:
+        """
+        Converte a regra no dicionário de resultado usado pela interface e pelo PDF.
+        """
+        return {
+            "status": "Encontrado",
+            "origin_codes": self.origin_codes,
+            "origin_names": self.origin_names,
+            "is_equivalent": self.is_equivalent,
+            "dest_codes": self.dest_codes,
+            "dest_names": self.dest_names,
+            "justification": self.justification
+        }
+
+
+class CompiledRules:
+    """
+    Regras de UMA universidade (aba), compiladas uma única vez.
+
+    Mantém as regras na ordem da planilha e um índice invertido que mapeia
+    cada código de origem normalizado para as posições das regras que o citam.
+    Assim, uma consulta só visita as regras alcançáveis a partir dos códigos
+    informados, em vez de percorrer a aba inteira. O índice reverso
+    'dest_index' faz o mesmo a partir dos códigos UFRJ de destino.
+
+    O índice de trigramas usado nas sugestões ("você quis dizer") só é montado
+    na primeira vez em que uma sugestão é pedida.
+    """
+    __slots__ = ("rules", "index", "dest_index", "_suggestion_index")
+
+    def __init__(
+        self,
+        rules: tuple[Rule, ...],
+        index: Mapping[str, tuple[int, ...]],
+        dest_index: Mapping[str, tuple[int, ...]]
+    ):
+        self.rules = rules
+        self.index = index
+        self.dest_index = dest_index
+        self._suggestion_index: Optional[TrigramIndex] = None
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def suggest(self, code: str, k: int = DEFAULT_SUGGESTIONS) -> list[tuple[float, Rule]]:
+        """
+        Devolve as k regras cujos códigos ou nomes de origem mais se parecem com o código.
+
+        Returns:
+            list[tuple[float, Rule]]: Pares (similaridade entre 0 e 1, regra), do mais parecido ao menos.
+        """
+        suggestion_index = self._suggestion_index
+        if suggestion_index is None:
+            # Montagem idempotente: se duas sessões montarem ao mesmo tempo, qualquer uma serve
+            suggestion_index = self._suggestion_index = TrigramIndex(
+                [rule.required_codes for rule in self.rules],
+                [rule.origin_names for rule in self.rules]
+            )
+        return [(similarity, self.rules[rule_pos]) for similarity, rule_pos in suggestion_index.search(code, k)]
+
+    def match(self, input_codes: set[str] | frozenset[str]) -> tuple[list[Rule], set[str]]:
+        """
+        Aplica as regras aos códigos informados, na ordem da planilha.
+
+        Uma regra só é acionada se TODOS os seus códigos estiverem entre os
+        códigos ainda disponíveis; os códigos usados são então consumidos e
+        não podem acionar outra regra.
+
+        Args:
+            input_codes (set[str] | frozenset[str]): Códigos de entrada já normalizados.
+                                O conjunto recebido não é alterado.
+
+        Returns:
+            tuple[list[Rule], set[str]]: (regras acionadas, códigos que sobraram).
+        """
+        candidates = {
+            rule_pos
+            for code in input_codes
+            for rule_pos in self.index.get(code, ())
+        }
+
+        remaining = set(input_codes)
+        matched = []
+        # sorted() preserva a ordem da planilha, que define a prioridade das regras
+        for rule_pos in sorted(candidates):
+            rule = self.rules[rule_pos]
+            if rule.required_codes <= remaining:
+                matched.append(rule)
+                remaining -= rule.required_codes
+
+        return matched, remaining
+
+    def match_max_coverage(
+        self,
+        input_codes: set[str] | frozenset[str],
+        max_nodes: int = MAX_SEARCH_NODES
+    ) -> tuple[list[Rule], set[str]]:
+        """
+        Escolhe as regras que, juntas, cobrem o MAIOR número de códigos informados.
+
+        Com regras compostas, a aplicação na ordem da planilha pode deixar códigos
+        de fora: se "MAT101 + MAT102" vier antes de "MAT101" e "MAT102 + MAT103",
+        o aluno com os três códigos fica com MAT103 sem regra. Aqui cada regra
+        aplicável vira uma máscara de bits sobre os códigos do aluno e uma busca
+        em profundidade, com poda pelo limite superior de cobertura, procura a
+        combinação de regras disjuntas que cobre mais códigos.
+
+        Entre combinações com a mesma cobertura, vence a que usa as regras mais
+        acima na planilha; por isso, quando a ordem da planilha já é ótima, o
+        resultado é exatamente o de match(). A busca parte do resultado de
+        match() e, se passar de max_nodes nós ou de MAX_SEARCH_CANDIDATES regras
+        aplicáveis, devolve a melhor combinação encontrada até ali.
+
+        Args:
+            input_codes (set[str] | frozenset[str]): Códigos de entrada já normalizados.
+            max_nodes (int): Limite de nós visitados pela busca.
+
+        Returns:
+            tuple[list[Rule], set[str]]: (regras acionadas, códigos que sobraram).
+        """
+        bit_of = {code: 1 << i for i, code in enumerate(sorted(input_codes))}
+        positions: list[int] = []
+        masks: list[int] = []
+        seen_masks = set()
+        for rule_pos in sorted({pos for code in input_codes for pos in self.index.get(code, ())}):
+            required = self.rules[rule_pos].required_codes
+            if not required <= input_codes:
+                continue
+            mask = 0
+            for code in required:
+                mask |= bit_of[code]
+            # Uma regra com os mesmos códigos de outra mais acima nunca seria preferida
+            if mask not in seen_masks:
+                seen_masks.add(mask)
+                positions.append(rule_pos)
+                masks.append(mask)
+
+        # Ponto de partida: a aplicação na ordem da planilha (a mesma de match())
+        used = 0
+        best = []
+        for i, mask in enumerate(masks):
+            if not mask & used:
+                best.append(i)
+                used |= mask
+        best_cover = used.bit_count()
+        full_cover = (1 << len(bit_of)) - 1
+
+        n = len(masks)
+        if used != full_cover and 1 < n <= MAX_SEARCH_CANDIDATES:
+            # suffix_union[i]: códigos alcançáveis pelas regras i, i+1, ...
+            suffix_union = [0] * (n + 1)
+            for i in range(n - 1, -1, -1):
+                suffix_union[i] = suffix_union[i + 1] | masks[i]
+
+            nodes = 0
+            chosen: list[int] = []
+
+            def search(start: int, covered: int) -> bool:
+                """Devolve True para interromper a busca (cobertura total ou limite de nós)."""
+                nonlocal best, best_cover, nodes
+                nodes += 1
+                cover = covered.bit_count()
+                if cover > best_cover:
+                    best, best_cover = list(chosen), cover
+                    if covered == full_cover:
+                        return True
+                for i in range(start, n):
+                    if nodes >= max_nodes:
+                        return True
+                    # Nem usando todas as regras restantes a cobertura atual seria superada
+                    if cover + (suffix_union[i] & ~covered).bit_count() <= best_cover:
+                        return False
+                    if masks[i] & covered:
+                        continue
+                    chosen.append(i)
+                    stop = search(i + 1, covered | masks[i])
+                    chosen.pop()
+                    if stop:
+                        return True
+                return False
+
+            search(0, 0)
+
+        matched = [self.rules[positions[i]] for i in best]
+        remaining = set(input_codes)
+        for rule in matched:
+            remaining -= rule.required_codes
+        return matched, remaining
+
+
+def get_matching_strategy() -> str:
+    """
+    Devolve a estratégia de aplicação das regras configurada em RULE_MATCHING
+    (MATCH_MAX_COVERAGE, o padrão, ou MATCH_SHEET_ORDER).
+    """
+    strategy = (os.getenv("RULE_MATCHING") or MATCH_MAX_COVERAGE).lower()
+    return strategy if strategy in (MATCH_MAX_COVERAGE, MATCH_SHEET_ORDER) else MATCH_MAX_COVERAGE
+
+
+def _match(university_rules: CompiledRules, input_codes: set[str] | frozenset[str], strategy: Optional[str]):
+    if (strategy or get_matching_strategy()) == MATCH_SHEET_ORDER:
+        return university_rules.match(input_codes)
+    return university_rules.match_max_coverage(input_codes)
+
+
+def normalize_codes(course_codes_str: str) -> set[str]:
+    """
+    Converte a string digitada pelo usuário em um conjunto de códigos normalizados.
+
+    Args:
+        course_codes_str (str): Códigos separados por vírgulas, espaços ou quebras de linha.
+
+    Returns:
+        set[str]: Os códigos em caixa alta, sem espaços e sem repetições.
+    """
+    cleaned_str = course_codes_str.replace(",", " ").replace("\n", " ")
+    return {code.strip().upper() for code in cleaned_str.split() if code.strip()}
+
+
+def split_rule_codes(origin_codes: Any) -> frozenset[str]:
+    """
+    Separa a célula 'Códigos Origem' (ex.: "MAT101 + MAT102") nos códigos exigidos pela regra.
+
+    Células vazias resultam em um conjunto vazio: a regra fica fora do índice
+    e nunca é acionada (antes, o texto "nan" passava a ser tratado como código).
+    Também é usada na célula 'Códigos UFRJ Destino', que segue o mesmo formato.
+    """
+    if pd.isna(origin_codes):
+        return frozenset()
+    return frozenset(c.strip().upper() for c in str(origin_codes).split('+'))
+
+
+def compile_rules(university_df: DataFrame) -> CompiledRules:
+    """
+    Compila a aba de uma universidade em registros compactos e no índice invertido.
+
+    Args:
+        university_df (DataFrame): A aba da universidade, com as colunas obrigatórias.
+
+    Returns:
+        CompiledRules: As regras compiladas, prontas para consulta.
+    """
+    return compile_rule_records(
+        Rule(*values, split_rule_codes(values[0]))
+        for values in zip(*(university_df[column].tolist() for column in RULE_COLUMNS))
+    )
+
+
+def sheet_fingerprint(university_df: DataFrame) -> str:
+    """
+    Calcula o hash do conteúdo normalizado de uma aba: só as colunas das regras, na
+    ordem de RULE_COLUMNS e das linhas. Colunas extras e a formatação da aba não
+    entram, então só uma mudança que altera as regras muda o hash.
+
+    Returns:
+        str: Os 16 primeiros dígitos do SHA-256 do conteúdo.
+    """
+    digest = hashlib.sha256()
+    for values in zip(*(university_df[column].tolist() for column in RULE_COLUMNS)):
+        # Mesmo texto de repr(rule[:-1]) da regra compilada
+        digest.update(repr(values).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def compile_rule_records(rules: Iterable[Rule]) -> CompiledRules:
+    """
+    Monta os índices (de origem e de destino) sobre regras já lidas, na ordem da planilha.
+
+    Usada por compile_rules e por backends que leem as regras de outra fonte
+    (ex.: o banco SQLite de rule_store), para que todos casem as regras da mesma forma.
+    """
+    rules = tuple(rules)
+    index: dict[str, list[int]] = {}
+    dest_index: dict[str, list[int]] = {}
+    for rule_pos, rule in enumerate(rules):
+        for code in rule.required_codes:
+            index.setdefault(code, []).append(rule_pos)
+        # A célula de destino segue o mesmo formato da de origem (ex.: "ICP131+ICP141")
+        for code in split_rule_codes(rule.dest_codes):
+            dest_index.setdefault(code, []).append(rule_pos)
+
+    return CompiledRules(
+        rules,
+        {code: tuple(positions) for code, positions in index.items()},
+        {code: tuple(positions) for code, positions in dest_index.items()}
+    )
+
+
+# Cache das abas já compiladas, indexado pelo id() do DataFrame.
+# O weakref.finalize remove a entrada quando o DataFrame é coletado,
+# evitando que um id reaproveitado devolva regras de outra aba.
+_compiled_cache: dict[int, CompiledRules] = {}
+
+
+def get_compiled_rules(university_df: DataFrame) -> CompiledRules:
+    """
+    Devolve as regras compiladas de uma aba, compilando-a apenas na primeira consulta.
+    """
+    key = id(university_df)
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = compile_rules(university_df)
+        _compiled_cache[key] = compiled
+        weakref.finalize(university_df, _compiled_cache.pop, key, None)
+    return compiled
+
+
+class RuleBook(Mapping[str, CompiledRules]):
+    """
+    Conjunto imutável das regras compiladas de TODAS as universidades da planilha.
+
+    É pensado para ser compartilhado, somente leitura, por todas as sessões do
+    servidor: guarda apenas os registros compactos e os índices, sem os DataFrames.
+    Funciona como um dicionário {universidade: CompiledRules}, então pode ser
+    passado diretamente para find_equivalencies.
+
+    O índice de busca é mantido por aba, assim como as regras, e o índice reverso
+    (código UFRJ de destino -> regras) é um dicionário da planilha inteira: quando
+    a planilha muda, build_rulebook reaproveita tudo o que foi montado para as
+    abas que não mudaram e remonta só as entradas citadas pelas abas alteradas.
+
+    Atributos:
+        version (str): Hash do conteúdo das regras; muda sempre que a planilha muda.
+        sheet_versions (Mapping[str, str]): Hash do conteúdo de cada aba (veja sheet_fingerprint).
+        changes (Optional[RuleBookChanges]): O que mudou em relação às regras anteriores,
+                                             quando o RuleBook foi montado a partir delas.
+    """
+    __slots__ = ("_rules", "version", "sheet_versions", "changes", "_search_segments", "_search_index", "_dest_index")
+
+    def __init__(
+        self,
+        rules: Mapping[str, CompiledRules],
+        version: str,
+        sheet_versions: Optional[Mapping[str, str]] = None,
+        changes: Optional["RuleBookChanges"] = None,
+        search_segments: Optional[Mapping[str, DisciplineIndex]] = None,
+        dest_index: Optional[Mapping[str, tuple[tuple[str, Rule], ...]]] = None
+    ):
+        object.__setattr__(self, "_rules", MappingProxyType(dict(rules)))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "sheet_versions", MappingProxyType(dict(sheet_versions or {})))
+        object.__setattr__(self, "changes", changes)
+        # Índices de busca já montados, por aba; os que faltam são montados no primeiro uso
+        object.__setattr__(self, "_search_segments", dict(search_segments or {}))
+        object.__setattr__(self, "_search_index", None)
+        # Índice reverso da planilha inteira, montado junto com as regras
+        object.__setattr__(
+            self, "_dest_index", dict(dest_index) if dest_index is not None else build_destination_index(self._rules)
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RuleBook é imutável; construa um novo com build_rulebook().")
+
+    def __reduce__(self):
+        # MappingProxyType não é serializável; permite enviar o RuleBook a outros processos
+        return (RuleBook, (dict(self._rules), self.version, dict(self.sheet_versions), self.changes, None, self._dest_index))
+
+    def __getitem__(self, university: str) -> CompiledRules:
+        return self._rules[university]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._rules)
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    @property
+    def universities(self) -> list[str]:
+        """Nomes das universidades (abas válidas), na ordem da planilha."""
+        return list(self._rules)
+
+    def sheet_version(self, university: str) -> str:
+        """
+        Hash do conteúdo da aba da universidade. Serve de chave para o que depende só
+        dessa aba (ex.: o histórico de análises), que assim sobrevive a mudanças nas outras.
+        """
+        return self.sheet_versions.get(university, self.version)
+
+    @property
+    def search_index(self) -> SegmentedDisciplineIndex:
+        """
+        Índice de busca por nome/código em todas as universidades, montado no primeiro uso.
+
+        É formado por um índice por aba; só as abas sem índice (novas ou alteradas
+        desde as regras anteriores) são indexadas.
+        """
+        search_index = self._search_index
+        if search_index is None:
+            # Montagem idempotente: se duas sessões montarem ao mesmo tempo, qualquer uma serve
+            segments = self._search_segments
+            for university in self._rules:
+                if university not in segments:
+                    segments[university] = build_search_index({university: self._rules[university]})
+            search_index = SegmentedDisciplineIndex(segments[university] for university in self._rules)
+            object.__setattr__(self, "_search_index", search_index)
+        return search_index
+
+    def rules_for_destination(self, dest_code: str) -> tuple[tuple[str, Rule], ...]:
+        """Pares (universidade, regra) de todas as regras com o código UFRJ de destino (já normalizado)."""
+        return self._dest_index.get(dest_code, ())
+
+
+@timed()
+def build_search_index(rulebook: Mapping[str, CompiledRules]) -> DisciplineIndex:
+    """
+    Monta o índice de busca de todas as universidades de um RuleBook (ou LazyRuleBook).
+
+    Args:
+        rulebook (Mapping[str, CompiledRules]): As regras compiladas de cada universidade.
+
+    Returns:
+        DisciplineIndex: O índice invertido sobre códigos e nomes de origem e de destino.
+    """
+    return DisciplineIndex((university, rulebook[university].rules) for university in rulebook)
+
+
+@timed()
+def build_destination_index(rulebook: Mapping[str, CompiledRules]) -> dict[str, tuple[tuple[str, Rule], ...]]:
+    """
+    Junta os índices reversos das abas em um único índice: código UFRJ de destino ->
+    pares (universidade, regra), na ordem das abas e das linhas da planilha.
+
+    Args:
+        rulebook (Mapping[str, CompiledRules]): As regras compiladas de cada universidade.
+
+    Returns:
+        dict[str, tuple[tuple[str, Rule], ...]]: O índice reverso da planilha inteira.
+    """
+    dest_index: dict[str, list[tuple[str, Rule]]] = {}
+    for university in rulebook:
+        compiled = rulebook[university]
+        for code, positions in compiled.dest_index.items():
+            dest_index.setdefault(code, []).extend((university, compiled.rules[pos]) for pos in positions)
+    return {code: tuple(pairs) for code, pairs in dest_index.items()}
+
+
+@timed()
+def update_destination_index(
+    previous: RuleBook,
+    rules: Mapping[str, CompiledRules]
+) -> dict[str, tuple[tuple[str, Rule], ...]]:
+    """
+    Atualiza o índice reverso das regras anteriores para as regras novas.
+
+    Só os códigos de destino citados pelas abas adicionadas, removidas ou
+    recompiladas são remontados; os demais reaproveitam as entradas anteriores.
+    Se as abas mantidas mudaram de ordem, o índice é montado do zero.
+
+    Args:
+        previous (RuleBook): As regras anteriores, com o índice reverso delas.
+        rules (Mapping[str, CompiledRules]): As regras compiladas de cada universidade.
+
+    Returns:
+        dict[str, tuple[tuple[str, Rule], ...]]: O índice reverso das regras novas.
+    """
+    kept = [university for university in rules if rules[university] is previous._rules.get(university)]
+    if kept != [university for university in previous._rules if university in kept]:
+        return build_destination_index(rules)
+
+    affected: set[str] = set()
+    for university, compiled in previous._rules.items():
+        if rules.get(university) is not compiled:
+            affected.update(compiled.dest_index)
+    for university, compiled in rules.items():
+        if compiled is not previous._rules.get(university):
+            affected.update(compiled.dest_index)
+
+    dest_index = dict(previous._dest_index)
+    for code in affected:
+        pairs = tuple(
+            (university, compiled.rules[pos])
+            for university, compiled in rules.items()
+            for pos in compiled.dest_index.get(code, ())
+        )
+        if pairs:
+            dest_index[code] = pairs
+        else:
+            dest_index.pop(code, None)
+    return dest_index
+
+
+@timed()
+def build_rulebook(spreadsheet_data: dict[str, DataFrame], previous: Optional[RuleBook] = None) -> RuleBook:
+    """
+    Compila todas as abas válidas da planilha em um RuleBook imutável.
+
+    Com as regras anteriores (previous), a compilação é incremental: o hash do
+    conteúdo de cada aba é comparado com o da versão anterior e só as abas que
+    mudaram são recompiladas. As demais reaproveitam as regras compiladas e os
+    índices (de sugestões, de busca e de destino) já montados, e o RuleBook novo traz em
+    'changes' o resumo das mudanças.
+
+    Args:
+        spreadsheet_data (dict[str, DataFrame]): O dicionário de DataFrames da planilha.
+        previous (Optional[RuleBook]): As regras em uso, montadas da versão anterior da planilha.
+
+    Returns:
+        RuleBook: As regras compiladas de cada universidade, com a versão do conteúdo.
+    """
+    rules: dict[str, CompiledRules] = {}
+    sheet_versions: dict[str, str] = {}
+    for university in get_university_list(spreadsheet_data):
+        sheet_version = sheet_fingerprint(spreadsheet_data[university])
+        sheet_versions[university] = sheet_version
+        if previous is not None and previous.sheet_versions.get(university) == sheet_version:
+            rules[university] = previous[university]
+        else:
+            rules[university] = compile_rules(spreadsheet_data[university])
+
+    digest = hashlib.sha256()
+    for university, sheet_version in sheet_versions.items():
+        digest.update(university.encode("utf-8"))
+        digest.update(sheet_version.encode("utf-8"))
+
+    if previous is None:
+        return RuleBook(rules, digest.hexdigest()[:16], sheet_versions)
+
+    return RuleBook(
+        rules,
+        digest.hexdigest()[:16],
+        sheet_versions,
+        changes=diff_rulebooks(previous, rules),
+        search_segments={
+            university: segment
+            for university, segment in previous._search_segments.items()
+            if rules.get(university) is previous._rules[university]
+        },
+        dest_index=update_destination_index(previous, rules)
+    )
+
+
+class SheetChange(NamedTuple):
+    """
+    Mudança em uma aba entre duas versões da planilha.
+
+    Numa aba alterada, uma regra cujos códigos de origem continuam os mesmos
+    conta como modificada; as demais diferenças contam como regras adicionadas
+    ou removidas.
+    """
+    university: str
+    status: str  # SHEET_ADDED, SHEET_REMOVED ou SHEET_MODIFIED
+    rules_before: int
+    rules_after: int
+    added: int
+    removed: int
+    modified: int
+
+    def describe(self) -> str:
+        """Descreve a mudança em uma linha, ex.: "UFF: 2 regra(s) adicionada(s) (40 → 42 regras)"."""
+        if self.status == SHEET_ADDED:
+            return f"{self.university}: aba adicionada ({self.rules_after} regras)"
+        if self.status == SHEET_REMOVED:
+            return f"{self.university}: aba removida ({self.rules_before} regras)"
+        details = [
+            f"{count} {label}"
+            for count, label in (
+                (self.added, "regra(s) adicionada(s)"), (self.removed, "removida(s)"), (self.modified, "modificada(s)")
+            )
+            if count
+        ]
+        # Mesmas regras com outro hash: só a ordem das linhas mudou
+        summary = ", ".join(details) or "regras reordenadas"
+        return f"{self.university}: {summary} ({self.rules_before} → {self.rules_after} regras)"
+
+
+class RuleBookChanges(NamedTuple):
+    """Resumo das mudanças entre duas versões das regras, aba por aba."""
+    sheets: tuple[SheetChange, ...]
+    unchanged: tuple[str, ...]
+
+    def __bool__(self) -> bool:
+        return bool(self.sheets)
+
+    def describe(self) -> list[str]:
+        """Uma linha por aba que mudou, seguida da contagem das abas sem mudanças."""
+        lines = [change.describe() for change in self.sheets]
+        if self.unchanged:
+            lines.append(f"{len(self.unchanged)} aba(s) sem mudanças")
+        return lines
+
+
+def _diff_rules(before: CompiledRules, after: CompiledRules) -> tuple[int, int, int]:
+    """
+    Conta as regras adicionadas, removidas e modificadas entre duas versões de uma aba.
+    """
+    # O repr compara NaN (célula vazia) como texto; NaN nunca é igual a si mesmo
+    before_rows = Counter((rule.required_codes, repr(rule[:-1])) for rule in before.rules)
+    after_rows = Counter((rule.required_codes, repr(rule[:-1])) for rule in after.rules)
+    common = before_rows & after_rows
+    removed_rows = before_rows - common
+    added_rows = after_rows - common
+
+    removed_codes: Counter = Counter()
+    for (codes, _), count in removed_rows.items():
+        removed_codes[codes] += count
+    added_codes: Counter = Counter()
+    for (codes, _), count in added_rows.items():
+        added_codes[codes] += count
+    modified = sum((removed_codes & added_codes).values())
+    return sum(added_rows.values()) - modified, sum(removed_rows.values()) - modified, modified
+
+
+@timed()
+def diff_rulebooks(previous: Mapping[str, CompiledRules], current: Mapping[str, CompiledRules]) -> RuleBookChanges:
+    """
+    Compara duas versões das regras e resume as abas adicionadas, removidas e alteradas.
+
+    Abas cujas regras compiladas são o mesmo objeto (reaproveitadas por
+    build_rulebook) contam como sem mudanças sem comparar as regras.
+
+    Args:
+        previous (Mapping[str, CompiledRules]): As regras anteriores.
+        current (Mapping[str, CompiledRules]): As regras novas.
+
+    Returns:
+        RuleBookChanges: As mudanças, na ordem das abas (as removidas por último).
+    """
+    sheets: list[SheetChange] = []
+    unchanged: list[str] = []
+    for university in current:
+        after = current[university]
+        if university not in previous:
+            sheets.append(SheetChange(university, SHEET_ADDED, 0, len(after), len(after), 0, 0))
+            continue
+        before = previous[university]
+        if before is after:
+            unchanged.append(university)
+            continue
+        added, removed, modified = _diff_rules(before, after)
+        sheets.append(SheetChange(university, SHEET_MODIFIED, len(before), len(after), added, removed, modified))
+
+    for university in previous:
+        if university not in current:
+            before = previous[university]
+            sheets.append(SheetChange(university, SHEET_REMOVED, len(before), 0, 0, len(before), 0))
+    return RuleBookChanges(tuple(sheets), tuple(unchanged))
+
+
+class LazyRuleBook(Mapping[str, CompiledRules]):
+    """
+    RuleBook que só lê e compila a aba de uma universidade quando ela é consultada.
+
+    Na criação são necessários apenas os nomes das universidades (obtidos dos
+    cabeçalhos das abas). Cada aba é carregada por load_sheet no primeiro acesso
+    e fica em um LRU limitado a max_loaded abas, de modo que o tempo de início e
+    a memória acompanham as universidades realmente usadas, não o tamanho da planilha.
+
+    Tem a mesma interface do RuleBook ('universities', 'version', acesso por
+    nome), então pode ser passado diretamente para find_equivalencies.
+    """
+
+    def __init__(
+        self,
+        universities: list[str],
+        load_sheet: Callable[[str], DataFrame],
+        version: str,
+        max_loaded: int = 8
+    ):
+        """
+        Args:
+            universities (list[str]): Nomes das abas válidas, na ordem da planilha.
+            load_sheet (Callable[[str], DataFrame]): Lê uma aba pelo nome.
+            version (str): Identificador do conteúdo da planilha (ex.: hash dos bytes).
+            max_loaded (int): Quantas abas compiladas manter em memória ao mesmo tempo.
+        """
+        self._universities = tuple(universities)
+        self._known = frozenset(universities)
+        self._load_sheet = load_sheet
+        self.version = version
+        # A planilha só é lida por aba, sob demanda: não há comparação com a versão anterior
+        self.changes: Optional[RuleBookChanges] = None
+        self.max_loaded = max(1, max_loaded)
+        self._loaded: OrderedDict[str, CompiledRules] = OrderedDict()
+        self._lock = threading.Lock()
+        self._sheet_locks = {university: threading.Lock() for university in self._universities}
+        self._search_index: Optional[DisciplineIndex] = None
+        self._dest_index: Optional[dict[str, tuple[tuple[str, Rule], ...]]] = None
+        self._search_lock = threading.Lock()
+
+    def __getitem__(self, university: str) -> CompiledRules:
+        if university not in self._known:
+            raise KeyError(university)
+
+        compiled = self._get_loaded(university)
+        if compiled is not None:
+            return compiled
+
+        # Um lock por aba: duas sessões não leem a mesma aba ao mesmo tempo, mas a
+        # leitura de uma aba não bloqueia as consultas às abas já carregadas
+        with self._sheet_locks[university]:
+            compiled = self._get_loaded(university)
+            if compiled is None:
+                compiled = compile_rules(self._load_sheet(university))
+                with self._lock:
+                    self._loaded[university] = compiled
+                    while len(self._loaded) > self.max_loaded:
+                        self._loaded.popitem(last=False)
+        return compiled
+
+    def _get_loaded(self, university: str) -> Optional[CompiledRules]:
+        with self._lock:
+            compiled = self._loaded.get(university)
+            if compiled is not None:
+                self._loaded.move_to_end(university)
+            return compiled
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._universities)
+
+    def __len__(self) -> int:
+        return len(self._universities)
+
+    def __contains__(self, university: object) -> bool:
+        # Evita que 'in' carregue a aba, como faria a implementação padrão do Mapping
+        return university in self._known
+
+    @property
+    def universities(self) -> list[str]:
+        """Nomes das universidades (abas válidas), na ordem da planilha."""
+        return list(self._universities)
+
+    def sheet_version(self, university: str) -> str:
+        """
+        Identificador do conteúdo da aba. Sem ler a aba não há como calcular o hash
+        dela, então é a versão da planilha inteira.
+        """
+        return self.version
+
+    def rules_for_codes(self, university: str, input_codes: Iterable[str]) -> CompiledRules:
+        """
+        Regras da universidade suficientes para casar os códigos informados.
+
+        Aqui são todas as regras da aba; backends com consultas indexadas (ex.:
+        rule_store.SQLiteRuleBook) devolvem só as regras que citam algum dos códigos.
+        """
+        return self[university]
+
+    @property
+    def loaded_universities(self) -> list[str]:
+        """Universidades com regras compiladas em memória, da menos para a mais recente."""
+        return list(self._loaded)
+
+    @property
+    def search_index(self) -> DisciplineIndex:
+        """
+        Índice de busca por nome/código em todas as universidades, montado no primeiro uso.
+
+        A montagem lê todas as abas uma vez; o índice guarda só os registros das
+        regras, então as abas podem sair do LRU depois sem afetar a busca.
+        """
+        with self._search_lock:
+            if self._search_index is None:
+                self._search_index = build_search_index(self)
+            return self._search_index
+
+    def rules_for_destination(self, dest_code: str) -> tuple[tuple[str, Rule], ...]:
+        """
+        Pares (universidade, regra) de todas as regras com o código UFRJ de destino (já normalizado).
+
+        Como o índice de busca, o índice reverso precisa de todas as abas e só é
+        montado na primeira consulta; as seguintes são uma leitura de dicionário.
+        """
+        with self._search_lock:
+            if self._dest_index is None:
+                self._dest_index = build_destination_index(self)
+        return self._dest_index.get(dest_code, ())
+
+
+class RuleBookStore:
+    """
+    Guarda o RuleBook atual do processo e permite trocá-lo de forma atômica.
+
+    As sessões leem 'current' uma vez por execução e usam sempre a mesma
+    referência; uma recarga monta um RuleBook novo por fora e só então o
+    publica com swap(), de modo que nenhuma sessão vê regras pela metade.
+    """
+
+    def __init__(self):
+        self._rulebook: Optional[RuleBook | LazyRuleBook] = None
+        self._checked_at = 0.0
+        self._swap_lock = threading.Lock()
+        # Garante que apenas uma recarga aconteça por vez
+        self.reload_lock = threading.Lock()
+        # Última falha de recarga em segundo plano (None se a última deu certo)
+        self.last_error: Optional[str] = None
+
+    @property
+    def current(self) -> Optional[RuleBook | LazyRuleBook]:
+        return self._rulebook
+
+    def swap(self, rulebook: RuleBook | LazyRuleBook) -> None:
+        """Publica um novo RuleBook para todas as sessões."""
+        with self._swap_lock:
+            self._rulebook = rulebook
+            self._checked_at = time.monotonic()
+
+    def touch(self) -> None:
+        """Marca as regras atuais como verificadas agora, sem trocá-las."""
+        self._checked_at = time.monotonic()
+
+    def is_stale(self, ttl_seconds: float) -> bool:
+        """Indica se não há RuleBook carregado ou se ele foi verificado há mais de ttl_seconds."""
+        return self._rulebook is None or time.monotonic() - self._checked_at > ttl_seconds
+
+    def refresh_in_background(self, refresh: Callable[["RuleBookStore"], Any]) -> bool:
+        """
+        Executa refresh(store) em uma thread separada, se nenhuma recarga estiver em andamento.
+
+        Quem chama não espera a recarga: continua usando 'current' até que
+        refresh publique as novas regras com swap().
+
+        Returns:
+            bool: True se uma recarga foi iniciada, False se já havia outra em andamento.
+        """
+        if not self.reload_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                refresh(self)
+            finally:
+                self.reload_lock.release()
+
+        threading.Thread(target=run, name="rulebook-refresh", daemon=True).start()
+        return True
+
+
+def _resolve_university_rules(
+    all_data: Mapping[str, DataFrame | CompiledRules],
+    selected_university: str,
+    input_codes: Optional[Iterable[str]] = None
+) -> Optional[CompiledRules]:
+    """
+    Devolve as regras compiladas da universidade, compilando o DataFrame se necessário.
+
+    Com input_codes, um LazyRuleBook pode responder só com as regras que citam esses códigos.
+    """
+    if isinstance(all_data, LazyRuleBook) and input_codes is not None:
+        if selected_university not in all_data:
+            return None
+        return all_data.rules_for_codes(selected_university, input_codes)
+    university_rules = all_data.get(selected_university)
+    if isinstance(university_rules, pd.DataFrame):
+        university_rules = get_compiled_rules(university_rules)
+    return university_rules
+
+
+def _build_results(matched_rules: list[Rule], remaining_codes: set[str]) -> list[dict]:
+    """
+    Monta a lista de resultados a partir das regras acionadas e dos códigos que sobraram.
+    """
+    results = [rule.as_result() for rule in matched_rules]
+
+    # O que sobrou aqui são os códigos que o usuário digitou mas que não se encaixaram em nenhuma regra.
+    for remaining_code in sorted(remaining_codes): # sorted para ordem consistente
+        results.append({
+            "input_code": remaining_code,
+            "status": "Não Encontrado na Planilha"
+        })
+
+    return results
+
+
+@timed()
 def find_equivalencies(
-    all_data: dict[str, DataFrame], 
-    selected_university: str, 
-    course_codes_str: str
+    all_data: Mapping[str, DataFrame | CompiledRules],
+    selected_university: str,
+    course_codes_str: str,
+    strategy: Optional[str] = None
 ) -> list[dict]:
     """
-    Busca por equivalências de disciplinas em um DataFrame de uma universidade específica.
+    Busca por equivalências de disciplinas nas regras de uma universidade específica.
 
     Args:
-        all_data (dict[str, DataFrame]): Dicionário com todos os dados da planilha.
+        all_data (Mapping[str, DataFrame | CompiledRules]): Dicionário com todos os dados
+                                da planilha (DataFrames) ou com as regras já compiladas.
         selected_university (str): O nome da universidade (aba da planilha) selecionada.
         course_codes_str (str): Uma string contendo os códigos das disciplinas,
                                 separados por vírgulas, espaços ou quebras de linha.
+        strategy (Optional[str]): MATCH_MAX_COVERAGE ou MATCH_SHEET_ORDER. Se None,
+                                usa a estratégia configurada (get_matching_strategy).
 
     Returns:
         list[dict]: Uma lista de dicionários, onde cada dicionário representa o
                     resultado de uma busca para um código de disciplina.
     """
-    results = []
-    
-    university_df = all_data.get(selected_university)
-    if university_df is None:
+    input_codes = normalize_codes(course_codes_str)
+    university_rules = _resolve_university_rules(all_data, selected_university, input_codes)
+    if university_rules is None:
         return [{"error": f"Dados para a universidade '{selected_university}' não encontrados."}]
 
-    # 1. Prepara os códigos de entrada do usuário em um CONJUNTO (set) para facilitar a remoção.
-    cleaned_str = course_codes_str.replace(",", " ").replace("\n", " ")
-    # Usamos um set para que a remoção de itens seja mais eficiente
-    input_codes_set = {code.strip().upper() for code in cleaned_str.split() if code.strip()}
-
-    # 2. Itera primeiro sobre as REGRAS da planilha (cada linha do DataFrame)
-    for index, rule in university_df.iterrows():
-        origin_codes_str = str(rule['Códigos Origem'])
-        # Pega a lista de códigos necessários para ESTA regra
-        required_codes = {c.strip().upper() for c in origin_codes_str.split('+')}
-        
-        # 3. Verifica se a regra PODE ser aplicada:
-        # A regra só é válida se TODOS os seus códigos requeridos estiverem no input do usuário
-        if required_codes.issubset(input_codes_set):
-            # A regra foi acionada!
-            result_details = {
-                "status": "Encontrado",
-                "origin_codes": rule['Códigos Origem'],
-                "origin_names": rule['Nomes Origem'],
-                "is_equivalent": rule['Equivalente?'],
-                "dest_codes": rule['Códigos UFRJ Destino'],
-                "dest_names": rule['Nomes UFRJ Destino'],
-                "justification": rule['Justificativa Parecer']
-            }
-            results.append(result_details)
-            
-            # 4. CRUCIAL: Se a regra foi aplicada, remove os códigos usados do conjunto de input.
-            # Isso impede que eles sejam usados para acionar outra regra.
-            input_codes_set -= required_codes
-
-    # 5. Adiciona os códigos que sobraram no conjunto como 'Não Encontrado na Planilha'
-    # O que sobrou aqui são os códigos que o usuário digitou mas que não se encaixaram em nenhuma regra.
-    for remaining_code in sorted(list(input_codes_set)): # sorted para ordem consistente
-        results.append({
-            "input_code": remaining_code,
-            "status": "Não Encontrado na Planilha"
-        })
+    # Cada regra acionada consome os seus códigos, que não podem acionar outra regra.
+    return _build_results(*_match(university_rules, input_codes, strategy))
+
+
+@timed()
+def find_equivalencies_batch(
+    all_data: Mapping[str, DataFrame | CompiledRules],
+    selected_university: str,
+    student_requests: Iterable[tuple[str, str | Iterable[str]]],
+    strategy: Optional[str] = None
+) -> dict[str, list[dict]]:
+    """
+    Busca equivalências para VÁRIOS alunos da mesma universidade de uma só vez.
+
+    É um atalho sobre find_equivalencies: as regras da universidade e a estratégia
+    são resolvidas uma única vez para o lote, e pedidos com o mesmo conjunto de
+    códigos reaproveitam a mesma busca. Fora isso, cada aluno é casado
+    separadamente; com conjuntos de códigos todos distintos, a vazão é a mesma
+    de chamadas individuais, e só há ganho quando os pedidos se repetem.
+
+    Args:
+        all_data (Mapping[str, DataFrame | CompiledRules]): Dados da planilha ou regras compiladas.
+        selected_university (str): O nome da universidade (aba da planilha) selecionada.
+        student_requests (Iterable[tuple[str, str | Iterable[str]]]): Pares (id do aluno, códigos),
+                                onde os códigos podem vir como string livre (mesmo formato
+                                de find_equivalencies) ou como uma coleção de códigos.
+        strategy (Optional[str]): Estratégia de aplicação das regras (veja find_equivalencies).
+
+    Returns:
+        dict[str, list[dict]]: Para cada id de aluno, a mesma lista de resultados que
+                               find_equivalencies devolveria para os seus códigos.
+    """
+    university_rules = _resolve_university_rules(all_data, selected_university)
+    if university_rules is None:
+        error = {"error": f"Dados para a universidade '{selected_university}' não encontrados."}
+        return {student_id: [dict(error)] for student_id, _ in student_requests}
+
+    # Resolvida uma vez, para que todo o lote use a mesma estratégia
+    strategy = strategy or get_matching_strategy()
+    batch_results = {}
+    matches_by_code_set: dict[frozenset[str], tuple[list[Rule], set[str]]] = {}
+
+    for student_id, course_codes in student_requests:
+        if not isinstance(course_codes, str):
+            course_codes = " ".join(course_codes)
+        input_codes = frozenset(normalize_codes(course_codes))
+
+        match = matches_by_code_set.get(input_codes)
+        if match is None:
+            # A busca copia o conjunto antes de consumir códigos, então a chave fica intacta
+            match = matches_by_code_set[input_codes] = _match(university_rules, input_codes, strategy)
+
+        # Cada aluno recebe dicionários próprios, mesmo quando a busca foi reaproveitada
+        batch_results[student_id] = _build_results(*match)
+
+    return batch_results
+
+
+@timed()
+def find_suggestions(
+    all_data: Mapping[str, DataFrame | CompiledRules],
+    selected_university: str,
+    input_codes: Iterable[str],
+    k: int = DEFAULT_SUGGESTIONS
+) -> dict[str, list[dict]]:
+    """
+    Sugere, para cada código não encontrado, as regras da universidade mais parecidas com ele.
+
+    Args:
+        all_data (Mapping[str, DataFrame | CompiledRules]): Dados da planilha ou regras compiladas.
+        selected_university (str): O nome da universidade (aba da planilha) selecionada.
+        input_codes (Iterable[str]): Os códigos não encontrados (campo 'input_code' dos resultados).
+        k (int): Número máximo de sugestões por código.
+
+    Returns:
+        dict[str, list[dict]]: Para cada código, as regras sugeridas no mesmo formato dos
+                               resultados encontrados, com a chave extra 'similarity' (0 a 1).
+    """
+    university_rules = _resolve_university_rules(all_data, selected_university)
+    if university_rules is None:
+        return {}
+    suggestions = {}
+    for code in input_codes:
+        suggestions[code] = []
+        for similarity, rule in university_rules.suggest(code, k):
+            suggestion = rule.as_result()
+            del suggestion["status"]  # Uma sugestão não é um resultado encontrado
+            suggestion["similarity"] = round(similarity, 3)
+            suggestions[code].append(suggestion)
+    return suggestions
+
+
+@timed()
+def search_disciplines(
+    rulebook: RuleBook | LazyRuleBook,
+    query: str,
+    limit: Optional[int] = None
+) -> list[dict]:
+    """
+    Busca uma disciplina (por nome ou código, de origem ou de destino) em todas as universidades.
+
+    Args:
+        rulebook (RuleBook | LazyRuleBook): As regras da planilha atual.
+        query (str): Texto da busca, ex.: "Cálculo I". Acentos e maiúsculas são ignorados.
+        limit (Optional[int]): Número máximo de regras devolvidas (None = todas).
+
+    Returns:
+        list[dict]: As regras encontradas, no formato dos resultados de find_equivalencies
+                    e com a chave extra 'university', na ordem das abas da planilha.
+    """
+    results = []
+    for university, rule in rulebook.search_index.search(query, limit):
+        result = rule.as_result()
+        del result["status"]  # Uma regra da busca não é um resultado de análise
+        results.append({"university": university, **result})
+    return results
 
+
+@timed()
+def find_by_destination(rulebook: RuleBook | LazyRuleBook, dest_code: str) -> list[dict]:
+    """
+    Lista todas as regras, de todas as universidades, que têm o código UFRJ como destino.
+
+    Args:
+        rulebook (RuleBook | LazyRuleBook): As regras da planilha atual.
+        dest_code (str): Código UFRJ de destino, ex.: "MAB120" (maiúsculas e espaços são ignorados).
+
+    Returns:
+        list[dict]: As regras encontradas, no formato dos resultados de find_equivalencies
+                    e com a chave extra 'university', na ordem das abas da planilha.
+    """
+    results = []
+    for university, rule in rulebook.rules_for_destination(dest_code.strip().upper()):
+        result = rule.as_result()
+        del result["status"]  # Uma regra consultada não é um resultado de análise
+        results.append({"university": university, **result})
     return results
@@ -1,6 +1,23 @@
+import hashlib
+import io
+import os
+import pickle
+from typing import Optional
+
 import pandas as pd
 from pandas import DataFrame
 
+from timing import timed
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Diretório padrão dos snapshots da planilha (pode ser trocado pela variável WORKBOOK_SNAPSHOT_DIR)
+DEFAULT_SNAPSHOT_DIR = os.path.join(PROJECT_ROOT, ".cache", "workbook_snapshots")
+# Altere quando o formato do snapshot mudar, para que os antigos sejam ignorados
+SNAPSHOT_FORMAT = 2
+# Quantos snapshots (versões da planilha) manter em disco
+SNAPSHOTS_TO_KEEP = 3
+
 
 # Definindo o set de colunas obrigatórias fora da função
 REQUIRED_COLUMNS = {
@@ -12,13 +29,164 @@ REQUIRED_COLUMNS = {
     "Justificativa Parecer"
 }
 
+# Colunas de códigos, cujas células de texto têm os espaços das pontas removidos
+CODE_COLUMNS = ("Códigos Origem", "Códigos UFRJ Destino")
+
+
+def workbook_hash(workbook_bytes: bytes) -> str:
+    """
+    Calcula o hash (SHA-256) do conteúdo da planilha, usado como chave do snapshot.
+    """
+    return hashlib.sha256(workbook_bytes).hexdigest()
+
+
+def get_snapshot_dir() -> str:
+    """
+    Devolve o diretório de snapshots configurado em WORKBOOK_SNAPSHOT_DIR ou o padrão.
+    """
+    return os.getenv("WORKBOOK_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR
+
+
+def _normalize_header(column):
+    return column.strip() if isinstance(column, str) else column
+
+
+def normalize_sheet(sheet_df: DataFrame) -> DataFrame:
+    """
+    Normaliza a aba de uma universidade para a compilação das regras.
+
+    Remove os espaços das pontas dos cabeçalhos e das células de código, mantém
+    só as colunas obrigatórias (na ordem da aba) e descarta as linhas em que
+    todas elas estão vazias, como as que o Excel deixa ao fim da aba.
+    """
+    sheet_df = sheet_df.rename(columns=_normalize_header)
+    sheet_df = sheet_df[[column for column in sheet_df.columns if column in REQUIRED_COLUMNS]]
+    sheet_df = sheet_df.dropna(how="all").reset_index(drop=True)
+    for column in CODE_COLUMNS:
+        if column in sheet_df.columns:
+            sheet_df[column] = sheet_df[column].map(lambda value: value.strip() if isinstance(value, str) else value)
+    return sheet_df
+
 
-def load_spreadsheet(file_path: str) -> dict[str, DataFrame] | None:
+@timed()
+def normalize_workbook(spreadsheet_data: dict[str, DataFrame]) -> Optional[dict[str, DataFrame]]:
+    """
+    Valida e normaliza a planilha: fica só com as abas de universidades (as que têm
+    todas as colunas obrigatórias, depois de normalizados os cabeçalhos), cada uma
+    normalizada por normalize_sheet.
+
+    Returns:
+        Optional[dict[str, DataFrame]]: As abas normalizadas, na ordem da planilha, ou
+                                        None se nenhuma aba for de universidade.
+    """
+    normalized = {}
+    for sheet_name, sheet_df in spreadsheet_data.items():
+        if REQUIRED_COLUMNS.issubset(_normalize_header(column) for column in sheet_df.columns):
+            normalized[sheet_name] = normalize_sheet(sheet_df)
+    return normalized or None
+
+
+def _snapshot_path(snapshot_dir: str, content_hash: str) -> str:
+    return os.path.join(snapshot_dir, f"{content_hash}.pkl")
+
+
+def _read_snapshot(snapshot_dir: str, content_hash: str) -> Optional[dict[str, DataFrame]]:
+    """
+    Lê o snapshot da planilha com o hash informado, se existir e for do formato atual.
+    """
+    try:
+        with open(_snapshot_path(snapshot_dir, content_hash), "rb") as f:
+            snapshot = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Snapshot corrompido ou incompatível: a planilha é lida novamente do .xlsx
+        return None
+
+    if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("content_hash") != content_hash:
+        return None
+    return snapshot["sheets"]
+
+
+def _write_snapshot(snapshot_dir: str, content_hash: str, spreadsheet_data: dict[str, DataFrame]) -> None:
+    """
+    Grava o snapshot de forma atômica e remove os snapshots mais antigos.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    final_path = _snapshot_path(snapshot_dir, content_hash)
+    tmp_path = f"{final_path}.{os.getpid()}.tmp"
+    snapshot = {"format": SNAPSHOT_FORMAT, "content_hash": content_hash, "sheets": spreadsheet_data}
+    with open(tmp_path, "wb") as f:
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    # os.replace é atômico: outro processo nunca lê um snapshot pela metade
+    os.replace(tmp_path, final_path)
+
+    snapshots = sorted(
+        (entry for entry in os.scandir(snapshot_dir) if entry.name.endswith(".pkl")),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True
+    )
+    for old_snapshot in snapshots[SNAPSHOTS_TO_KEEP:]:
+        try:
+            os.remove(old_snapshot.path)
+        except OSError:
+            pass
+
+
+@timed()
+def load_workbook_bytes(workbook_bytes: bytes, snapshot_dir: Optional[str] = None) -> dict[str, DataFrame]:
+    """
+    Converte o conteúdo de uma planilha .xlsx em um dicionário de DataFrames,
+    usando um snapshot binário quando o mesmo conteúdo já foi lido antes.
+
+    Na primeira leitura de um conteúdo, a planilha é lida com o openpyxl, validada
+    e normalizada (normalize_workbook): o resultado, só com as abas de universidades
+    já normalizadas, é gravado como snapshot identificado pelo hash dos bytes. As
+    leituras seguintes do mesmo conteúdo carregam o snapshot, que já está pronto
+    para a compilação, em milissegundos em vez de segundos.
+
+    Uma planilha sem nenhuma aba de universidade é devolvida como foi lida, sem
+    snapshot, para que a validação aponte o problema.
+
+    Args:
+        workbook_bytes (bytes): O conteúdo do arquivo .xlsx.
+        snapshot_dir (Optional[str]): Diretório dos snapshots. Se None, não usa snapshots.
+
+    Returns:
+        dict[str, DataFrame]: Um dicionário {nome da aba: DataFrame}.
+
+    Raises:
+        Exception: Se o conteúdo não puder ser lido como planilha.
+    """
+    content_hash = workbook_hash(workbook_bytes)
+
+    if snapshot_dir:
+        spreadsheet_data = _read_snapshot(snapshot_dir, content_hash)
+        if spreadsheet_data is not None:
+            return spreadsheet_data
+
+    raw_data = pd.read_excel(io.BytesIO(workbook_bytes), sheet_name=None, engine='openpyxl')
+    spreadsheet_data = normalize_workbook(raw_data)
+    if spreadsheet_data is None:
+        return raw_data
+
+    if snapshot_dir:
+        try:
+            _write_snapshot(snapshot_dir, content_hash, spreadsheet_data)
+        except OSError:
+            pass  # Sem permissão de escrita, por exemplo: segue sem snapshot
+
+    return spreadsheet_data
+
+
+def load_spreadsheet(file_path: str, snapshot_dir: Optional[str] = None) -> dict[str, DataFrame] | None:
     """
     Carrega todas as abas de uma planilha Excel em um dicionário de DataFrames.
 
     Args:
-        file_path (str): O caminho para o arquivo .xlsx.
+        file_path (str): O caminho para o arquivo .xlsx (ou um arquivo já aberto).
+        snapshot_dir (Optional[str]): Diretório dos snapshots (veja load_workbook_bytes).
+                                       Se None, a planilha é sempre lida do .xlsx.
 
     Returns:
         dict[str, DataFrame] | None: Um dicionário onde cada chave é o nome de uma aba
@@ -26,7 +194,13 @@ def load_spreadsheet(file_path: str) -> dict[str, DataFrame] | None:
                                      Retorna None se o arquivo não for encontrado ou ocorrer um erro.
     """
     try:
-        spreadsheet_data = pd.read_excel(file_path, sheet_name=None)
+        if isinstance(file_path, (str, os.PathLike)):
+            with open(file_path, "rb") as f:
+                workbook_bytes = f.read()
+        else:
+            file_path.seek(0)
+            workbook_bytes = file_path.read()
+        spreadsheet_data = load_workbook_bytes(workbook_bytes, snapshot_dir)
         # print(f"Planilha '{file_path}' carregada com sucesso.")
         return spreadsheet_data
     except FileNotFoundError:
@@ -37,6 +211,52 @@ def load_spreadsheet(file_path: str) -> dict[str, DataFrame] | None:
         return None
 
 
+@timed()
+def read_sheet_headers(workbook_bytes: bytes) -> dict[str, list[str]]:
+    """
+    Lê apenas os nomes das abas e a linha de cabeçalho de cada uma, sem carregar os dados.
+
+    Args:
+        workbook_bytes (bytes): O conteúdo do arquivo .xlsx.
+
+    Returns:
+        dict[str, list[str]]: {nome da aba: nomes das colunas}, na ordem da planilha.
+    """
+    # Import local: o openpyxl já é dependência do pd.read_excel, mas só este modo o usa diretamente
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(workbook_bytes), read_only=True, data_only=True)
+    try:
+        headers = {}
+        for worksheet in workbook.worksheets:
+            first_row = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+            headers[worksheet.title] = [str(value).strip() for value in first_row if value is not None]
+        return headers
+    finally:
+        workbook.close()
+
+
+@timed()
+def read_single_sheet(workbook_bytes: bytes, sheet_name: str) -> DataFrame:
+    """
+    Lê UMA aba da planilha .xlsx, sem processar as demais, já normalizada (veja normalize_sheet).
+    """
+    return normalize_sheet(pd.read_excel(io.BytesIO(workbook_bytes), sheet_name=sheet_name, engine='openpyxl'))
+
+
+def get_university_list_from_headers(sheet_headers: dict[str, list[str]]) -> list[str]:
+    """
+    Equivalente a get_university_list, mas a partir apenas dos cabeçalhos das abas
+    (veja read_sheet_headers).
+    """
+    return [
+        sheet_name
+        for sheet_name, columns in sheet_headers.items()
+        if REQUIRED_COLUMNS.issubset(columns)
+    ]
+
+
+@timed()
 def get_university_list(spreadsheet_data: dict[str, DataFrame]) -> list[str]:
     """
     Extrai a lista de nomes das universidades (abas) do dicionário de dados,
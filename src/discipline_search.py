@@ -0,0 +1,131 @@
+# 1. Bibliotecas padrão (Standard Library)
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+# 3. Módulos da sua aplicação (Local application)
+from suggestions import normalize_term
+
+# A última palavra da busca casa por prefixo ("calc" encontra "cálculo") a partir deste
+# tamanho; palavras curtas como "i" ou "ii" precisam casar exatamente.
+MIN_PREFIX_LENGTH = 3
+
+
+def tokenize(text: Any) -> list[str]:
+    """
+    Quebra um texto (nome ou código) em palavras normalizadas, sem acentos e em minúsculas.
+    Células vazias (NaN/None) não geram palavras.
+    """
+    # NaN é o único valor diferente de si mesmo; números (códigos numéricos) são indexados como texto
+    if text is None or text != text:
+        return []
+    return normalize_term(text).split()
+
+
+class DisciplineIndex:
+    """
+    Índice invertido das regras de TODAS as universidades de uma planilha.
+
+    Cada palavra dos códigos e nomes de origem e de destino aponta para as regras
+    que a contêm. As regras ficam guardadas no próprio índice, então uma busca
+    não consulta os DataFrames nem as abas: só interseciona listas de posições.
+    """
+    __slots__ = ("entries", "postings", "vocabulary")
+
+    def __init__(self, rules_by_university: Iterable[tuple[str, Sequence[Any]]]):
+        """
+        Args:
+            rules_by_university (Iterable[tuple[str, Sequence[Any]]]): Pares (universidade,
+                regras), na ordem da planilha. Cada regra precisa dos campos origin_codes,
+                origin_names, dest_codes e dest_names (ex.: core.Rule).
+        """
+        entries: list[tuple[str, Any]] = []
+        postings: dict[str, list[int]] = {}
+
+        for university, rules in rules_by_university:
+            for rule in rules:
+                entry_id = len(entries)
+                entries.append((university, rule))
+                tokens = set()
+                for field in (rule.origin_codes, rule.origin_names, rule.dest_codes, rule.dest_names):
+                    tokens.update(tokenize(field))
+                for token in tokens:
+                    postings.setdefault(token, []).append(entry_id)
+
+        self.entries = tuple(entries)
+        # As posições já entram em ordem crescente, que é a ordem da planilha
+        self.postings = {token: tuple(ids) for token, ids in postings.items()}
+        self.vocabulary = tuple(sorted(self.postings))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, prefix: str) -> set[int]:
+        """Regras com alguma palavra começando por prefix (busca binária no vocabulário ordenado)."""
+        matches: set[int] = set()
+        start = bisect_left(self.vocabulary, prefix)
+        for token in self.vocabulary[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.update(self.postings[token])
+        return matches
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[tuple[str, Any]]:
+        """
+        Devolve as regras que contêm todas as palavras da busca.
+
+        Args:
+            query (str): Texto livre, ex.: "Cálculo I" ou "MAC118".
+            limit (Optional[int]): Número máximo de regras devolvidas (None = todas).
+
+        Returns:
+            list[tuple[str, Any]]: Pares (universidade, regra), na ordem das abas e das linhas da planilha.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        *exact_tokens, last_token = tokens
+        candidate_sets = [set(self.postings.get(token, ())) for token in exact_tokens]
+        if len(last_token) >= MIN_PREFIX_LENGTH:
+            candidate_sets.append(self._prefix_matches(last_token))
+        else:
+            candidate_sets.append(set(self.postings.get(last_token, ())))
+
+        # Começa pela lista mais curta para que as interseções fiquem pequenas
+        candidate_sets.sort(key=len)
+        matches = candidate_sets[0].intersection(*candidate_sets[1:])
+        return [self.entries[entry_id] for entry_id in sorted(matches)[:limit]]
+
+
+class SegmentedDisciplineIndex:
+    """
+    Índice de busca formado por um DisciplineIndex por universidade (aba).
+
+    Com um segmento por aba, uma mudança na planilha só exige reindexar as abas
+    alteradas: os segmentos das demais são reaproveitados como estão. A busca
+    percorre os segmentos na ordem das abas, então o resultado é o mesmo de um
+    DisciplineIndex montado sobre a planilha inteira.
+    """
+    __slots__ = ("segments",)
+
+    def __init__(self, segments: Iterable[DisciplineIndex]):
+        """
+        Args:
+            segments (Iterable[DisciplineIndex]): Os índices de cada aba, na ordem da planilha.
+        """
+        self.segments = tuple(segments)
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self.segments)
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[tuple[str, Any]]:
+        """
+        Devolve as regras que contêm todas as palavras da busca (veja DisciplineIndex.search).
+        """
+        matches: list[tuple[str, Any]] = []
+        for segment in self.segments:
+            if limit is not None and len(matches) >= limit:
+                break
+            matches.extend(segment.search(query, None if limit is None else limit - len(matches)))
+        return matches
@@ -0,0 +1,185 @@
+# 1. Bibliotecas padrão (Standard Library)
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Union
+
+# Tamanho máximo padrão do cache em disco (soma dos JSONs armazenados)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+PDFSource = Union[str, bytes, BinaryIO]
+
+
+def read_pdf_bytes(pdf_source: PDFSource) -> bytes:
+    """
+    Lê o conteúdo de um PDF informado como caminho, bytes ou arquivo aberto.
+
+    Arquivos abertos (ex.: UploadedFile do Streamlit) voltam para a posição
+    inicial, para que possam ser lidos novamente pelo parser.
+    """
+    if isinstance(pdf_source, bytes):
+        return pdf_source
+    if isinstance(pdf_source, (str, os.PathLike)):
+        with open(pdf_source, "rb") as f:
+            return f.read()
+    pdf_source.seek(0)
+    data = pdf_source.read()
+    pdf_source.seek(0)
+    return data
+
+
+class ParsedPDFCache:
+    """
+    Cache em disco (SQLite) dos dados extraídos de PDFs, endereçado pelo conteúdo.
+
+    A chave é o SHA-256 dos bytes do arquivo mais a versão do parser, então um
+    mesmo PDF reenviado com outro nome reaproveita a extração, e uma mudança no
+    parser invalida automaticamente as entradas antigas. Quando o tamanho total
+    passa de max_bytes, as entradas usadas há mais tempo são removidas.
+
+    O mesmo arquivo pode ser usado por vários processos ao mesmo tempo.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            db_path (str): Caminho do arquivo SQLite (criado se não existir).
+            max_bytes (int): Tamanho máximo dos dados armazenados antes da remoção por LRU.
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS parsed_pdf (
+                    key TEXT PRIMARY KEY,
+                    parser_version TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_parsed_pdf_access ON parsed_pdf (last_access)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Uma conexão por operação: barata no SQLite e segura entre threads e processos
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            with conn:  # commit ao final, rollback em caso de erro
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(pdf_bytes: bytes, parser_version: str) -> str:
+        """Monta a chave do cache: versão do parser + SHA-256 do conteúdo."""
+        return f"{parser_version}:{hashlib.sha256(pdf_bytes).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma entrada e atualiza os contadores de acerto/falha.
+
+        Returns:
+            Optional[Dict[str, Any]]: Os dados armazenados ou None se não houver entrada.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT payload FROM parsed_pdf WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+                return None
+            conn.execute("UPDATE parsed_pdf SET last_access = ? WHERE key = ?", (time.time(), key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Armazena uma entrada e remove as menos usadas se o limite de tamanho for excedido.
+        """
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        parser_version = key.split(":", 1)[0]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO parsed_pdf VALUES (?, ?, ?, ?, ?)",
+                (key, parser_version, payload, size, time.time())
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove as entradas usadas há mais tempo até o total caber em max_bytes."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM parsed_pdf").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM parsed_pdf ORDER BY last_access"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM parsed_pdf WHERE key = ?", doomed)
+
+    def get_or_parse(
+        self,
+        pdf_source: PDFSource,
+        parser_version: str,
+        parse: Callable[[BinaryIO], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Devolve os dados do PDF a partir do cache ou, em caso de falha, executa o parser.
+
+        Resultados vazios (None) ou com chave "error" não são armazenados, para
+        que um arquivo que falhou seja processado de novo na próxima vez.
+
+        Args:
+            pdf_source (PDFSource): Caminho, bytes ou arquivo aberto do PDF.
+            parser_version (str): Versão do parser; entra na chave do cache.
+            parse (Callable): Função que extrai os dados a partir de um arquivo aberto.
+
+        Returns:
+            Optional[Dict[str, Any]]: Os dados extraídos (ou armazenados).
+        """
+        pdf_bytes = read_pdf_bytes(pdf_source)
+        key = self.make_key(pdf_bytes, parser_version)
+
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = parse(io.BytesIO(pdf_bytes))
+        if value is not None and "error" not in value:
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devolve os contadores do cache: entradas, bytes usados, limite, acertos e falhas.
+        """
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM parsed_pdf").fetchone()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+        }
+
+    def clear(self) -> None:
+        """Remove todas as entradas e zera os contadores."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM parsed_pdf")
+            conn.execute("UPDATE counters SET value = 0")
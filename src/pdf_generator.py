@@ -1,9 +1,19 @@
 # 1. Bibliotecas padrão (Standard Library)
+import hashlib
+import io
+import json
 import os
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Dict, Optional, Tuple
 
 # 2. Bibliotecas de terceiros (Third-party)
 from fpdf import FPDF
+from pypdf import PdfReader, PdfWriter
+
+# 3. Módulos da sua aplicação (Local application)
+from timing import timed
 
 # --- Constantes de Layout ---
 PAGE_WIDTH = 297
@@ -18,9 +28,36 @@ COL_WIDTHS = {
     "parecer": 25,
     "justificativa": 42
 }
+# Larguras das colunas na ordem em que são desenhadas
+CELL_WIDTHS = (
+    COL_WIDTHS["dest_code"],
+    COL_WIDTHS["dest_name"],
+    COL_WIDTHS["origin_code"],
+    COL_WIDTHS["origin_name"],
+    COL_WIDTHS["parecer"],
+    COL_WIDTHS["justificativa"]
+)
 BASE_LINE_HEIGHT = 5 
 CELL_PADDING = 2
 
+def draw_institution_header(pdf: FPDF, logo_path: Optional[str]):
+    """
+    Desenha o cabeçalho oficial (logo e nomes da universidade, centro e instituto).
+    """
+    if logo_path and os.path.exists(logo_path):
+        pdf.image(logo_path, pdf.l_margin, 8, 30)
+
+    x_after_logo = pdf.l_margin + 30 + 5
+    pdf.set_xy(x_after_logo, 8)
+    
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(0, 5, "UNIVERSIDADE FEDERAL DO RIO DE JANEIRO", 0, 1, "L")
+    pdf.set_x(x_after_logo)
+    pdf.cell(0, 5, "Centro de Ciências Matemáticas e da Natureza", 0, 1, "L")
+    pdf.set_x(x_after_logo)
+    pdf.cell(0, 5, "Instituto de Computação", 0, 1, "L")
+
+
 class CustomPDF(FPDF):
     """
     Classe customizada do FPDF para criar o cabeçalho e rodapé padronizados.
@@ -28,27 +65,25 @@ class CustomPDF(FPDF):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logo_path = None
+        self.subtitle = None
         self.set_margins(MARGIN, MARGIN, MARGIN)
+        # Quebras de linha já calculadas: (texto, largura, fonte) -> linhas
+        self._line_cache: Dict[tuple, Tuple[str, ...]] = {}
+        # Onde as linhas da tabela começam em cada página, logo abaixo do cabeçalho
+        self.table_top = MARGIN
 
     def header(self):
         # --- 1. Cabeçalho Oficial (Logo e Texto) ---
-        if self.logo_path and os.path.exists(self.logo_path):
-            self.image(self.logo_path, self.l_margin, 8, 30)
-
-        x_after_logo = self.l_margin + 30 + 5
-        self.set_xy(x_after_logo, 8)
-        
-        self.set_font("Arial", "B", 10)
-        self.cell(0, 5, "UNIVERSIDADE FEDERAL DO RIO DE JANEIRO", 0, 1, "L")
-        self.set_x(x_after_logo)
-        self.cell(0, 5, "Centro de Ciências Matemáticas e da Natureza", 0, 1, "L")
-        self.set_x(x_after_logo)
-        self.cell(0, 5, "Instituto de Computação", 0, 1, "L")
+        draw_institution_header(self, self.logo_path)
         
         # --- 2. Título do Documento ---
         self.set_font("Arial", "B", 16)
         self.ln(10)
         self.cell(0, 10, "Parecer de Análise de Equivalência de Disciplinas", 0, 1, "C")
+        if self.subtitle:
+            # Identificação do aluno, usada nas seções do relatório consolidado
+            self.set_font("Arial", "", 10)
+            self.cell(0, 5, self.subtitle, 0, 1, "C")
         self.ln(5)
 
         # --- 3. Cabeçalho da Tabela ---
@@ -71,124 +106,146 @@ class CustomPDF(FPDF):
         self.cell(COL_WIDTHS["origin_name"], BASE_LINE_HEIGHT, "Nome", 1, 0, "C", fill=True)
         self.cell(COL_WIDTHS["parecer"], BASE_LINE_HEIGHT, "Parecer", 1, 0, "C", fill=True)
         self.cell(COL_WIDTHS["justificativa"], BASE_LINE_HEIGHT, "Justificativa", 1, 1, "C", fill=True) 
+        self.table_top = self.get_y()
 
-    def _calculate_row_height(self, row_data: Dict) -> int:
+    @staticmethod
+    def _row_texts(row_data: Dict) -> List[str]:
         """
-        CALCULA a altura máxima necessária para a linha, ANTES de desenhá-la.
+        Monta os textos das 6 colunas da linha, na ordem de CELL_WIDTHS.
         """
         is_equivalent_str = str(row_data.get("is_equivalent", "Não")).lower()
         is_equivalent = is_equivalent_str in ['sim', 's', 'true', '1', 'verdadeiro']
         parecer_text = "Favorável" if is_equivalent else "Desfavorável"
-        
-        justification_text = row_data.get("justification") or ""
 
-        # --- CORREÇÃO APLICADA AQUI ---
         # Garantir que tudo seja string antes de passar para o PDF
-        cell_texts = [
+        return [
             str(row_data.get("dest_codes") or ""),
             str(row_data.get("dest_names") or ""),
             str(row_data.get("origin_codes") or ""),
             str(row_data.get("origin_names") or ""),
-            str(parecer_text),
-            str(justification_text)
-        ]
-        # --- FIM DA CORREÇÃO ---
-        
-        cell_widths = [
-            COL_WIDTHS["dest_code"],
-            COL_WIDTHS["dest_name"],
-            COL_WIDTHS["origin_code"],
-            COL_WIDTHS["origin_name"],
-            COL_WIDTHS["parecer"],
-            COL_WIDTHS["justificativa"]
+            parecer_text,
+            str(row_data.get("justification") or "")
         ]
-        
-        max_lines = 1
-        self.set_font("Arial", "", 8)
 
-        for i in range(len(cell_texts)):
-            text = cell_texts[i] # Agora é garantido que 'text' é uma string
-            width = cell_widths[i] - (CELL_PADDING * 2)
-            
-            if width <= 0: continue
-            
-            lines = self.multi_cell(
-                width, 
-                BASE_LINE_HEIGHT, 
-                text, 
+    def _split_lines(self, text: str, width: float) -> Tuple[str, ...]:
+        """
+        Quebra o texto em linhas para a largura informada, memorizando o resultado.
+
+        Textos repetidos (nomes de universidades, justificativas, "Favorável")
+        são medidos uma única vez por documento.
+        """
+        key = (text, width, self.font_family, self.font_style, self.font_size_pt)
+        lines = self._line_cache.get(key)
+        if lines is None:
+            lines = tuple(self.multi_cell(
+                width,
+                BASE_LINE_HEIGHT,
+                text,
                 border=0,
-                align="L", 
-                split_only=True
-            )
-            max_lines = max(max_lines, len(lines))
+                align="L",
+                dry_run=True,
+                output="LINES"
+            ))
+            self._line_cache[key] = lines
+        return lines
+
+    def _layout_row(self, row_data: Dict) -> Tuple[List[Tuple[str, ...]], float]:
+        """
+        Quebra cada célula da linha UMA vez e calcula a altura da linha.
+
+        Returns:
+            Tuple[List[Tuple[str, ...]], float]: As linhas de texto de cada célula
+            e a altura total da linha, usadas tanto na medição quanto no desenho.
+        """
+        cell_lines = [
+            self._split_lines(text, width - (CELL_PADDING * 2))
+            for text, width in zip(self._row_texts(row_data), CELL_WIDTHS)
+        ]
+        max_lines = max(1, max(len(lines) for lines in cell_lines))
+        return cell_lines, (max_lines * BASE_LINE_HEIGHT) + (CELL_PADDING / 2)
+
+    def _draw_row_part(self, cell_lines: List[Tuple[str, ...]], height: float, centered: bool):
+        """
+        Desenha as bordas de uma linha (ou de um pedaço dela) e as linhas de texto de cada célula.
+        """
+        start_y = self.get_y()
+        current_x = self.l_margin
 
-        return (max_lines * BASE_LINE_HEIGHT) + (CELL_PADDING / 2)
+        for width, lines in zip(CELL_WIDTHS, cell_lines):
+            self.rect(current_x, start_y, width, height)
+
+            if centered:
+                text_y = start_y + (height - len(lines) * BASE_LINE_HEIGHT) / 2
+            else:
+                text_y = start_y + CELL_PADDING / 4
+            for line in lines:
+                self.set_xy(current_x, text_y)
+                self.cell(width, BASE_LINE_HEIGHT, line, border=0, align="L")
+                text_y += BASE_LINE_HEIGHT
+
+            current_x += width
+
+        self.set_y(start_y + height)
 
     def print_table_row(self, row_data: Dict):
         """
-        Imprime uma linha da tabela, usando a altura pré-calculada.
+        Imprime uma linha da tabela a partir de um único layout da linha.
+
+        As bordas ocupam a altura total da linha e as linhas de texto de cada
+        célula são centralizadas verticalmente dentro dela. Se a linha não couber
+        no restante da página, ela começa na página seguinte (com o cabeçalho).
+
+        Uma linha mais alta que uma página inteira (ex.: uma justificativa muito
+        longa) não cabe em página nenhuma: ela é dividida, e cada página recebe
+        as linhas de texto que cabem nela, alinhadas ao topo.
         """
         self.set_font("Arial", "", 8)
         self.set_text_color(0, 0, 0)
-        
-        total_row_height = self._calculate_row_height(row_data)
-        
-        # --- Prepara os textos ---
-        is_equivalent_str = str(row_data.get("is_equivalent", "Não")).lower()
-        is_equivalent = is_equivalent_str in ['sim', 's', 'true', '1', 'verdadeiro']
-        parecer_text = "Favorável" if is_equivalent else "Desfavorável"
-        
-        justification_text = row_data.get("justification") or ""
 
-        # --- CORREÇÃO APLICADA AQUI ---
-        # Garantir que tudo seja string antes de passar para o PDF
-        cell_texts = [
-            str(row_data.get("dest_codes") or ""),
-            str(row_data.get("dest_names") or ""),
-            str(row_data.get("origin_codes") or ""),
-            str(row_data.get("origin_names") or ""),
-            str(parecer_text),
-            str(justification_text)
-        ]
-        # --- FIM DA CORREÇÃO ---
-        
-        cell_widths = [
-            COL_WIDTHS["dest_code"],
-            COL_WIDTHS["dest_name"],
-            COL_WIDTHS["origin_code"],
-            COL_WIDTHS["origin_name"],
-            COL_WIDTHS["parecer"],
-            COL_WIDTHS["justificativa"]
-        ]
-        
-        start_y = self.get_y()
-        current_x = self.l_margin
-        
-        for i in range(len(cell_texts)):
-            width = cell_widths[i]
-            text = cell_texts[i] # Agora é garantido que 'text' é uma string
-            
-            self.set_xy(current_x, start_y) 
-            
-            self.multi_cell(
-                width, 
-                total_row_height,
-                text, 
-                border=1, 
-                align="L",
-                new_x="RIGHT",
-                new_y="TOP"
+        cell_lines, total_row_height = self._layout_row(row_data)
+
+        if not self.will_page_break(total_row_height):
+            self._draw_row_part(cell_lines, total_row_height, centered=True)
+            return
+
+        page_space = self.page_break_trigger - self.table_top
+        if total_row_height <= page_space:
+            self.add_page()
+            self._draw_row_part(cell_lines, total_row_height, centered=True)
+            return
+
+        # Linha mais alta que a página: começa no espaço que sobra (ou na próxima
+        # página, se não couber nem uma linha de texto) e continua nas seguintes
+        remaining = cell_lines
+        while True:
+            fitting_lines = int((self.page_break_trigger - self.get_y() - CELL_PADDING / 2) // BASE_LINE_HEIGHT)
+            if fitting_lines < 1:
+                self.add_page()
+                continue
+            part_lines = max(len(lines) for lines in remaining)
+            if part_lines <= fitting_lines:
+                self._draw_row_part(remaining, part_lines * BASE_LINE_HEIGHT + CELL_PADDING / 2, centered=False)
+                return
+            self._draw_row_part(
+                [lines[:fitting_lines] for lines in remaining],
+                fitting_lines * BASE_LINE_HEIGHT + CELL_PADDING / 2,
+                centered=False
             )
-            current_x += width
-            
-        self.set_y(start_y + total_row_height)
+            remaining = [lines[fitting_lines:] for lines in remaining]
+            self.add_page()
 
 # --- Função Principal (a ser chamada pelo app.py) ---
 
-def create_pdf_bytes(results: list, logo_path: str) -> bytes:
+@timed()
+def create_pdf_bytes(results: list, logo_path: str, subtitle: Optional[str] = None) -> bytes:
     """
     Gera o conteúdo de um relatório em PDF como um objeto de bytes,
     com cabeçalho oficial e tabela formatada.
+
+    Args:
+        results (list): Os resultados da análise (veja core.find_equivalencies).
+        logo_path (str): Caminho do logo usado no cabeçalho.
+        subtitle (Optional[str]): Linha opcional abaixo do título (ex.: identificação do aluno).
     """
     found_results = [r for r in results if r.get("status") == "Encontrado"]
 
@@ -201,6 +258,7 @@ def create_pdf_bytes(results: list, logo_path: str) -> bytes:
 
     pdf = CustomPDF(orientation="L", unit="mm", format="A4")
     pdf.logo_path = logo_path
+    pdf.subtitle = subtitle
     pdf.set_auto_page_break(auto=True, margin=MARGIN)
     pdf.set_font("Arial", size=12)
     pdf.add_page()
@@ -211,6 +269,188 @@ def create_pdf_bytes(results: list, logo_path: str) -> bytes:
     return bytes(pdf.output())
 
 
+# --- Cache de Relatórios ---
+
+# Quantos relatórios recentes manter em memória (alguns KiB cada)
+REPORT_CACHE_SIZE = 32
+
+
+def report_fingerprint(results: list, *context: Any) -> str:
+    """
+    Hash estável de uma lista de resultados (e do contexto informado, ex.: versão das regras).
+
+    Resultados com o mesmo conteúdo geram o mesmo hash em qualquer sessão ou
+    execução, pois a serialização ordena as chaves e converte valores da planilha em texto.
+    """
+    payload = json.dumps([results, context], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    LRU limitado de relatórios em PDF já gerados, indexado por report_fingerprint.
+
+    Pode ser compartilhado entre sessões e threads: o conteúdo de um relatório
+    depende só dos resultados e do contexto que compõem a chave.
+    """
+
+    def __init__(self, max_entries: int = REPORT_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._reports: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def get_or_create(self, key: str, build: Callable[[], bytes]) -> bytes:
+        """
+        Devolve o relatório da chave, gerando-o com build() só se ainda não estiver no cache.
+        """
+        with self._lock:
+            report = self._reports.get(key)
+            if report is not None:
+                self._reports.move_to_end(key)
+                return report
+
+        # A geração acontece fora do lock; dois pedidos simultâneos da mesma chave geram o mesmo PDF
+        report = build()
+        with self._lock:
+            self._reports[key] = report
+            self._reports.move_to_end(key)
+            while len(self._reports) > self.max_entries:
+                self._reports.popitem(last=False)
+        return report
+
+
+# --- Relatório Consolidado (vários alunos em um único PDF) ---
+
+BUNDLE_INDEX_COLUMNS = (
+    ("#", 10),
+    ("Aluno", 90),
+    ("DRE", 35),
+    ("IES de Origem", 70),
+    ("Disciplinas", 25),
+    ("Páginas", 47)
+)
+
+
+def student_label(student: Dict) -> str:
+    """
+    Monta a identificação do aluno usada no sumário e no subtítulo da sua seção.
+    """
+    parts = [
+        student.get("name") or "Aluno não identificado",
+        f"DRE: {student['dre']}" if student.get("dre") else None,
+        f"IES de origem: {student['university']}" if student.get("university") else None
+    ]
+    return " - ".join(part for part in parts if part)
+
+
+def _render_student_section(task: Tuple[list, Optional[str], str]) -> bytes:
+    """
+    Gera a seção de um aluno (executado nos processos trabalhadores).
+    """
+    results, logo_path, subtitle = task
+    return create_pdf_bytes(results, logo_path, subtitle=subtitle)
+
+
+def _render_bundle_index(students: List[Dict], page_ranges: List[Tuple[int, int]], logo_path: Optional[str]) -> bytes:
+    """
+    Gera as páginas de sumário do consolidado, com o intervalo de páginas de cada aluno.
+    """
+    pdf = FPDF(orientation="L", unit="mm", format="A4")
+    pdf.set_margins(MARGIN, MARGIN, MARGIN)
+    pdf.set_auto_page_break(auto=True, margin=MARGIN)
+    pdf.add_page()
+    draw_institution_header(pdf, logo_path)
+
+    pdf.set_font("Arial", "B", 16)
+    pdf.ln(10)
+    pdf.cell(0, 10, "Relatório Consolidado de Análise de Equivalência", 0, 1, "C")
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 5, f"Total de alunos analisados: {len(students)}", 0, 1, "C")
+    pdf.ln(5)
+
+    pdf.set_font("Arial", "B", 9)
+    pdf.set_fill_color(230, 230, 230)
+    for title, width in BUNDLE_INDEX_COLUMNS:
+        pdf.cell(width, BASE_LINE_HEIGHT, title, 1, 0, "C", fill=True)
+    pdf.ln()
+
+    pdf.set_font("Arial", "", 8)
+    for position, (student, (first_page, last_page)) in enumerate(zip(students, page_ranges), start=1):
+        found = sum(1 for r in student.get("results", []) if r.get("status") == "Encontrado")
+        pages = str(first_page) if first_page == last_page else f"{first_page} a {last_page}"
+        values = (str(position), student.get("name") or "-", student.get("dre") or "-",
+                  student.get("university") or "-", str(found), pages)
+        for (_, width), value in zip(BUNDLE_INDEX_COLUMNS, values):
+            pdf.cell(width, BASE_LINE_HEIGHT + 1, value, 1, 0, "L")
+        pdf.ln()
+
+    # Espaço para a assinatura da comissão, que valida o consolidado inteiro
+    pdf.ln(20)
+    pdf.cell(0, 5, "_" * 60, 0, 1, "C")
+    pdf.cell(0, 5, "Assinatura da Comissão de Equivalência de Disciplinas", 0, 1, "C")
+
+    return bytes(pdf.output())
+
+
+@timed()
+def create_bundle_pdf_bytes(
+    students: List[Dict],
+    logo_path: Optional[str],
+    max_workers: Optional[int] = None
+) -> bytes:
+    """
+    Gera um único PDF com as análises de vários alunos, precedido de um sumário.
+
+    A seção de cada aluno tem o mesmo layout do relatório individual
+    (create_pdf_bytes), com a identificação do aluno abaixo do título. As seções
+    são geradas em paralelo, em processos separados, e depois unidas; o sumário
+    lista o intervalo de páginas de cada aluno e o PDF ganha um marcador por aluno.
+
+    Args:
+        students (List[Dict]): Um dicionário por aluno, com "results" (lista de resultados
+                               da análise) e, opcionalmente, "name", "dre" e "university".
+        logo_path (Optional[str]): Caminho do logo usado nos cabeçalhos.
+        max_workers (Optional[int]): Número de processos (padrão: número de CPUs).
+                                     Com 1, tudo é gerado no processo atual.
+
+    Returns:
+        bytes: O conteúdo do PDF consolidado.
+    """
+    tasks = [(student.get("results", []), logo_path, student_label(student)) for student in students]
+
+    if max_workers == 1 or len(tasks) <= 1:
+        sections = [_render_student_section(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            sections = list(executor.map(_render_student_section, tasks))
+
+    readers = [PdfReader(io.BytesIO(section)) for section in sections]
+    page_counts = [len(reader.pages) for reader in readers]
+
+    def page_ranges(index_pages: int) -> List[Tuple[int, int]]:
+        ranges, next_page = [], index_pages + 1
+        for count in page_counts:
+            ranges.append((next_page, next_page + count - 1))
+            next_page += count
+        return ranges
+
+    # O sumário é gerado duas vezes: a primeira só para saber quantas páginas ele ocupa
+    index_pages = len(PdfReader(io.BytesIO(_render_bundle_index(students, page_ranges(1), logo_path))).pages)
+    index_pdf = _render_bundle_index(students, page_ranges(index_pages), logo_path)
+
+    writer = PdfWriter()
+    writer.append(PdfReader(io.BytesIO(index_pdf)), outline_item="Sumário")
+    for student, reader in zip(students, readers):
+        writer.append(reader, outline_item=student_label(student))
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
 if __name__ == "__main__":
     # --- Bloco de Teste ---
     print("Iniciando teste de geração de PDF...")
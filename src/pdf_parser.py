@@ -1,6 +1,37 @@
+import bisect
+import functools
+import os
 import pdfplumber
 import re
 from pprint import pprint
+from statistics import median
+
+# Versão do parser de requerimentos. Faz parte da chave do ParsedPDFCache:
+# altere sempre que a extração mudar, para invalidar os resultados em cache.
+PARSER_VERSION = "requerimento-1"
+
+# Prefixos dos códigos de disciplina reconhecidos na tabela do requerimento.
+# Podem ser trocados no .env, separados por vírgula (ex.: REQUERIMENTO_ORIGIN_PREFIXES=MAT,INF,CTC,FIS).
+DEFAULT_UFRJ_PREFIXES = ("ICP", "MAE")
+DEFAULT_ORIGIN_PREFIXES = ("MAT", "INF", "CTC")
+
+# Modos de extração da tabela da página 2 (REQUERIMENTO_TABLE_MODE no .env).
+# "coordenadas" usa a posição de cada palavra; "texto" usa o texto diagramado da
+# página inteira. O modo por coordenadas recorre ao de texto se não achar a tabela.
+TABLE_MODE_COORDINATES = "coordenadas"
+TABLE_MODE_TEXT = "texto"
+DEFAULT_TABLE_MODE = TABLE_MODE_COORDINATES
+
+# Cabeçalho da tabela, na ordem das colunas
+TABLE_HEADER = ("CÓDIGO", "NOME", "CÓDIGO", "NOME", "ANO")
+# Folga (em pontos) para palavras que começam um pouco antes do título da coluna
+COLUMN_TOLERANCE = 5
+
+# Classes de linha da tabela (veja classify_lines)
+LINE_BLANK = "blank"
+LINE_SIMPLE = "primary-simple"
+LINE_COMPLEX = "primary-complex"
+LINE_FRAGMENT = "fragment"
 
 def find_value(text, pattern):
     """
@@ -11,11 +42,295 @@ def find_value(text, pattern):
         return match.group(1).strip()
     return None
 
-def parse_equivalencia_pdf(pdf_path):
+def _prefixes_from_env(variable, default):
+    value = os.getenv(variable)
+    if not value:
+        return default
+    return tuple(prefix.strip() for prefix in value.split(",") if prefix.strip())
+
+
+def get_code_prefixes():
+    """
+    Devolve os prefixos configurados: (prefixos UFRJ, prefixos de origem).
+    """
+    return (
+        _prefixes_from_env("REQUERIMENTO_UFRJ_PREFIXES", DEFAULT_UFRJ_PREFIXES),
+        _prefixes_from_env("REQUERIMENTO_ORIGIN_PREFIXES", DEFAULT_ORIGIN_PREFIXES)
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def build_line_pattern(ufrj_prefixes, origin_prefixes):
+    """
+    Compila UM padrão que reconhece as duas formas de linha principal da tabela.
+
+    A primeira alternativa é a linha simples (todos os campos na mesma linha);
+    a segunda, a linha complexa, cujo código de origem está nas linhas vizinhas.
+    Como a alternância fica no nível mais alto, a linha simples é testada por
+    completo antes da complexa, exatamente como nas duas regex separadas de antes.
+    Dois ou mais espaços seguidos são o que divide as colunas.
+
+    Args:
+        ufrj_prefixes (tuple[str, ...]): Prefixos dos códigos UFRJ (ex.: ("ICP", "MAE")).
+        origin_prefixes (tuple[str, ...]): Prefixos dos códigos de origem.
+
+    Returns:
+        re.Pattern: Padrão com os grupos s_* (linha simples) e c_* (linha complexa).
+    """
+    ufrj_code = "(?:" + "|".join(map(re.escape, ufrj_prefixes)) + r")\d{3}"
+    origin_code = "(?:" + "|".join(map(re.escape, origin_prefixes)) + r")\d{3,}"
+    return re.compile(
+        r"^(?:"
+        # A linha simples só é tentada se houver um código de origem em algum ponto da linha;
+        # sem isso, a falha custaria um backtracking quadrático nas linhas complexas.
+        rf"(?=.*\s{origin_code})"
+        rf"(?P<s_ufrj_code>{ufrj_code})\s+(?P<s_ufrj_name>.+?)\s{{2,}}"
+        rf"(?P<s_origin_code>{origin_code})\s+(?P<s_origin_name>.+?)\s+\d{{4}}"
+        r"|"
+        rf"(?P<c_ufrj_code>{ufrj_code})\s+(?P<c_ufrj_name>.+?)\s{{2,}}(?P<c_origin_name>.+?)\s+\d{{4}}"
+        r")$"
+    )
+
+
+def classify_lines(lines, line_pattern):
+    """
+    Classifica cada linha da tabela UMA única vez.
+
+    Returns:
+        list[tuple[str, object]]: Para cada linha, (classe, dado), onde o dado é o
+        match para as linhas principais e o texto sem espaços nas pontas para os fragmentos.
+    """
+    classified = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            classified.append((LINE_BLANK, None))
+            continue
+        match = line_pattern.match(line)
+        if match is None:
+            classified.append((LINE_FRAGMENT, line))
+        elif match.group("s_ufrj_code") is not None:
+            classified.append((LINE_SIMPLE, match))
+        else:
+            classified.append((LINE_COMPLEX, match))
+    return classified
+
+
+def stitch_disciplines(classified):
+    """
+    Monta as disciplinas em uma varredura linear das linhas já classificadas.
+
+    Uma linha complexa recebe como código de origem os fragmentos imediatamente
+    antes e depois dela (ex.: "CTC4002 +" acima e "INF1037" abaixo).
+    """
+    disciplines_list = []
+    for i, (kind, data) in enumerate(classified):
+        if kind == LINE_SIMPLE:
+            disciplines_list.append({
+                "ufrj_discipline": {
+                    "code": data.group("s_ufrj_code").strip(),
+                    "name": data.group("s_ufrj_name").strip()
+                },
+                "origin_discipline": {
+                    "code": data.group("s_origin_code").strip(),
+                    "name": data.group("s_origin_name").strip()
+                }
+            })
+        elif kind == LINE_COMPLEX:
+            origin_code_parts = []
+            if i > 0 and classified[i - 1][0] == LINE_FRAGMENT:
+                origin_code_parts.append(classified[i - 1][1])
+            if i + 1 < len(classified) and classified[i + 1][0] == LINE_FRAGMENT:
+                origin_code_parts.append(classified[i + 1][1])
+            disciplines_list.append({
+                "ufrj_discipline": {
+                    "code": data.group("c_ufrj_code").strip(),
+                    "name": data.group("c_ufrj_name").strip()
+                },
+                "origin_discipline": {
+                    "code": " ".join(origin_code_parts),
+                    "name": data.group("c_origin_name").strip()
+                }
+            })
+    return disciplines_list
+
+
+def get_table_mode():
+    """Devolve o modo de extração da tabela configurado (veja TABLE_MODE_*)."""
+    mode = (os.getenv("REQUERIMENTO_TABLE_MODE") or DEFAULT_TABLE_MODE).lower()
+    return mode if mode in (TABLE_MODE_COORDINATES, TABLE_MODE_TEXT) else DEFAULT_TABLE_MODE
+
+
+def _find_table_header(words):
+    """
+    Localiza a linha de cabeçalho da tabela (CÓDIGO, NOME, CÓDIGO, NOME, ANO).
+
+    Returns:
+        tuple[list[float], float] | None: (início de cada coluna no eixo x, base do
+        cabeçalho), ou None se o cabeçalho não estiver na página.
+    """
+    candidates = [w for w in words if w["text"].upper() in TABLE_HEADER]
+    for first in candidates:
+        if first["text"].upper() != TABLE_HEADER[0]:
+            continue
+        same_line = sorted(
+            (w for w in candidates if abs(w["top"] - first["top"]) < 3 and w["x0"] >= first["x0"]),
+            key=lambda w: w["x0"]
+        )
+        if tuple(w["text"].upper() for w in same_line) == TABLE_HEADER:
+            return [w["x0"] for w in same_line], max(w["bottom"] for w in same_line)
+    return None
+
+
+def _locate_table_header(page):
+    """
+    Localiza o cabeçalho da tabela sem extrair as palavras da página inteira: a
+    sequência do cabeçalho é encontrada no texto da página e só a faixa horizontal
+    dela é recortada para medir o início de cada coluna.
+
+    Returns:
+        tuple[list[float], float] | None: O mesmo retorno de _find_table_header.
+    """
+    pattern = r"\s+".join(map(re.escape, TABLE_HEADER))
+    for match in page.search(pattern, regex=True, case=False, return_chars=False):
+        header_strip = page.crop((0, max(0, match["top"] - 1), page.width, min(page.height, match["bottom"] + 1)))
+        header = _find_table_header(header_strip.extract_words())
+        if header is not None:
+            return header
+    return None
+
+
+def _cell_text(words):
+    """
+    Junta as palavras de uma célula em ordem de leitura: linha a linha, da esquerda para a direita.
+    """
+    lines = []
+    for word in sorted(words, key=lambda w: w["top"]):
+        # Palavras da mesma linha podem ter 'top' ligeiramente diferentes
+        if lines and word["top"] - lines[-1][0]["top"] < (word["bottom"] - word["top"]) / 2:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return " ".join(w["text"] for line in lines for w in sorted(line, key=lambda w: w["x0"]))
+
+
+def _row_bands(anchors, rulings):
+    """
+    Calcula a faixa vertical (topo, base) de cada linha da tabela.
+
+    Cada linha é identificada pelo código UFRJ (âncora). Quando a página tem
+    linhas horizontais separando as linhas da tabela, elas delimitam a faixa;
+    senão, a faixa vai até o meio do caminho para as âncoras vizinhas.
+    """
+    centers = [(a["top"] + a["bottom"]) / 2 for a in anchors]
+    if len(centers) > 1:
+        half_pitch = median(b - a for a, b in zip(centers, centers[1:])) / 2
+    else:
+        half_pitch = anchors[0]["bottom"] - anchors[0]["top"]
+
+    bands = []
+    for i, center in enumerate(centers):
+        top = (centers[i - 1] + center) / 2 if i > 0 else center - half_pitch
+        bottom = (center + centers[i + 1]) / 2 if i + 1 < len(centers) else center + half_pitch
+        above = [y for y in rulings if top - half_pitch <= y <= center]
+        below = [y for y in rulings if center <= y <= bottom + half_pitch]
+        if above and below:
+            top, bottom = max(above), min(below)
+        bands.append((top, bottom))
+    return bands
+
+
+def extract_table_by_coordinates(page, ufrj_prefixes):
+    """
+    Extrai a tabela de disciplinas da página 2 a partir da posição de cada palavra.
+
+    As colunas vêm do cabeçalho da tabela e as linhas, dos códigos UFRJ na
+    primeira coluna. Cada palavra dentro da tabela vai para a célula que a
+    contém, então códigos de origem quebrados em várias linhas ("CTC4002 +"
+    acima e "INF1037" abaixo) ficam juntos sem precisar olhar as linhas vizinhas.
+    Não exige a diagramação da página inteira em texto (extract_text(layout=True)).
+
+    Args:
+        page (pdfplumber.page.Page): A página da tabela.
+        ufrj_prefixes (tuple[str, ...]): Prefixos dos códigos UFRJ.
+
+    Returns:
+        list[dict] | None: As disciplinas, no mesmo formato do modo texto, ou None
+        se a tabela não foi encontrada (cabeçalho ou códigos UFRJ ausentes).
+    """
+    header = _locate_table_header(page)
+    if header is None:
+        return None
+    column_starts, header_bottom = header
+    column_bounds = [x - COLUMN_TOLERANCE for x in column_starts]
+
+    # Linhas horizontais que atravessam a tabela (as bordas das linhas do formulário)
+    table_width = page.width - column_bounds[0]
+    rulings = sorted(
+        line["top"] for line in page.lines
+        if abs(line["top"] - line["bottom"]) < 1 and line["x1"] - line["x0"] > table_width / 2
+    )
+
+    # Recorte da tabela: abaixo do cabeçalho, a partir da primeira coluna e até a
+    # última borda horizontal (ou o fim da página); só as palavras dele são extraídas
+    table_bottom = rulings[-1] if rulings and rulings[-1] > header_bottom else page.height
+    table_bbox = (max(0, column_bounds[0]), header_bottom, page.width, table_bottom)
+    table_words = page.within_bbox(table_bbox).extract_words()
+
+    ufrj_code = re.compile("(?:" + "|".join(map(re.escape, ufrj_prefixes)) + r")\d{3}")
+    anchors = sorted(
+        (w for w in table_words if w["x0"] < column_bounds[1] and ufrj_code.fullmatch(w["text"])),
+        key=lambda w: w["top"]
+    )
+    if not anchors:
+        return None
+
+    bands = _row_bands(anchors, rulings)
+    band_tops = [top for top, _ in bands]
+
+    cells = [[[] for _ in column_starts] for _ in anchors]
+    for word in table_words:
+        center = (word["top"] + word["bottom"]) / 2
+        row = bisect.bisect_right(band_tops, center) - 1
+        if row < 0 or center > bands[row][1]:
+            continue  # Fora das linhas da tabela (ex.: rodapé da página)
+        column = bisect.bisect_right(column_bounds, word["x0"]) - 1
+        cells[row][column].append(word)
+
+    disciplines_list = []
+    for anchor, row in zip(anchors, cells):
+        disciplines_list.append({
+            "ufrj_discipline": {"code": anchor["text"], "name": _cell_text(row[1])},
+            "origin_discipline": {"code": _cell_text(row[2]), "name": _cell_text(row[3])}
+        })
+    return disciplines_list
+
+
+def _cache_version():
+    # Os prefixos e o modo mudam o resultado da extração, então também entram na chave do cache
+    ufrj_prefixes, origin_prefixes = get_code_prefixes()
+    return f"{PARSER_VERSION}/{get_table_mode()}/{'|'.join(ufrj_prefixes)}/{'|'.join(origin_prefixes)}"
+
+
+def parse_equivalencia_pdf(pdf_path, cache=None):
     """
     Analisa o PDF de requerimento de equivalência e extrai os dados.
     Esta versão é robusta para PDFs "achatados" (não-formulário).
+
+    Se um ParsedPDFCache for informado, um arquivo com conteúdo idêntico a
+    um já processado é respondido pelo cache, sem abrir o PDF.
+    """
+    if cache is not None:
+        return cache.get_or_parse(pdf_path, _cache_version(), _parse_equivalencia_pdf)
+    return _parse_equivalencia_pdf(pdf_path)
+
+
+def _parse_equivalencia_pdf(pdf_path):
+    """
+    Extrai os dados do requerimento com o pdfplumber (sem cache).
     """
+    ufrj_prefixes, origin_prefixes = get_code_prefixes()
+    table_mode = get_table_mode()
     student_data = {
         "name": None,
         "email": None,
@@ -42,82 +357,14 @@ def parse_equivalencia_pdf(pdf_path):
             # --- Página 2: Tabela (Lógica Manual) ---
             if len(pdf.pages) > 1:
                 page_02 = pdf.pages[1]
-                text_02 = page_02.extract_text(layout=True)
-                lines = text_02.split('\n')
-                
-                disciplines_list = []
-                data_lines = lines
-                
-                # Regex para as linhas principais da tabela
-                # \s{2,} (dois ou mais espaços) é o que divide as colunas
-                simple_line_regex = re.compile(
-                    r'^((?:ICP|MAE)\d{3})\s+(.+?)\s{2,}((?:MAT|INF|CTC)\d{3,})\s+(.+?)\s+(\d{4})$'
-                )
-                complex_line_regex = re.compile(
-                    r'^((?:ICP|MAE)\d{3})\s+(.+?)\s{2,}(.+?)\s+(\d{4})$'
-                )
-                
-                # --- [A LÓGICA FINAL] ---
-                # Em vez de loops 'while', iteramos linha por linha.
-                # Se uma linha é "principal", ela é responsável por
-                # verificar suas linhas vizinhas (i-1 e i+1).
-
-                # Usamos um 'set' para rastrear as linhas "fragmento"
-                # que já foram usadas por uma linha principal.
-                processed_fragments = set()
-
-                for i, line in enumerate(data_lines):
-                    line = line.strip()
-                    if not line or i in processed_fragments:
-                        continue
-
-                    # CASO 1: Linha simples (Tudo nela)
-                    simple_match = simple_line_regex.match(line)
-                    if simple_match:
-                        disciplines_list.append({
-                            "ufrj_discipline": {
-                                "code": simple_match.group(1).strip(),
-                                "name": simple_match.group(2).strip()
-                            },
-                            "origin_discipline": {
-                                "code": simple_match.group(3).strip(),
-                                "name": simple_match.group(4).strip()
-                            }
-                        })
-                        continue
-
-                    # CASO 2: Linha complexa (Código em outras linhas)
-                    complex_match = complex_line_regex.match(line)
-                    if complex_match:
-                        ufrj_code = complex_match.group(1).strip()
-                        ufrj_name = complex_match.group(2).strip()
-                        origin_name = complex_match.group(3).strip()
-                        origin_code_parts = []
-
-                        # Olha 1 linha para TRÁS
-                        if i > 0:
-                            prev_line = data_lines[i-1].strip()
-                            # Se a linha anterior não for vazia e não for uma linha principal
-                            if prev_line and not simple_line_regex.match(prev_line) and not complex_line_regex.match(prev_line):
-                                origin_code_parts.append(prev_line)
-                                processed_fragments.add(i-1)
-
-                        # Olha 1 linha para FRENTE
-                        if i + 1 < len(data_lines):
-                            next_line = data_lines[i+1].strip()
-                            # Se a linha seguinte não for vazia e não for uma linha principal
-                            if next_line and not simple_line_regex.match(next_line) and not complex_line_regex.match(next_line):
-                                origin_code_parts.append(next_line)
-                                processed_fragments.add(i+1)
-                        
-                        disciplines_list.append({
-                            "ufrj_discipline": {"code": ufrj_code, "name": ufrj_name},
-                            "origin_discipline": {
-                                "code": " ".join(origin_code_parts),
-                                "name": origin_name
-                            }
-                        })
-                        
+                disciplines_list = None
+                if table_mode == TABLE_MODE_COORDINATES:
+                    disciplines_list = extract_table_by_coordinates(page_02, ufrj_prefixes)
+                if disciplines_list is None:
+                    text_02 = page_02.extract_text(layout=True)
+                    lines = text_02.split('\n')
+                    line_pattern = build_line_pattern(ufrj_prefixes, origin_prefixes)
+                    disciplines_list = stitch_disciplines(classify_lines(lines, line_pattern))
                 student_data['disciplines'] = disciplines_list
 
     except Exception as e:
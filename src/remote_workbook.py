@@ -0,0 +1,89 @@
+# 1. Bibliotecas padrão (Standard Library)
+import hashlib
+import threading
+from typing import Optional
+
+# 2. Bibliotecas de terceiros (Third-party)
+import requests
+
+# 3. Módulos da sua aplicação (Local application)
+from timing import timed
+
+
+class RemoteWorkbook:
+    """
+    Baixa a planilha de uma URL apenas quando ela mudou.
+
+    Guarda o ETag, o Last-Modified e o hash do último conteúdo recebido e os
+    envia como requisição condicional (If-None-Match / If-Modified-Since).
+    Uma resposta 304, ou um conteúdo com o mesmo hash do anterior, indica que
+    a planilha não mudou e que as regras já compiladas podem ser mantidas.
+
+    Também aceita um caminho local no lugar da URL; nesse caso só o hash é comparado.
+    """
+
+    def __init__(self, url: str, timeout: float = 60, session: Optional[requests.Session] = None):
+        """
+        Args:
+            url (str): URL (http/https) ou caminho local da planilha.
+            timeout (float): Tempo máximo, em segundos, de cada requisição.
+            session (Optional[requests.Session]): Sessão HTTP a reutilizar entre as requisições.
+        """
+        self.url = url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.content_hash: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_remote(self) -> bool:
+        return self.url.startswith(("http://", "https://"))
+
+    @timed("fetch_workbook")
+    def fetch(self) -> Optional[bytes]:
+        """
+        Busca a planilha, devolvendo o conteúdo apenas se ele mudou desde a última busca.
+
+        Returns:
+            Optional[bytes]: O conteúdo novo, ou None se a planilha não mudou.
+
+        Raises:
+            requests.RequestException | OSError: Se a planilha não puder ser obtida.
+        """
+        with self._lock:
+            if self.is_remote:
+                headers = {}
+                if self.etag:
+                    headers["If-None-Match"] = self.etag
+                if self.last_modified:
+                    headers["If-Modified-Since"] = self.last_modified
+
+                response = self.session.get(self.url, headers=headers, timeout=self.timeout)
+                if response.status_code == 304:
+                    return None
+                response.raise_for_status()
+
+                self.etag = response.headers.get("ETag")
+                self.last_modified = response.headers.get("Last-Modified")
+                content = response.content
+            else:
+                with open(self.url, "rb") as f:
+                    content = f.read()
+
+            content_hash = hashlib.sha256(content).hexdigest()
+            if content_hash == self.content_hash:
+                return None
+            self.content_hash = content_hash
+            return content
+
+    def forget(self) -> None:
+        """
+        Esquece o ETag, o Last-Modified e o hash, forçando o próximo fetch() a
+        devolver o conteúdo. Use quando o conteúdo recebido não pôde ser aproveitado.
+        """
+        with self._lock:
+            self.etag = None
+            self.last_modified = None
+            self.content_hash = None
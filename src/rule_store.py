@@ -0,0 +1,321 @@
+"""
+Banco SQLite com as regras de equivalência, compilado a partir da planilha.
+
+A importação grava as regras já normalizadas (uma tabela de regras e tabelas
+de ligação com cada código de origem e de destino, todas indexadas) em um
+arquivo novo e só então o troca pelo anterior, de forma atômica. Depois disso
+o banco é somente leitura: vários processos do app, da CLI ou do serviço podem
+abri-lo ao mesmo tempo, e a busca de equivalências consulta apenas as regras
+que citam os códigos do aluno, sem carregar a planilha em memória.
+
+Uso:
+    python src/rule_store.py "data/Equivalencias de Disciplinas.xlsx" data/regras.sqlite
+"""
+# 1. Bibliotecas padrão (Standard Library)
+import argparse
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, Optional
+
+# 2. Bibliotecas de terceiros (Third-party)
+from pandas import DataFrame
+
+# 3. Módulos da sua aplicação (Local application)
+from core import (
+    CompiledRules,
+    LazyRuleBook,
+    Rule,
+    RuleBook,
+    build_rulebook,
+    compile_rule_records,
+    split_rule_codes
+)
+from data_loader import get_snapshot_dir, load_spreadsheet, workbook_hash
+from timing import timed
+
+# Versão do esquema; bancos de outra versão precisam ser importados de novo
+SCHEMA_VERSION = "1"
+
+# Colunas de exibição da regra, na ordem dos campos de core.Rule e das colunas da planilha
+RULE_COLUMNS = ("origin_codes", "origin_names", "is_equivalent", "dest_codes", "dest_names", "justification")
+SHEET_COLUMNS = (
+    "Códigos Origem",
+    "Nomes Origem",
+    "Equivalente?",
+    "Códigos UFRJ Destino",
+    "Nomes UFRJ Destino",
+    "Justificativa Parecer"
+)
+
+SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE universities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    position INTEGER NOT NULL
+);
+CREATE TABLE rules (
+    id INTEGER PRIMARY KEY,
+    university_id INTEGER NOT NULL REFERENCES universities (id),
+    position INTEGER NOT NULL,
+    origin_codes, origin_names, is_equivalent, dest_codes, dest_names, justification
+);
+CREATE TABLE rule_origin_codes (
+    university_id INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    rule_id INTEGER NOT NULL REFERENCES rules (id),
+    PRIMARY KEY (university_id, code, rule_id)
+) WITHOUT ROWID;
+CREATE TABLE rule_dest_codes (
+    code TEXT NOT NULL,
+    rule_id INTEGER NOT NULL REFERENCES rules (id),
+    PRIMARY KEY (code, rule_id)
+) WITHOUT ROWID;
+CREATE INDEX idx_rules_university ON rules (university_id, position);
+CREATE INDEX idx_rule_origin_codes_code ON rule_origin_codes (code);
+"""
+
+
+def _to_sql(value: Any) -> Any:
+    """Valor da planilha -> valor gravável no SQLite (NaN vira NULL; tipos desconhecidos, texto)."""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _from_sql(value: Any) -> Any:
+    """NULL volta a ser NaN, como nas regras lidas da planilha pelo pandas."""
+    return math.nan if value is None else value
+
+
+def _rule_from_row(row: tuple) -> Rule:
+    values = [_from_sql(value) for value in row]
+    return Rule(*values, split_rule_codes(values[0]))
+
+
+@timed()
+def import_rulebook(rulebook: RuleBook, db_path: str, source_hash: Optional[str] = None) -> None:
+    """
+    Grava as regras compiladas em um banco SQLite novo, que substitui o anterior de forma atômica.
+
+    O banco é montado em um arquivo temporário no mesmo diretório e trocado com
+    os.replace: quem já está lendo o banco antigo continua com ele até reabrir,
+    e ninguém enxerga uma importação pela metade.
+
+    Args:
+        rulebook (RuleBook): As regras compiladas (veja core.build_rulebook).
+        db_path (str): Caminho do banco a criar ou substituir.
+        source_hash (Optional[str]): Hash dos bytes da planilha de origem, gravado para
+                                     que uma nova importação da mesma planilha possa ser evitada.
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{db_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # Modo de journal padrão (DELETE), sem arquivos -wal/-shm que pudessem ficar
+        # associados ao arquivo antigo depois da troca
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [
+                    ("schema_version", SCHEMA_VERSION),
+                    ("rulebook_version", rulebook.version),
+                    ("source_hash", source_hash or ""),
+                    ("imported_at", str(time.time())),
+                ]
+            )
+            rule_id = 0
+            for university_id, university in enumerate(rulebook.universities):
+                conn.execute("INSERT INTO universities VALUES (?, ?, ?)", (university_id, university, university_id))
+                rule_rows, origin_rows, dest_rows = [], [], []
+                for position, rule in enumerate(rulebook[university].rules):
+                    rule_id += 1
+                    rule_rows.append(
+                        (rule_id, university_id, position, *(_to_sql(value) for value in rule[:len(RULE_COLUMNS)]))
+                    )
+                    origin_rows.extend((university_id, code, rule_id) for code in rule.required_codes)
+                    dest_rows.extend((code, rule_id) for code in split_rule_codes(rule.dest_codes))
+                conn.executemany("INSERT INTO rules VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rule_rows)
+                conn.executemany("INSERT INTO rule_origin_codes VALUES (?, ?, ?)", origin_rows)
+                conn.executemany("INSERT INTO rule_dest_codes VALUES (?, ?)", dest_rows)
+        conn.execute("ANALYZE")
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def read_store_meta(db_path: str) -> Optional[dict[str, str]]:
+    """
+    Lê os metadados do banco (versões, hash da planilha, data da importação).
+
+    Returns:
+        Optional[dict[str, str]]: Os metadados, ou None se o banco não existir ou for de outro esquema.
+    """
+    if not os.path.exists(db_path):
+        return None
+    try:
+        conn = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        return None
+    return meta if meta.get("schema_version") == SCHEMA_VERSION else None
+
+
+class SQLiteRuleBook(LazyRuleBook):
+    """
+    RuleBook que responde a partir do banco SQLite de import_rulebook.
+
+    find_equivalencies consulta apenas as regras que citam os códigos do aluno
+    (rules_for_codes), pelo índice (universidade, código); as buscas por código
+    de destino também são uma consulta indexada. As demais operações, que
+    precisam da aba inteira (sugestões, lote), usam o LRU de abas do LazyRuleBook,
+    lendo a aba do banco em vez da planilha.
+
+    Cada thread usa a sua própria conexão somente leitura, aberta uma vez.
+    """
+
+    def __init__(self, db_path: str, max_loaded: int = 8):
+        """
+        Args:
+            db_path (str): Caminho do banco criado por import_rulebook.
+            max_loaded (int): Quantas abas completas manter em memória ao mesmo tempo.
+        """
+        self.db_path = db_path
+        self._uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self._local = threading.local()
+
+        conn = self._connection()
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("schema_version") != SCHEMA_VERSION:
+            raise ValueError(f"O banco '{db_path}' foi criado com outro esquema; importe a planilha novamente.")
+        universities = conn.execute("SELECT id, name FROM universities ORDER BY position").fetchall()
+        self._university_ids = {name: university_id for university_id, name in universities}
+        super().__init__(
+            [name for _, name in universities],
+            self._read_sheet,
+            version=meta["rulebook_version"],
+            max_loaded=max_loaded
+        )
+
+    def __reduce__(self):
+        # Conexões e locks não são serializáveis; outro processo reabre o mesmo arquivo
+        return (SQLiteRuleBook, (self.db_path, self.max_loaded))
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self._uri, uri=True, check_same_thread=False)
+        return conn
+
+    def _read_sheet(self, university: str) -> DataFrame:
+        """Lê a aba inteira do banco, no formato da planilha (usado pelo LRU do LazyRuleBook)."""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(RULE_COLUMNS)} FROM rules WHERE university_id = ? ORDER BY position",
+            (self._university_ids[university],)
+        ).fetchall()
+        return DataFrame([[_from_sql(value) for value in row] for row in rows], columns=list(SHEET_COLUMNS))
+
+    def rules_for_codes(self, university: str, input_codes: Iterable[str]) -> CompiledRules:
+        """
+        Apenas as regras da universidade que citam algum dos códigos, na ordem da planilha.
+
+        Como o casamento só visita regras alcançáveis pelos códigos informados,
+        o resultado é o mesmo de consultar a aba inteira.
+        """
+        # Se a aba inteira já está em memória, ela responde sem ir ao banco
+        compiled = self._get_loaded(university)
+        if compiled is not None:
+            return compiled
+
+        codes = list(input_codes)
+        if not codes:
+            return compile_rule_records(())
+        rows = self._connection().execute(
+            f"""
+            SELECT {', '.join(RULE_COLUMNS)} FROM rules
+            WHERE id IN (
+                SELECT rule_id FROM rule_origin_codes
+                WHERE university_id = ? AND code IN ({', '.join('?' * len(codes))})
+            )
+            ORDER BY position
+            """,
+            (self._university_ids[university], *codes)
+        ).fetchall()
+        return compile_rule_records(_rule_from_row(row) for row in rows)
+
+    def rules_for_destination(self, dest_code: str) -> tuple[tuple[str, Rule], ...]:
+        """Pares (universidade, regra) das regras com o código UFRJ de destino, por consulta indexada."""
+        rows = self._connection().execute(
+            f"""
+            SELECT u.name, {', '.join('r.' + column for column in RULE_COLUMNS)}
+            FROM rule_dest_codes d
+            JOIN rules r ON r.id = d.rule_id
+            JOIN universities u ON u.id = r.university_id
+            WHERE d.code = ?
+            ORDER BY u.position, r.position
+            """,
+            (dest_code,)
+        ).fetchall()
+        return tuple((row[0], _rule_from_row(row[1:])) for row in rows)
+
+
+def import_workbook(workbook_path: str, db_path: str) -> Optional[RuleBook]:
+    """
+    Lê a planilha, compila as regras e grava o banco SQLite.
+
+    Returns:
+        Optional[RuleBook]: As regras importadas, ou None se a planilha não pôde ser lida.
+    """
+    spreadsheet_data = load_spreadsheet(workbook_path, get_snapshot_dir())
+    if spreadsheet_data is None:
+        return None
+    rulebook = build_rulebook(spreadsheet_data)
+    with open(workbook_path, "rb") as f:
+        source_hash = workbook_hash(f.read())
+    import_rulebook(rulebook, db_path, source_hash)
+    return rulebook
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa a planilha de equivalências para um banco SQLite.")
+    parser.add_argument("workbook", help="Planilha .xlsx com as regras de equivalência.")
+    parser.add_argument("database", help="Arquivo SQLite a criar ou substituir.")
+    args = parser.parse_args(argv)
+
+    rulebook = import_workbook(args.workbook, args.database)
+    if rulebook is None:
+        print(f"ERRO: não foi possível ler a planilha '{args.workbook}'.", file=sys.stderr)
+        return 2
+    if not rulebook:
+        print("ERRO: nenhuma aba da planilha contém as colunas obrigatórias.", file=sys.stderr)
+        return 2
+    total = sum(len(rulebook[university]) for university in rulebook)
+    print(
+        f"{total} regra(s) de {len(rulebook)} universidade(s) importada(s) em "
+        f"'{args.database}' (regras {rulebook.version})."
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
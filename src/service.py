@@ -0,0 +1,384 @@
+"""
+Serviço HTTP/JSON local em volta do núcleo de equivalências, para scripts da secretaria.
+
+Mantém o RuleBook carregado em memória durante toda a vida do processo: a busca
+de equivalências roda direto na thread da requisição (é uma consulta a índices),
+enquanto a leitura de requerimentos e a geração de relatórios, que usam a CPU
+por dezenas de milissegundos, vão para um conjunto limitado de processos. Quando
+todos os processos estão ocupados e a fila está cheia, o serviço responde 503
+com Retry-After em vez de acumular requisições.
+
+Rotas:
+    GET  /saude           Estado do serviço, versão das regras e ocupação da fila.
+    GET  /universidades   Universidades (abas) disponíveis.
+    POST /equivalencias   JSON {"university": "...", "codes": "INF1025 MAT1161"}.
+    POST /requerimentos   PDF do requerimento no corpo; devolve os dados lidos e a análise.
+    POST /relatorios      JSON {"results": [...], "subtitle": "..."}; devolve o PDF do relatório.
+
+Uso:
+    python src/service.py --workbook "data/Equivalencias de Disciplinas.xlsx" --port 8765 --workers 2
+    python src/service.py --rules-db data/regras.sqlite --port 8765 --workers 2
+"""
+# 1. Bibliotecas padrão (Standard Library)
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+# 3. Módulos da sua aplicação (Local application)
+from cli import DEFAULT_LOGO_PATH, _json_safe, codes_from_disciplines, load_rulebook, match_university
+from core import LazyRuleBook, RuleBook, find_equivalencies
+from pdf_cache import ParsedPDFCache
+from pdf_generator import create_pdf_bytes
+from pdf_parser import parse_equivalencia_pdf
+
+# Maior corpo aceito por requisição (um requerimento típico tem poucas centenas de KiB)
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# Tempo máximo de espera por uma tarefa do conjunto de processos
+TASK_TIMEOUT_SECONDS = 60
+# Sugestão de espera enviada no Retry-After quando a fila está cheia
+RETRY_AFTER_SECONDS = 1
+
+# Estado de cada processo trabalhador, preenchido por _init_worker
+_worker_logo_path: Optional[str] = None
+_worker_parse_cache: Optional[ParsedPDFCache] = None
+
+
+def _init_worker(logo_path: Optional[str], parse_cache_path: Optional[str]) -> None:
+    """
+    Inicializa um processo trabalhador. Ele não precisa do RuleBook: só lê PDFs e gera relatórios.
+    """
+    global _worker_logo_path, _worker_parse_cache
+    _worker_logo_path = logo_path
+    _worker_parse_cache = ParsedPDFCache(parse_cache_path) if parse_cache_path else None
+
+
+def _parse_task(pdf_bytes: bytes) -> Optional[Dict[str, Any]]:
+    return parse_equivalencia_pdf(io.BytesIO(pdf_bytes), cache=_worker_parse_cache)
+
+
+def _render_task(results: list, subtitle: Optional[str]) -> bytes:
+    return create_pdf_bytes(results, _worker_logo_path, subtitle)
+
+
+class WorkerPool:
+    """
+    Conjunto de processos com fila limitada.
+
+    No máximo max_pending tarefas ficam em andamento ou aguardando ao mesmo
+    tempo; além disso, submit() devolve None na hora, para que o chamador
+    responda 503 em vez de deixar a requisição esperando indefinidamente.
+    """
+
+    def __init__(self, workers: int, max_pending: int, initargs: tuple):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=initargs
+        )
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        """Tarefas em andamento ou na fila."""
+        return self._pending
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, func: Callable, *args: Any) -> Optional[Future]:
+        """
+        Envia func(*args) para um processo, se houver vaga na fila.
+
+        Returns:
+            Optional[Future]: A tarefa enviada, ou None se a fila estiver cheia.
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._executor.submit(func, *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class EquivalenceService:
+    """
+    Estado compartilhado pelas requisições: o RuleBook carregado e o conjunto de processos.
+    """
+
+    def __init__(self, rulebook: RuleBook | LazyRuleBook, pool: WorkerPool):
+        self.rulebook = rulebook
+        self.pool = pool
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "rulebook_version": self.rulebook.version,
+            "universities": len(self.rulebook),
+            "workers": self.pool.workers,
+            "pending_tasks": self.pool.pending,
+            "max_pending_tasks": self.pool.max_pending,
+        }
+
+    def analyse(self, university: str, codes: Any) -> Dict[str, Any]:
+        """
+        Busca as equivalências dos códigos na aba da universidade.
+
+        Args:
+            university (str): Nome da aba da planilha.
+            codes (Any): Códigos separados por espaço, vírgula ou quebra de linha, ou uma lista de códigos.
+        """
+        if isinstance(codes, list):
+            codes = " ".join(str(code) for code in codes)
+        results = find_equivalencies(self.rulebook, university, str(codes))
+        return {
+            "university": university,
+            "rulebook_version": self.rulebook.version,
+            "results": results,
+            "not_found": [r["input_code"] for r in results if r.get("status") == "Não Encontrado na Planilha"],
+        }
+
+
+class ServiceError(Exception):
+    """Erro da requisição, convertido em uma resposta JSON com o status HTTP informado."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service: EquivalenceService  # Definido em make_server
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em duas escritas; com o algoritmo de Nagle ligado, o ACK
+    # atrasado do cliente somaria ~40 ms a cada resposta de uma conexão keep-alive
+    disable_nagle_algorithm = True
+
+    def log_request(self, code: Any = "-", size: Any = "-") -> None:
+        # Sem log de acesso: sob carga ele custaria mais do que a própria busca. Erros continuam no stderr.
+        pass
+
+    # --- Respostas ---
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            # Avisa o cliente de que a conexão não será reaproveitada
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(_json_safe(payload), ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    # --- Leitura da requisição ---
+
+    def _read_body(self) -> bytes:
+        header = (self.headers.get("Content-Length") or "0").strip()
+        if not (header.isascii() and header.isdigit()):
+            # Sem um tamanho válido não há como ler o corpo nem reaproveitar a conexão
+            self.close_connection = True
+            raise ServiceError(400, "Cabeçalho Content-Length inválido.")
+        length = int(header)
+        if length > MAX_BODY_BYTES:
+            # O corpo não será lido, então a conexão não pode ser reaproveitada
+            self.close_connection = True
+            raise ServiceError(413, f"Corpo maior que o limite de {MAX_BODY_BYTES // (1024 * 1024)} MiB.")
+        return self.rfile.read(length)
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except ValueError:
+            raise ServiceError(400, "O corpo da requisição não é um JSON válido.")
+        if not isinstance(payload, dict):
+            raise ServiceError(400, "O corpo da requisição deve ser um objeto JSON.")
+        return payload
+
+    def _run_in_pool(self, func: Callable, *args: Any) -> Any:
+        future = self.service.pool.submit(func, *args)
+        if future is None:
+            raise ServiceError(
+                503, "Todos os processos estão ocupados; tente novamente em instantes.",
+                {"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        try:
+            return future.result(timeout=TASK_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            raise ServiceError(504, "A tarefa não terminou dentro do tempo limite.")
+
+    # --- Rotas ---
+
+    def do_GET(self) -> None:
+        self._dispatch({
+            "/saude": lambda: self._send_json(200, self.service.health()),
+            "/universidades": lambda: self._send_json(200, {"universities": self.service.rulebook.universities}),
+        })
+
+    def do_POST(self) -> None:
+        self._dispatch({
+            "/equivalencias": self._post_equivalencias,
+            "/requerimentos": self._post_requerimentos,
+            "/relatorios": self._post_relatorios,
+        })
+
+    def _dispatch(self, routes: Dict[str, Callable[[], None]]) -> None:
+        route = routes.get(self.path.split("?", 1)[0])
+        try:
+            if route is None:
+                self.close_connection = True  # O corpo, se houver, não será lido
+                raise ServiceError(404, f"Rota '{self.path}' não encontrada.")
+            route()
+        except ServiceError as e:
+            self._send_json(e.status, {"error": str(e)}, e.headers)
+        except Exception as e:
+            self.log_error("Erro ao atender %s: %r", self.path, e)
+            self._send_json(500, {"error": "Erro interno do serviço."})
+
+    def _post_equivalencias(self) -> None:
+        payload = self._read_json()
+        university = payload.get("university")
+        if not isinstance(university, str):
+            raise ServiceError(400, "Informe o nome da aba da universidade (texto) em 'university'.")
+        codes = payload.get("codes")
+        if not isinstance(codes, (str, list)) or (
+            isinstance(codes, list) and not all(isinstance(code, str) for code in codes)
+        ):
+            raise ServiceError(400, "'codes' deve ser um texto ou uma lista de códigos (textos).")
+        if university not in self.service.rulebook:
+            raise ServiceError(404, f"A aba '{university}' não existe na planilha.")
+        if not codes:
+            raise ServiceError(400, "Informe os códigos das disciplinas em 'codes'.")
+        self._send_json(200, self.service.analyse(university, codes))
+
+    def _post_requerimentos(self) -> None:
+        pdf_bytes = self._read_body()
+        if not pdf_bytes.startswith(b"%PDF"):
+            raise ServiceError(400, "O corpo da requisição deve ser o PDF do requerimento.")
+
+        student_data = self._run_in_pool(_parse_task, pdf_bytes)
+        if student_data is None or "error" in student_data:
+            raise ServiceError(422, "Não foi possível ler o PDF do requerimento.")
+
+        response: Dict[str, Any] = {
+            "student": {key: value for key, value in student_data.items() if key != "disciplines"},
+            "disciplines": student_data["disciplines"],
+        }
+        university = match_university(student_data.get("origin_institution"), self.service.rulebook.universities)
+        if university is None:
+            response["university"] = None
+            response["error"] = (
+                f"Instituição '{student_data.get('origin_institution')}' não corresponde a nenhuma aba da planilha."
+            )
+        else:
+            response.update(self.service.analyse(university, codes_from_disciplines(student_data["disciplines"])))
+        self._send_json(200, response)
+
+    def _post_relatorios(self) -> None:
+        payload = self._read_json()
+        results = payload.get("results")
+        if not isinstance(results, list):
+            raise ServiceError(400, "Informe os resultados da análise em 'results'.")
+        if not all(
+            isinstance(result, dict) and all(isinstance(value, (str, type(None))) for value in result.values())
+            for result in results
+        ):
+            raise ServiceError(400, "Cada item de 'results' deve ser um objeto com campos de texto.")
+        if not isinstance(payload.get("subtitle"), (str, type(None))):
+            raise ServiceError(400, "'subtitle' deve ser um texto.")
+        pdf_bytes = self._run_in_pool(_render_task, results, payload.get("subtitle"))
+        self._send(200, pdf_bytes, "application/pdf")
+
+
+def make_server(host: str, port: int, service: EquivalenceService) -> ThreadingHTTPServer:
+    """
+    Cria o servidor HTTP (uma thread por conexão) ligado ao serviço informado.
+    """
+    handler = type("BoundRequestHandler", (RequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Serviço HTTP/JSON local para buscar equivalências, ler requerimentos e gerar relatórios."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--workbook", help="Planilha .xlsx com as regras de equivalência.")
+    source.add_argument(
+        "--rules-db",
+        help="Banco SQLite importado da planilha (veja rule_store.py), no lugar de --workbook."
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Porta de escuta (padrão: 8765).")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Processos para ler PDFs e gerar relatórios (padrão: número de CPUs)."
+    )
+    parser.add_argument(
+        "--max-pending", type=int,
+        help="Tarefas de PDF em andamento ou na fila antes de responder 503 (padrão: 4 por processo)."
+    )
+    parser.add_argument("--logo", default=DEFAULT_LOGO_PATH, help="Logo usado no cabeçalho dos relatórios.")
+    parser.add_argument(
+        "--parse-cache",
+        help="Arquivo SQLite para reaproveitar a leitura de PDFs idênticos entre requisições."
+    )
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    rulebook = load_rulebook(args)
+    if rulebook is None:
+        return 2
+    if args.parse_cache:
+        # Cria o banco antes de iniciar os processos, para que não disputem a criação das tabelas
+        ParsedPDFCache(args.parse_cache)
+    logo_path = args.logo if args.logo and os.path.exists(args.logo) else None
+
+    workers = max(1, args.workers)
+    pool = WorkerPool(workers, args.max_pending or 4 * workers, (logo_path, args.parse_cache))
+    server = make_server(args.host, args.port, EquivalenceService(rulebook, pool))
+    print(
+        f"Servindo {len(rulebook)} universidade(s) (regras {rulebook.version}) em "
+        f"http://{args.host}:{server.server_port} com {workers} processo(s)."
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
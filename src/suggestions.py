@@ -0,0 +1,117 @@
+# 1. Bibliotecas padrão (Standard Library)
+import heapq
+import math
+import re
+import unicodedata
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+# 2. Bibliotecas de terceiros (Third-party)
+import numpy as np
+
+# Similaridade mínima (coeficiente de Jaccard entre trigramas) para uma sugestão
+MIN_SIMILARITY = 0.3
+# Quantas sugestões devolver por código não encontrado
+DEFAULT_SUGGESTIONS = 3
+# Palavras dos nomes menores que isso (de, e, da, ...) ficam fora do índice
+MIN_WORD_LENGTH = 3
+
+
+def normalize_term(text: Any) -> str:
+    """
+    Normaliza um termo para comparação: sem acentos, minúsculo e só com letras e dígitos.
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"[^0-9a-z]+", " ", without_accents.casefold()).strip()
+
+
+def trigrams(term: str) -> frozenset[str]:
+    """
+    Trigramas de caracteres de um termo já normalizado, com o preenchimento usual
+    (dois espaços antes e um depois), para que o início do termo pese mais.
+    """
+    padded = f"  {term} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    """
+    Índice de trigramas dos códigos e nomes de origem das regras de UMA universidade.
+
+    Cada código de origem e cada palavra do nome de origem viram um termo; o
+    índice invertido mapeia cada trigrama para os termos que o contêm. Uma
+    consulta só visita os termos que compartilham algum trigrama com o código
+    procurado, em vez de comparar o código com a aba inteira.
+
+    As listas do índice são arrays do NumPy: a contagem de trigramas em comum
+    e o filtro pela similaridade mínima rodam vetorizados, e só os poucos
+    termos que passam no filtro são comparados em Python.
+    """
+    __slots__ = ("term_rules", "term_sizes", "postings")
+
+    def __init__(self, origin_codes: Sequence[Iterable[str]], origin_names: Sequence[Any]):
+        """
+        Args:
+            origin_codes (Sequence[Iterable[str]]): Códigos de origem de cada regra, na ordem da planilha.
+            origin_names (Sequence[Any]): Nome de origem de cada regra (pode ser NaN).
+        """
+        term_rules: list[int] = []
+        term_sizes: list[int] = []
+        postings: dict[str, list[int]] = {}
+
+        for rule_pos, (codes, name) in enumerate(zip(origin_codes, origin_names)):
+            terms = {normalize_term(code) for code in codes}
+            if isinstance(name, str):
+                terms.update(word for word in normalize_term(name).split() if len(word) >= MIN_WORD_LENGTH)
+            for term in terms:
+                if not term:
+                    continue
+                term_id = len(term_rules)
+                grams = trigrams(term)
+                term_rules.append(rule_pos)
+                term_sizes.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(term_id)
+
+        self.term_rules = np.array(term_rules, dtype=np.int32)
+        self.term_sizes = np.array(term_sizes, dtype=np.int32)
+        self.postings = {gram: np.array(term_ids, dtype=np.int32) for gram, term_ids in postings.items()}
+
+    def search(self, query: str, k: int = DEFAULT_SUGGESTIONS, min_similarity: float = MIN_SIMILARITY) -> list[tuple[float, int]]:
+        """
+        Devolve as k regras mais parecidas com o termo procurado.
+
+        A similaridade de uma regra é a maior similaridade de Jaccard entre os
+        trigramas da consulta e os de um dos seus termos (códigos ou palavras do nome).
+
+        Returns:
+            list[tuple[float, int]]: Pares (similaridade, posição da regra), da mais
+            parecida para a menos parecida; empates favorecem as regras mais acima.
+        """
+        query_grams = trigrams(normalize_term(query))
+        query_postings = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not query_postings:
+            return []
+
+        # Quantos trigramas cada termo compartilha com a consulta
+        shared = np.bincount(np.concatenate(query_postings))
+
+        # Como a união tem pelo menos len(query_grams) trigramas, um termo só chega à
+        # similaridade mínima se compartilhar ao menos min_similarity * len(query_grams)
+        # trigramas; o filtro descarta de uma vez os termos parecidos só no prefixo
+        # ("  i", "inf", ...), que são a maioria.
+        query_size = len(query_grams)
+        min_common = max(1, math.ceil(min_similarity * query_size - 1e-9))
+        term_ids = np.flatnonzero(shared >= min_common)
+        common = shared[term_ids]
+        similarities = common / (query_size + self.term_sizes[term_ids] - common)
+        passing = similarities >= min_similarity
+
+        best_by_rule: dict[int, float] = {}
+        for rule_pos, similarity in zip(self.term_rules[term_ids[passing]].tolist(), similarities[passing].tolist()):
+            if similarity > best_by_rule.get(rule_pos, 0.0):
+                best_by_rule[rule_pos] = similarity
+
+        top = heapq.nlargest(k, best_by_rule.items(), key=lambda item: (item[1], -item[0]))
+        return [(similarity, rule_pos) for rule_pos, similarity in top]
@@ -0,0 +1,174 @@
+# 1. Bibliotecas padrão (Standard Library)
+import functools
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+# Logger das medições; cada linha é um objeto JSON com uma etapa
+logger = logging.getLogger("equivalencias.timing")
+
+
+class TimingRun:
+    """
+    Etapas medidas durante UMA execução (ex.: um rerun do Streamlit ou um requerimento da CLI).
+
+    Cada etapa é um dicionário com "stage", "duration_ms", "start_ms" (relativo
+    ao início da execução), "depth" (aninhamento), "status" e atributos extras.
+    """
+    __slots__ = ("run_id", "name", "started", "spans")
+
+    def __init__(self, name: str):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans: list[dict[str, Any]] = []
+
+    @property
+    def total_ms(self) -> float:
+        """Duração das etapas de nível mais alto, somadas."""
+        return sum(span["duration_ms"] for span in self.spans if span["depth"] == 0)
+
+
+_enabled = False
+_current_run: ContextVar[Optional[TimingRun]] = ContextVar("timing_run", default=None)
+_current_depth: ContextVar[int] = ContextVar("timing_depth", default=0)
+
+
+def _configure_logger() -> None:
+    # Sem handler próprio, as linhas INFO seriam descartadas pela configuração padrão do logging
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+def set_enabled(enabled: bool) -> None:
+    """
+    Liga ou desliga a medição das etapas. Desligada, span() e @timed custam
+    apenas a verificação de uma variável global.
+    """
+    global _enabled
+    _enabled = enabled
+    if enabled:
+        _configure_logger()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class _NullSpan:
+    """Span usado com a medição desligada: não mede nem registra nada."""
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("stage", "attrs", "start", "depth_token")
+
+    def __init__(self, stage: str, attrs: dict[str, Any]):
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self) -> "_Span":
+        self.depth_token = _current_depth.set(_current_depth.get() + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        _current_depth.reset(self.depth_token)
+        run = _current_run.get()
+        record = {
+            "stage": self.stage,
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "start_ms": round((self.start - run.started) * 1000, 3) if run else None,
+            "depth": _current_depth.get(),
+            "status": "erro" if exc_type else "ok",
+            **self.attrs
+        }
+        if run is not None:
+            run.spans.append(record)
+        logger.info(json.dumps(
+            {"event": "stage_timing", "run_id": run.run_id if run else None,
+             "run": run.name if run else None, **record},
+            ensure_ascii=False, default=str
+        ))
+        return False
+
+
+def span(stage: str, **attrs: Any):
+    """
+    Mede o bloco como uma etapa: `with span("report_card_compact", rows=10): ...`
+
+    A etapa é gravada como uma linha JSON no logger "equivalencias.timing" e,
+    se houver uma execução em andamento (start_run), anexada a ela.
+
+    Args:
+        stage (str): Nome da etapa.
+        **attrs: Atributos extras gravados junto com a etapa.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(stage, attrs)
+
+
+def timed(stage: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorador que mede cada chamada da função como uma etapa (por padrão, com o nome da função).
+    """
+    def decorator(func: Callable) -> Callable:
+        name = stage or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def start_run(name: str) -> Iterator[Optional[TimingRun]]:
+    """
+    Agrupa as etapas medidas dentro do bloco em uma execução.
+
+    Returns:
+        Optional[TimingRun]: A execução em andamento, ou None com a medição desligada.
+    """
+    if not _enabled:
+        yield None
+        return
+    run = TimingRun(name)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def enabled_from_env() -> bool:
+    """Indica se a variável STAGE_TIMING (ambiente ou .env já carregado) liga a medição."""
+    return os.getenv("STAGE_TIMING", "").lower() in ("1", "true", "sim")
+
+
+# Com STAGE_TIMING=1 no ambiente, a medição já começa ligada (útil para a CLI e os benchmarks)
+set_enabled(enabled_from_env())
@@ -0,0 +1,169 @@
+"""
+Testes da aplicação das regras: a cobertura máxima contra uma busca exaustiva em
+regras aleatórias pequenas, os limites da busca e a aplicação na ordem da planilha
+contra a implementação original (iterrows sobre a aba).
+
+Uso:
+    python -m pytest tests
+"""
+import itertools
+import os
+import random
+import sys
+import time
+import unittest
+
+from pandas import DataFrame
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core import (  # noqa: E402
+    MATCH_MAX_COVERAGE, MATCH_SHEET_ORDER, MAX_SEARCH_CANDIDATES, RULE_COLUMNS,
+    compile_rules, find_equivalencies
+)
+
+
+def make_sheet(origin_codes):
+    """Aba com uma regra por célula de 'Códigos Origem' (ex.: "MAT101 + MAT102")."""
+    return DataFrame(
+        [[codes, f"Nome {codes}", "Sim", f"UFRJ{pos:03d}", f"Destino {pos}", f"Parecer {pos}"]
+         for pos, codes in enumerate(origin_codes)],
+        columns=list(RULE_COLUMNS)
+    )
+
+
+def random_sheet(rng, codes, rules):
+    """Aba com regras simples e compostas (até 3 códigos) sorteadas entre os códigos."""
+    return make_sheet([" + ".join(rng.sample(codes, rng.choice((1, 1, 2, 2, 3)))) for _ in range(rules)])
+
+
+def baseline_find_equivalencies(university_df, course_codes_str):
+    """Implementação original: percorre a aba com iterrows e aplica a primeira regra que couber."""
+    results = []
+    cleaned_str = course_codes_str.replace(",", " ").replace("\n", " ")
+    input_codes_set = {code.strip().upper() for code in cleaned_str.split() if code.strip()}
+    for _, rule in university_df.iterrows():
+        required_codes = {c.strip().upper() for c in str(rule['Códigos Origem']).split('+')}
+        if required_codes.issubset(input_codes_set):
+            results.append({
+                "status": "Encontrado",
+                "origin_codes": rule['Códigos Origem'],
+                "origin_names": rule['Nomes Origem'],
+                "is_equivalent": rule['Equivalente?'],
+                "dest_codes": rule['Códigos UFRJ Destino'],
+                "dest_names": rule['Nomes UFRJ Destino'],
+                "justification": rule['Justificativa Parecer']
+            })
+            input_codes_set -= required_codes
+    for remaining_code in sorted(input_codes_set):
+        results.append({"input_code": remaining_code, "status": "Não Encontrado na Planilha"})
+    return results
+
+
+def exhaustive_max_coverage(compiled, input_codes):
+    """Maior cobertura possível com regras disjuntas, testando todas as combinações."""
+    applicable = [rule.required_codes for rule in compiled.rules if rule.required_codes <= input_codes]
+    best = 0
+    for size in range(len(applicable) + 1):
+        for combination in itertools.combinations(applicable, size):
+            covered = frozenset().union(*combination)
+            if len(covered) == sum(len(codes) for codes in combination):
+                best = max(best, len(covered))
+    return best
+
+
+class MatchingTest(unittest.TestCase):
+
+    def assert_valid_match(self, matched, remaining, input_codes):
+        """As regras acionadas se aplicam, não compartilham códigos e o que sobrou é o complemento."""
+        used = set()
+        for rule in matched:
+            self.assertTrue(rule.required_codes <= input_codes)
+            self.assertFalse(rule.required_codes & used)
+            used |= rule.required_codes
+        self.assertEqual(remaining, set(input_codes) - used)
+
+    def test_max_coverage_matches_exhaustive_search(self):
+        rng = random.Random(2024)
+        codes = [f"C{i:02d}" for i in range(10)]
+        for case in range(300):
+            compiled = compile_rules(random_sheet(rng, codes, rng.randint(1, 12)))
+            input_codes = frozenset(rng.sample(codes, rng.randint(1, len(codes))))
+            with self.subTest(case=case):
+                matched, remaining = compiled.match_max_coverage(input_codes)
+                self.assert_valid_match(matched, remaining, input_codes)
+                self.assertEqual(len(input_codes) - len(remaining), exhaustive_max_coverage(compiled, input_codes))
+                # Nunca cobre menos que a ordem da planilha
+                self.assertLessEqual(len(remaining), len(compiled.match(input_codes)[1]))
+
+    def test_max_coverage_improves_on_sheet_order(self):
+        compiled = compile_rules(make_sheet(["MAT101 + MAT102", "MAT101", "MAT102 + MAT103"]))
+        input_codes = frozenset({"MAT101", "MAT102", "MAT103"})
+        self.assertEqual(compiled.match(input_codes)[1], {"MAT103"})
+        matched, remaining = compiled.match_max_coverage(input_codes)
+        self.assertEqual([rule.origin_codes for rule in matched], ["MAT101", "MAT102 + MAT103"])
+        self.assertEqual(remaining, set())
+
+    def test_max_coverage_keeps_sheet_order_when_optimal(self):
+        compiled = compile_rules(make_sheet(["MAT101", "MAT101 + MAT102", "MAT102", "FIS101"]))
+        input_codes = frozenset({"MAT101", "MAT102", "FIS101"})
+        self.assertEqual(compiled.match_max_coverage(input_codes), compiled.match(input_codes))
+
+    def test_search_respects_node_limit(self):
+        # Muitas regras compostas que se sobrepõem: a busca exaustiva seria exponencial
+        rng = random.Random(7)
+        codes = [f"C{i:02d}" for i in range(40)]
+        compiled = compile_rules(make_sheet([" + ".join(rng.sample(codes, 3)) for _ in range(MAX_SEARCH_CANDIDATES)]))
+        input_codes = frozenset(codes)
+        sheet_order_remaining = compiled.match(input_codes)[1]
+        for max_nodes in (1, 100, 20_000):
+            with self.subTest(max_nodes=max_nodes):
+                started = time.perf_counter()
+                matched, remaining = compiled.match_max_coverage(input_codes, max_nodes=max_nodes)
+                self.assertLess(time.perf_counter() - started, 5)
+                self.assert_valid_match(matched, remaining, input_codes)
+                self.assertLessEqual(len(remaining), len(sheet_order_remaining))
+
+    def test_search_skipped_above_candidate_limit(self):
+        # Acima de MAX_SEARCH_CANDIDATES regras aplicáveis vale a ordem da planilha
+        codes = [f"C{i:03d}" for i in range(MAX_SEARCH_CANDIDATES + 2)]
+        origin_codes = [f"{a} + {b}" for a, b in zip(codes, codes[1:])]
+        compiled = compile_rules(make_sheet(origin_codes))
+        input_codes = frozenset(codes)
+        self.assertEqual(compiled.match_max_coverage(input_codes), compiled.match(input_codes))
+
+    def test_sheet_order_matches_baseline(self):
+        rng = random.Random(1995)
+        codes = [f"INF{i:03d}" for i in range(15)]
+        for case in range(200):
+            sheet = random_sheet(rng, codes, rng.randint(1, 20))
+            # Códigos em caixa baixa, repetidos e inexistentes, com os separadores aceitos
+            typed = rng.sample(codes, rng.randint(1, 10)) + ["XYZ999"] * rng.randint(0, 1)
+            typed += [code.lower() for code in rng.sample(typed, rng.randint(0, len(typed)))]
+            course_codes_str = rng.choice((" ", ", ", "\n")).join(typed)
+            with self.subTest(case=case):
+                expected = baseline_find_equivalencies(sheet, course_codes_str)
+                self.assertEqual(
+                    find_equivalencies({"UFF": sheet}, "UFF", course_codes_str, strategy=MATCH_SHEET_ORDER), expected
+                )
+                self.assertEqual(
+                    find_equivalencies({"UFF": compile_rules(sheet)}, "UFF", course_codes_str,
+                                       strategy=MATCH_SHEET_ORDER),
+                    expected
+                )
+
+    def test_max_coverage_is_the_default_strategy(self):
+        sheet = make_sheet(["MAT101 + MAT102", "MAT101", "MAT102 + MAT103"])
+        previous = os.environ.pop("RULE_MATCHING", None)
+        try:
+            self.assertEqual(
+                find_equivalencies({"UFF": sheet}, "UFF", "MAT101 MAT102 MAT103"),
+                find_equivalencies({"UFF": sheet}, "UFF", "MAT101 MAT102 MAT103", strategy=MATCH_MAX_COVERAGE)
+            )
+        finally:
+            if previous is not None:
+                os.environ["RULE_MATCHING"] = previous
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Testes do RemoteWorkbook contra um servidor HTTP local, que responde com ETag e
+atende requisições condicionais (If-None-Match) como o servidor da planilha.
+
+Uso:
+    python -m pytest tests
+"""
+import hashlib
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from remote_workbook import RemoteWorkbook  # noqa: E402
+
+
+class WorkbookHandler(BaseHTTPRequestHandler):
+    """Serve o conteúdo atual de server.workbook, com ETag igual ao hash do conteúdo."""
+
+    def do_GET(self):
+        content = self.server.workbook
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        # Registrado antes de responder: o cliente pode conferir assim que receber a resposta
+        if self.headers.get("If-None-Match") == etag:
+            self.server.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+        else:
+            self.server.statuses.append(200)
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteWorkbookTest(unittest.TestCase):
+
+    def setUp(self):
+        # Porta 0: o sistema escolhe uma porta livre
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), WorkbookHandler)
+        self.server.workbook = b"planilha v1"
+        self.server.statuses = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.remote = RemoteWorkbook(f"http://{host}:{port}/planilha.xlsx", timeout=10)
+
+    def tearDown(self):
+        self.remote.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_first_fetch_returns_content(self):
+        self.assertEqual(self.remote.fetch(), b"planilha v1")
+        self.assertEqual(self.server.statuses, [200])
+
+    def test_unchanged_workbook_gets_304(self):
+        self.remote.fetch()
+        self.assertIsNone(self.remote.fetch())
+        self.assertEqual(self.server.statuses, [200, 304])
+
+    def test_changed_workbook_returns_new_content(self):
+        self.remote.fetch()
+        self.server.workbook = b"planilha v2"
+        self.assertEqual(self.remote.fetch(), b"planilha v2")
+        self.assertEqual(self.server.statuses, [200, 200])
+        # E a versão nova passa a ser a de referência
+        self.assertIsNone(self.remote.fetch())
+        self.assertEqual(self.server.statuses, [200, 200, 304])
+
+    def test_forget_downloads_again(self):
+        self.remote.fetch()
+        self.remote.forget()
+        self.assertEqual(self.remote.fetch(), b"planilha v1")
+        self.assertEqual(self.server.statuses, [200, 200])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Testes da compilação incremental do RuleBook: montado a partir das regras
+anteriores, ele deve ser igual ao montado do zero com a planilha nova.
+
+Uso:
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+
+from pandas import DataFrame
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core import (  # noqa: E402
+    RULE_COLUMNS, SHEET_ADDED, SHEET_MODIFIED, SHEET_REMOVED,
+    build_rulebook, find_by_destination, search_disciplines
+)
+
+SEARCH_QUERIES = ("Cálculo", "calc", "Física I", "Programação", "MAC118", "ICP131", "GMA", "Química", "algoritmos")
+
+
+def make_sheet(rows):
+    """Aba a partir de tuplas (códigos origem, nomes origem, códigos UFRJ destino, nomes UFRJ destino)."""
+    return DataFrame(
+        [[origin_codes, origin_names, "Sim", dest_codes, dest_names, f"Equivalente a {dest_codes}"]
+         for origin_codes, origin_names, dest_codes, dest_names in rows],
+        columns=list(RULE_COLUMNS)
+    )
+
+
+def make_workbook():
+    return {
+        "UFF": make_sheet([
+            ("GMA001", "Cálculo I", "MAC118", "Cálculo Diferencial e Integral I"),
+            ("GFI001", "Física I", "FIT112", "Física I"),
+            ("TCC001", "Algoritmos", "ICP131", "Programação de Computadores I"),
+        ]),
+        "UFRGS": make_sheet([
+            ("MAT01353", "Cálculo e Geometria Analítica I", "MAC118", "Cálculo Diferencial e Integral I"),
+            ("INF01202 + INF01203", "Algoritmos e Programação", "ICP131+ICP141", "Programação I e II"),
+        ]),
+        "PUC-Rio": make_sheet([
+            ("MAT1161", "Cálculo a uma Variável", "MAC118", "Cálculo Diferencial e Integral I"),
+            ("QUI1001", "Química Geral", "IQG111", "Química Geral"),
+        ]),
+    }
+
+
+class IncrementalRuleBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.previous = build_rulebook(make_workbook())
+        # Índice de busca já montado, para que os segmentos das abas sem mudança sejam reaproveitados
+        self.previous.search_index
+
+    def assert_same_as_full_rebuild(self, workbook):
+        incremental = build_rulebook(workbook, previous=self.previous)
+        full = build_rulebook(workbook)
+
+        self.assertEqual(incremental.version, full.version)
+        self.assertEqual(dict(incremental.sheet_versions), dict(full.sheet_versions))
+        self.assertEqual(incremental.universities, full.universities)
+        self.assertEqual(incremental._dest_index, full._dest_index)
+
+        # Inclui os códigos que só existiam nas regras anteriores
+        dest_codes = set(full._dest_index) | set(self.previous._dest_index)
+        for dest_code in sorted(dest_codes):
+            with self.subTest(dest_code=dest_code):
+                self.assertEqual(find_by_destination(incremental, dest_code), find_by_destination(full, dest_code))
+        for query in SEARCH_QUERIES:
+            with self.subTest(query=query):
+                self.assertEqual(search_disciplines(incremental, query), search_disciplines(full, query))
+        return incremental
+
+    def test_modified_sheet(self):
+        workbook = make_workbook()
+        workbook["UFRGS"] = make_sheet([
+            ("MAT01353", "Cálculo e Geometria Analítica I", "MAC118", "Cálculo Diferencial e Integral I"),
+            ("INF01202", "Algoritmos e Programação", "ICP131", "Programação de Computadores I"),
+            ("FIS01181", "Física I-C", "FIT112", "Física I"),
+        ])
+        rulebook = self.assert_same_as_full_rebuild(workbook)
+        self.assertEqual([change.status for change in rulebook.changes.sheets], [SHEET_MODIFIED])
+        # Só as entradas citadas pela aba alterada são remontadas
+        self.assertIs(rulebook._dest_index["IQG111"], self.previous._dest_index["IQG111"])
+        self.assertNotIn("ICP141", rulebook._dest_index)
+        self.assertEqual([university for university, _ in rulebook.rules_for_destination("FIT112")], ["UFF", "UFRGS"])
+
+    def test_added_sheet(self):
+        workbook = make_workbook()
+        workbook["UFRJ-Xerém"] = make_sheet([
+            ("XCA101", "Cálculo I", "MAC118", "Cálculo Diferencial e Integral I"),
+            ("XBI101", "Biologia Celular", "BMW111", "Biologia Celular"),
+        ])
+        rulebook = self.assert_same_as_full_rebuild(workbook)
+        self.assertEqual([change.status for change in rulebook.changes.sheets], [SHEET_ADDED])
+        self.assertEqual(len(rulebook.rules_for_destination("MAC118")), 4)
+
+    def test_deleted_sheet(self):
+        workbook = make_workbook()
+        del workbook["PUC-Rio"]
+        rulebook = self.assert_same_as_full_rebuild(workbook)
+        self.assertEqual([change.status for change in rulebook.changes.sheets], [SHEET_REMOVED])
+        self.assertEqual(find_by_destination(rulebook, "IQG111"), [])
+
+    def test_reordered_sheets(self):
+        # As abas mantidas mudam de ordem: o índice reverso é montado do zero
+        workbook = make_workbook()
+        workbook = {university: workbook[university] for university in ("PUC-Rio", "UFF", "UFRGS")}
+        rulebook = self.assert_same_as_full_rebuild(workbook)
+        self.assertEqual(
+            [result["university"] for result in find_by_destination(rulebook, "MAC118")], ["PUC-Rio", "UFF", "UFRGS"]
+        )
+
+    def test_unchanged_workbook(self):
+        rulebook = self.assert_same_as_full_rebuild(make_workbook())
+        self.assertEqual(rulebook.version, self.previous.version)
+        self.assertFalse(rulebook.changes.sheets)
+
+
+if __name__ == "__main__":
+    unittest.main()
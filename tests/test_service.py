@@ -0,0 +1,98 @@
+"""
+Testes da validação das requisições do serviço HTTP local: requisições malformadas
+recebem 400 antes de chegar às regras ou ao conjunto de processos.
+
+Uso:
+    python -m pytest tests
+"""
+import http.client
+import json
+import os
+import sys
+import threading
+import unittest
+
+from pandas import DataFrame
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core import RULE_COLUMNS, build_rulebook  # noqa: E402
+from service import EquivalenceService, WorkerPool, make_server  # noqa: E402
+
+
+class ServiceValidationTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        rulebook = build_rulebook({
+            "UFF": DataFrame(
+                [["GMA001", "Cálculo I", "Sim", "MAC118", "Cálculo I", "Ementa compatível."]],
+                columns=list(RULE_COLUMNS)
+            )
+        })
+        # Nenhum dos casos testados chega ao conjunto de processos
+        cls.pool = WorkerPool(1, 1, (None, None))
+        # Porta 0: o sistema escolhe uma porta livre
+        cls.server = make_server("127.0.0.1", 0, EquivalenceService(rulebook, cls.pool))
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        cls.pool.shutdown()
+
+    def setUp(self):
+        host, port = self.server.server_address
+        self.conn = http.client.HTTPConnection(host, port, timeout=10)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def post(self, path, payload):
+        self.conn.request("POST", path, json.dumps(payload))
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_equivalencias_accepts_valid_request(self):
+        status, body = self.post("/equivalencias", {"university": "UFF", "codes": ["GMA001"]})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["results"][0]["dest_codes"], "MAC118")
+
+    def test_equivalencias_rejects_non_string_university(self):
+        for university in ([1], 1, None, {"nome": "UFF"}):
+            with self.subTest(university=university):
+                status, _ = self.post("/equivalencias", {"university": university, "codes": "GMA001"})
+                self.assertEqual(status, 400)
+
+    def test_equivalencias_rejects_non_string_codes(self):
+        for codes in ({"a": 1}, 1, [1], ["GMA001", None]):
+            with self.subTest(codes=codes):
+                status, _ = self.post("/equivalencias", {"university": "UFF", "codes": codes})
+                self.assertEqual(status, 400)
+
+    def test_relatorios_rejects_invalid_results(self):
+        for results in ([1, 2], ["GMA001"], [{"status": "Encontrado", "dest_codes": 123}], [{"status": ["x"]}]):
+            with self.subTest(results=results):
+                status, body = self.post("/relatorios", {"results": results})
+                self.assertEqual(status, 400)
+                self.assertIn("results", body["error"])
+
+    def test_invalid_content_length_closes_connection(self):
+        for length in ("abc", "-1"):
+            with self.subTest(length=length):
+                self.conn.putrequest("POST", "/equivalencias")
+                self.conn.putheader("Content-Length", length)
+                self.conn.endheaders()
+                response = self.conn.getresponse()
+                self.assertEqual(response.status, 400)
+                response.read()
+                # A conexão é encerrada em vez de tentar ler o corpo como a próxima requisição
+                self.assertTrue(response.will_close)
+                self.conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()